@@ -0,0 +1,53 @@
+"""
+批量检索基准测试：对比逐个问题检索与 Retriever.search_many 批量检索的吞吐量（问题/秒）。
+
+需要先运行 rag_milvus_deepseek.py 建好 collection。
+用法：
+    python bench_batch_search.py          # 默认 200 个问题
+    python bench_batch_search.py 1000
+"""
+import sys
+import time
+from itertools import cycle, islice
+
+from pymilvus import model as milvus_model
+
+from rag_chunker import iter_civil_code_units
+from rag_ingest import iter_text_lines
+from rag_milvus_deepseek import VECTOR_STORE_URI, collection_name
+from rag_retriever import Retriever
+from vector_store import connect
+
+
+def make_questions(total: int) -> list:
+    """用每条法条的前 20 个字作为问题。"""
+    articles = [text[:20] for _, text in iter_civil_code_units(iter_text_lines("./民法典节选.txt"))]
+    return list(islice(cycle(articles), total))
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    questions = make_questions(total)
+
+    # 不使用向量缓存，测量真实的向量化开销
+    retriever = Retriever(connect(VECTOR_STORE_URI), collection_name, milvus_model.DefaultEmbeddingFunction())
+    retriever.search("预热")
+
+    start = time.perf_counter()
+    single = [retriever.search(question) for question in questions]
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = retriever.search_many(questions)
+    batch_seconds = time.perf_counter() - start
+
+    same = sum(a[0][0] == b[0][0] for a, b in zip(single, batch) if a and b)
+    print(f"问题数：{len(questions)}，两种方式 top1 一致：{same}/{len(questions)}")
+    print(f"{'方式':<10} {'耗时(s)':>10} {'问题/秒':>10}")
+    print(f"{'逐个检索':<10} {single_seconds:>10.2f} {len(questions) / single_seconds:>10.1f}")
+    print(f"{'批量检索':<10} {batch_seconds:>10.2f} {len(questions) / batch_seconds:>10.1f}")
+    print(f"加速比：{single_seconds / batch_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
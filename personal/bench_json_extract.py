@@ -0,0 +1,122 @@
+"""
+JSON 提取基准测试：在模拟的 deepseek-r1 长输出（<think> 推理中夹杂大量括号、示例 JSON 和代码）上，
+对比原来的两个正则提取方式与 json_extract 单遍扫描的耗时和结果是否正确。
+
+- 整段：拿到完整输出后提取一次；
+- 流式：每收到一段（64 字符）尝试提取一次，正则只能对累积的全文重新匹配，单遍扫描只看新的一段；
+- 无结果：输出中有很多 { 和 ```json 但没有一个闭合的对象（例如推理被截断），正则回溯最严重的情况。
+用法：
+    python bench_json_extract.py
+"""
+import json
+import random
+import re
+import time
+
+from json_extract import IncrementalJSONExtractor, extract_rednote, validate_rednote
+
+NOTE = {"title": "沙漠干皮救星💧", "body": "姐妹们！这款面膜真的{绝绝子}……", "hashtags": ["#补水", "#面膜"], "emojis": ["💧", "✨"]}
+
+
+def fenced_regex(text: str):
+    """rednote.py 原来的提取方式。"""
+    match = re.search(r"```json\s*(\{.*\})\s*```", text, re.DOTALL)
+    return json.loads(match.group(1)) if match else None
+
+
+def greedy_regex(text: str):
+    """rednotelangchain.py 原来的提取方式。"""
+    match = re.search(r'\{[\s\S]*\}', text)
+    return json.loads(match.group()) if match else None
+
+
+def make_output(think_chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    snippets = ["先看格式 {\"title\": \"...\"} ", "if (x) { y(); } ", "用户说 {好用} ", "```json\n{ 草稿 ",
+                "字典 {'a': {'b': 1}} ", "嗯…… ", "数组 [1, 2, {3}] ", "{{{ "]
+    parts, size = ["<think>\n"], 0
+    while size < think_chars:
+        part = rng.choice(snippets)
+        parts.append(part)
+        size += len(part)
+    parts.append("\n</think>\n")
+    parts.append("好的，最终文案如下：\n```json\n" + json.dumps(NOTE, ensure_ascii=False, indent=2)
+                 + "\n```\n希望喜欢！{完}")
+    return "".join(parts)
+
+
+def make_unclosed(chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    snippets = ["```json\n{ 草稿 ", "先看格式 {\"title\": ", "if (x) { y(); ", "嗯…… ", "{{{ "]
+    parts, size = [], 0
+    while size < chars:
+        part = rng.choice(snippets)
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)
+
+
+def safe(fn, text):
+    try:
+        return fn(text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+
+
+def timed(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def streamed_regex(fn, text: str, chunk: int = 64):
+    for end in range(chunk, len(text) + chunk, chunk):
+        result = safe(fn, text[:end])
+        if result is not None and not validate_rednote(result):
+            return result
+    return None
+
+
+def streamed_incremental(text: str, chunk: int = 64):
+    extractor = IncrementalJSONExtractor(validator=validate_rednote)
+    for begin in range(0, len(text), chunk):
+        result = extractor.feed(text[begin:begin + chunk])
+        if result is not None:
+            return result
+    return None
+
+
+def main():
+    print(f"{'场景':<14} {'方式':<18} {'耗时(ms)':>10} {'结果':>6}")
+    for think_chars in (10_000, 100_000, 1_000_000):
+        text = make_output(think_chars)
+        unclosed = make_unclosed(think_chars // 20)
+        slow = think_chars >= 1_000_000  # 最大的一组只跑一次
+        cases = [
+            (f"整段 {think_chars / 1000:g}k", [
+                ("正则 ```json", lambda: safe(fenced_regex, text)),
+                ("正则 {...}", lambda: safe(greedy_regex, text)),
+                ("单遍扫描", lambda: extract_rednote(text)[0]),
+            ]),
+            (f"无结果 {think_chars / 20000:g}k", [
+                ("正则 ```json", lambda: safe(fenced_regex, unclosed)),
+                ("正则 {...}", lambda: safe(greedy_regex, unclosed)),
+                ("单遍扫描", lambda: extract_rednote(unclosed)[0]),
+            ]),
+        ]
+        if think_chars <= 100_000:  # 流式正则是平方级的，1M 字符要跑很久
+            cases.append((f"流式 {think_chars / 1000:g}k", [
+                ("正则 ```json", lambda: streamed_regex(fenced_regex, text)),
+                ("单遍扫描", lambda: streamed_incremental(text)),
+            ]))
+        for scenario, methods in cases:
+            for name, fn in methods:
+                ms, result = timed(fn, repeat=1 if slow or scenario.startswith("流式") else 3)
+                expected = None if scenario.startswith("无结果") else NOTE
+                print(f"{scenario:<14} {name:<18} {ms:>10.2f} {'✅' if result == expected else '❌':>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+并行向量化基准测试：对比 1..N 个进程时民法典文本的向量化吞吐量（行/秒）。
+
+用法：
+    python bench_parallel_embed.py            # 进程数 1, 2, 4, ... 直到 CPU 核心数
+    python bench_parallel_embed.py 8 4000     # 最多 8 个进程，测试 4000 行
+"""
+import os
+import sys
+import time
+from itertools import cycle, islice
+
+from pymilvus import model as milvus_model
+
+from rag_ingest import iter_text_lines
+from rag_parallel_embed import ParallelEmbeddingFunction
+
+
+def worker_counts(max_workers: int) -> list:
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    total_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    lines = [line for line in iter_text_lines("./民法典节选.txt") if line.strip()]
+    lines = list(islice(cycle(lines), total_lines))
+
+    print(f"测试文本：{len(lines)} 行")
+    print(f"{'进程数':>6} {'耗时(s)':>10} {'行/秒':>10} {'加速比':>8}")
+    baseline = None
+    for workers in worker_counts(max_workers):
+        with ParallelEmbeddingFunction(milvus_model.DefaultEmbeddingFunction, workers=workers) as model:
+            model.encode_documents(lines[:workers * model.batch_size])  # 预热：让每个进程先加载好模型
+            start = time.perf_counter()
+            embeddings = model.encode_documents(lines)
+            seconds = time.perf_counter() - start
+        assert len(embeddings) == len(lines)
+        rate = len(lines) / seconds
+        baseline = baseline or rate
+        print(f"{workers:>6} {seconds:>10.2f} {rate:>10.1f} {rate / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+量化存储基准测试：对比 sq8 / pq 编码相对 float32 的内存压缩比、recall@10 和单次查询延迟。
+
+rerank_k 为两阶段检索中在编码上取的候选数，rerank_k=10 即不做有效重排，只看编码本身的精度。
+用法：
+    python bench_quantization.py                 # 5 万条 768 维向量
+    python bench_quantization.py 100000 768
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from vector_store import LocalVectorStore
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 768
+    limit = 10
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(64, dim)).astype(np.float32)
+    root_dir = tempfile.mkdtemp()
+    try:
+        store = LocalVectorStore(root_dir)
+        store.create_collection("bench", dimension=dim, metric_type="COSINE")
+        for begin in range(0, total, 10_000):
+            size = min(10_000, total - begin)
+            vectors = centers[rng.integers(0, 64, size)] + 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+            store.insert("bench", [{"id": begin + i, "vector": v} for i, v in enumerate(vectors)])
+        store.flush("bench")
+        queries = centers[rng.integers(0, 64, 100)] + 0.5 * rng.normal(size=(100, dim)).astype(np.float32)
+
+        def run(search_params=None):
+            latencies, results = [], []
+            for query in queries:
+                start = time.perf_counter()
+                hits = store.search("bench", [query], limit=limit, search_params=search_params)[0]
+                latencies.append(time.perf_counter() - start)
+                results.append({hit["id"] for hit in hits})
+            return np.median(latencies) * 1000, results
+
+        exact_ms, exact = run()
+        print(f"{total} 条 {dim} 维向量，float32 占用 {total * dim * 4 / 1024 / 1024:.1f} MB")
+        print(f"{'方式':<22} {'常驻内存(MB)':>12} {'压缩比':>8} {'recall@10':>10} {'p50(ms)':>10}")
+        print(f"{'float32 精确检索':<22} {total * dim * 4 / 1024 / 1024:>12.1f} {1.0:>8.1f} {1.0:>10.3f} {exact_ms:>10.2f}")
+
+        for kind, m in (("sq8", None), ("pq", dim // 8), ("pq", dim // 16)):
+            start = time.perf_counter()
+            store.create_quantized_index("bench", kind=kind, m=m or 16)
+            build_seconds = time.perf_counter() - start
+            usage = store.memory_usage("bench")
+            label = kind if m is None else f"{kind} m={m}"
+            print(f"-- {label}（构建 {build_seconds:.1f}s）")
+            for rerank_k in (limit, 50, 200):
+                ms, found = run({"params": {"rerank_k": rerank_k}})
+                recall = np.mean([len(a & b) / limit for a, b in zip(exact, found)])
+                name = f"{label} rerank_k={rerank_k}"
+                print(f"{name:<22} {usage['resident_bytes'] / 1024 / 1024:>12.1f} {usage['ratio']:>8.1f} "
+                      f"{recall:>10.3f} {ms:>10.2f}")
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+RAG 流水线基准测试：在本地向量库上完整跑一遍 切分 -> 向量化 -> 入库 -> 检索，
+输出入库吞吐量、峰值内存，以及向量检索/混合检索的 recall@k、MRR 和 p50/p95/p99 延迟。
+
+不需要 Milvus 服务；使用 --embedding stub 时也不需要下载向量模型，可以放在 CI 上跟踪回归。
+用法：
+    python bench_rag.py                               # DefaultEmbeddingFunction + 临时本地向量库
+    python bench_rag.py --embedding stub --json bench_rag.json
+    python bench_rag.py --store local://./.bench_store --k 10 --repeat 5
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+from bm25_index import BM25Builder
+from rag_chunker import chunk_civil_code
+from rag_eval import HashingEmbeddingFunction, evaluate_hits, latency_summary, load_questions, peak_rss_mb
+from rag_ingest import ingest
+from rag_manifest import chunk_id
+from rag_retriever import HybridRetriever, Retriever
+from vector_store import connect
+
+
+def build_embedding_model(name: str):
+    if name == "stub":
+        return HashingEmbeddingFunction()
+    from pymilvus import model as milvus_model
+    return milvus_model.DefaultEmbeddingFunction()
+
+
+def build_store(store, embedding_model, collection_name: str, corpus: str):
+    """切分语料并写入向量库，同时构建 BM25 索引，返回 (BM25Index, 入库指标)。"""
+    if store.has_collection(collection_name):
+        store.drop_collection(collection_name)
+    dim = len(embedding_model.encode_queries(["This is a test"])[0])
+    store.create_collection(collection_name=collection_name, dimension=dim, metric_type="IP")
+
+    bm25_builder = BM25Builder()
+    start = time.perf_counter()
+    stats = ingest(store, collection_name, embedding_model, bm25_builder.track(chunk_civil_code(corpus)),
+                   id_fn=chunk_id)
+    store.flush(collection_name)
+    seconds = time.perf_counter() - start
+    return bm25_builder.build(), {
+        "chunks": stats["embed"].items,
+        "seconds": seconds,
+        "chunks_per_sec": stats["embed"].items / seconds,
+        "embed_per_sec": stats["embed"].lines_per_sec,
+        "insert_per_sec": stats["insert"].lines_per_sec,
+    }
+
+
+def run_retrieval(retriever, questions: list, k: int, repeat: int) -> dict:
+    """逐个问题分别测量向量化、检索和端到端耗时，并计算检索质量。"""
+    embed_seconds, search_seconds, e2e_seconds, all_hits = [], [], [], []
+    for item in questions:
+        question = item["question"]
+        for _ in range(repeat):
+            start = time.perf_counter()
+            vectors = retriever.embedding_model.encode_queries([question])
+            embedded = time.perf_counter()
+            retriever.search_many([question], k, vectors=vectors)
+            embed_seconds.append(embedded - start)
+            search_seconds.append(time.perf_counter() - embedded)
+
+            start = time.perf_counter()
+            hits = retriever.search_many([question], k)[0]
+            e2e_seconds.append(time.perf_counter() - start)
+        all_hits.append([text for text, _ in hits])
+    result = evaluate_hits(questions, all_hits, k)
+    result.update({f"embed_{key}": value for key, value in latency_summary(embed_seconds).items()})
+    result.update({f"search_{key}": value for key, value in latency_summary(search_seconds).items()})
+    result.update({f"e2e_{key}": value for key, value in latency_summary(e2e_seconds).items()})
+    return result
+
+
+def print_report(report: dict):
+    ingest_stats = report["ingest"]
+    print(f"\n入库：{ingest_stats['chunks']} 个文本块，{ingest_stats['seconds']:.2f}s，"
+          f"{ingest_stats['chunks_per_sec']:.1f} 块/秒（向量化 {ingest_stats['embed_per_sec']:.1f}，"
+          f"写入 {ingest_stats['insert_per_sec']:.1f}）")
+    if report["peak_rss_mb"] is not None:
+        print(f"峰值内存：{report['peak_rss_mb']:.1f} MB")
+    k = report["k"]
+    print(f"\n{'检索方式':<10} {f'recall@{k}':>10} {'MRR':>8} {'embed p50/p95/p99 (ms)':>26} "
+          f"{'search p50/p95/p99 (ms)':>26} {'e2e p50/p95/p99 (ms)':>26}")
+    for name, result in report["retrieval"].items():
+        cells = [f"{result[f'{stage}_p50_ms']:.2f}/{result[f'{stage}_p95_ms']:.2f}/{result[f'{stage}_p99_ms']:.2f}"
+                 for stage in ("embed", "search", "e2e")]
+        print(f"{name:<10} {result[f'recall@{k}']:>10.3f} {result['mrr']:>8.3f} "
+              f"{cells[0]:>26} {cells[1]:>26} {cells[2]:>26}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 检索质量与延迟基准测试")
+    parser.add_argument("--embedding", choices=["default", "stub"], default="default",
+                        help="default 使用 DefaultEmbeddingFunction，stub 使用不需要下载模型的哈希向量")
+    parser.add_argument("--store", default=None, help="向量库 uri，默认使用临时目录中的本地向量库")
+    parser.add_argument("--corpus", default="./民法典节选.txt")
+    parser.add_argument("--questions", default="./rag_eval_questions.jsonl")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="每个问题重复测量的次数")
+    parser.add_argument("--json", default=None, help="把结果写入 json 文件，便于 CI 对比")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.store is None:
+        tmp_dir = tempfile.mkdtemp()
+        args.store = f"local://{tmp_dir}"
+    try:
+        collection_name = "bench_rag"
+        store = connect(args.store)
+        embedding_model = build_embedding_model(args.embedding)
+        bm25_index, ingest_stats = build_store(store, embedding_model, collection_name, args.corpus)
+
+        questions = load_questions(args.questions)
+        retriever = Retriever(store, collection_name, embedding_model)
+        report = {
+            "embedding": args.embedding,
+            "k": args.k,
+            "ingest": ingest_stats,
+            "retrieval": {
+                "vector": run_retrieval(retriever, questions, args.k, args.repeat),
+                "hybrid": run_retrieval(HybridRetriever(retriever, bm25_index), questions, args.k, args.repeat),
+            },
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+小红书文案生成模式对比：react（模型输出不合法时反馈错误、再走一轮 ReAct）与 structured
+（工具调用结束后用 response_format=json_object 直接生成最终文案），统计每个产品的模型调用次数和端到端耗时。
+
+默认使用模拟模型：
+- 第 1 轮调用 search_web 和 query_product_database，第 2 轮调用 generate_emoji，之后输出最终文案；
+- 输出最终文案时，按 --prose-rate 的概率只输出一段说明文字或字段不全的 JSON，模拟模型没按格式输出；
+- 请求带 response_format=json_object 时总是输出合法的 JSON 对象；
+- 每次调用按 首 token 延迟 + 输出 token 数 × 每 token 耗时 计算延迟。
+设置 DEEPSEEK_API_KEY 并加 --real 时调用真实的 DeepSeek 接口。
+
+用法：
+    python bench_rednote_modes.py --products 10 --prose-rate 0.3
+    python bench_rednote_modes.py --real --products 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import statistics
+import threading
+import time
+
+from openai.types.chat import ChatCompletion
+
+import rednote_agent
+from llm_client import get_client
+
+PRODUCTS = [
+    ("深海蓝藻保湿面膜", "活泼甜美"), ("美白精华", "知性"), ("无线降噪耳机", "搞怪"), ("便携咖啡机", "温柔"),
+    ("防晒喷雾", "活泼甜美"), ("机械键盘", "专业"), ("护手霜", "温柔"), ("瑜伽垫", "元气"),
+    ("香薰蜡烛", "文艺"), ("电动牙刷", "搞怪"), ("保温杯", "知性"), ("洗面奶", "活泼甜美"),
+]
+
+NOTE = {"title": "挖到宝了✨", "body": "姐妹们！" + "用了一周真的爱了，" * 40,
+        "hashtags": ["#好物分享", "#种草", "#测评", "#宝藏", "#推荐"], "emojis": ["✨", "💖", "🔥"]}
+PROSE = "好的！我已经收集到足够的信息了，这款产品主打温和不刺激、适合敏感肌，接下来我会为你写一篇活泼的小红书笔记，" * 3
+BAD_JSON = "```json\n" + json.dumps({"title": "挖到宝了✨", "body": NOTE["body"]}, ensure_ascii=False) + "\n```"
+
+
+class StubModel:
+    """
+    按对话进度返回固定剧本的模拟模型，提供 chat.completions.create 接口。
+
+    Args:
+        prose_rate (float): 输出最终文案时不按格式输出的概率。
+        first_token (float): 每次调用的首 token 延迟（秒）。
+        per_token (float): 每个输出 token 的耗时（秒）。
+    """
+
+    def __init__(self, prose_rate: float, first_token: float = 0.2, per_token: float = 0.002, seed: int = 0):
+        self.prose_rate = prose_rate
+        self.first_token = first_token
+        self.per_token = per_token
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = self
+        self.completions = self
+
+    def create(self, messages: list, response_format: dict = None, **kwargs):
+        messages = [item if isinstance(item, dict) else item.model_dump()
+                    for item in messages]
+        product = messages[1]["content"].split("产品：")[-1].split("\n")[0]
+        rounds = sum(message["role"] == "assistant" for message in messages)
+        message = {"role": "assistant", "content": None}
+        if response_format and response_format.get("type") == "json_object":
+            message["content"] = json.dumps(NOTE, ensure_ascii=False)
+        elif rounds == 0:
+            message["tool_calls"] = [
+                self._tool_call("call_0", "search_web", {"query": f"{product} 小红书趋势"}),
+                self._tool_call("call_1", "query_product_database", {"product_name": product}),
+            ]
+        elif rounds == 1:
+            message["tool_calls"] = [self._tool_call("call_2", "generate_emoji", {"context": f"{product} 好用 推荐"})]
+        else:
+            with self._lock:
+                bad = self._rng.random() < self.prose_rate
+            message["content"] = (self._rng.choice([PROSE, BAD_JSON]) if bad
+                                  else "```json\n" + json.dumps(NOTE, ensure_ascii=False, indent=2) + "\n```")
+
+        completion_tokens = len(message["content"] or "") // 2 + 30 * len(message.get("tool_calls", []))
+        time.sleep(self.first_token + completion_tokens * self.per_token)
+        return ChatCompletion.model_validate({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": kwargs.get("model", ""),
+            "choices": [{"index": 0, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                         "message": message}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": completion_tokens, "total_tokens": completion_tokens},
+        })
+
+    @staticmethod
+    def _tool_call(call_id: str, name: str, arguments: dict) -> dict:
+        return {"id": call_id, "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)}}
+
+
+class CountingClient:
+    """记录每次 chat.completions.create 调用，用于统计迭代次数。"""
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return self._client.chat.completions.create(**kwargs)
+
+
+def run_mode(mode: str, products: list, llm_client, max_iterations: int) -> dict:
+    rednote_agent.tool_cache.clear()  # 两种模式都从冷的工具缓存开始
+    iterations, seconds, ok = [], [], 0
+    for product_name, tone_style in products:
+        counting = CountingClient(llm_client)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = rednote_agent.generate_rednote(product_name, tone_style, max_iterations=max_iterations,
+                                              llm_client=counting, mode=mode)
+        seconds.append(time.perf_counter() - start)
+        iterations.append(counting.calls)
+        ok += result != "未能成功生成文案"
+    return {
+        "mode": mode,
+        "ok": ok,
+        "avg_iterations": statistics.mean(iterations),
+        "max_iterations": max(iterations),
+        "avg_seconds": statistics.mean(seconds),
+        "p50_seconds": statistics.median(seconds),
+        "max_seconds": max(seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="react 与 structured 生成模式对比")
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--max-iterations", type=int, default=5)
+    parser.add_argument("--prose-rate", type=float, default=0.3, help="模拟模型不按格式输出最终文案的概率")
+    parser.add_argument("--real", action="store_true", help="调用真实的 DeepSeek 接口（需要 DEEPSEEK_API_KEY）")
+    args = parser.parse_args()
+
+    products = [PRODUCTS[i % len(PRODUCTS)] for i in range(args.products)]
+    print(f"{'模式':<12} {'成功':>6} {'平均调用':>8} {'最多调用':>8} {'平均(s)':>8} {'p50(s)':>8} {'最慢(s)':>8}")
+    for mode in ("react", "structured"):
+        # 每种模式用相同种子的模拟模型，不按格式输出的位置相同
+        llm_client = get_client("deepseek") if args.real else StubModel(args.prose_rate)
+        result = run_mode(mode, products, llm_client, args.max_iterations)
+        print(f"{mode:<12} {result['ok']:>4}/{len(products):<2} {result['avg_iterations']:>8.2f} "
+              f"{result['max_iterations']:>8} {result['avg_seconds']:>8.2f} {result['p50_seconds']:>8.2f} "
+              f"{result['max_seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
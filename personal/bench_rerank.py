@@ -0,0 +1,66 @@
+"""
+重排序基准测试：对比不同候选数 fetch_k 和时间预算下，重排序带来的 recall@k / MRR 提升与增加的延迟。
+
+用法：
+    python bench_rerank.py --embedding stub
+    python bench_rerank.py --reranker cross-encoder --budget 200
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from bench_rag import build_embedding_model, build_store
+from rag_eval import evaluate_hits, latency_summary, load_questions
+from rag_retriever import Retriever
+from reranker import CrossEncoderReranker, LexicalOverlapReranker, RerankingRetriever
+from vector_store import connect
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重排序质量与延迟基准测试")
+    parser.add_argument("--embedding", choices=["default", "stub"], default="default")
+    parser.add_argument("--reranker", choices=["lexical", "cross-encoder"], default="lexical")
+    parser.add_argument("--budget", type=float, default=50.0, help="每个问题的重排序时间预算（毫秒）")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--corpus", default="./民法典节选.txt")
+    parser.add_argument("--questions", default="./rag_eval_questions.jsonl")
+    args = parser.parse_args()
+
+    reranker = CrossEncoderReranker() if args.reranker == "cross-encoder" else LexicalOverlapReranker()
+    questions = load_questions(args.questions)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        store = connect(f"local://{tmp_dir}")
+        embedding_model = build_embedding_model(args.embedding)
+        build_store(store, embedding_model, "bench_rerank", args.corpus)
+        retriever = Retriever(store, "bench_rerank", embedding_model)
+
+        vectors = embedding_model.encode_queries([item["question"] for item in questions])
+        baseline = retriever.search_many([item["question"] for item in questions], args.k, vectors=vectors)
+        base = evaluate_hits(questions, [[text for text, _ in hits] for hits in baseline], args.k)
+        print(f"{'方式':<22} {f'recall@{args.k}':>10} {'MRR':>8} {'增加 p50/p95 (ms)':>20} {'降级':>6}")
+        print(f"{'向量检索 top-' + str(args.k):<22} {base[f'recall@{args.k}']:>10.3f} {base['mrr']:>8.3f}")
+
+        for fetch_k in (10, 20, 50):
+            for budget in (args.budget, float("inf")):
+                reranking = RerankingRetriever(retriever, reranker, fetch_k=fetch_k, budget_ms=budget)
+                candidates = retriever.search_many([item["question"] for item in questions], fetch_k,
+                                                   with_ids=True, vectors=vectors)
+                all_hits, added = [], []
+                for item, hits in zip(questions, candidates):
+                    start = time.perf_counter()
+                    reranked = reranking.rerank(item["question"], hits)[:args.k]
+                    added.append(time.perf_counter() - start)
+                    all_hits.append([text for _, text, _ in reranked])
+                quality = evaluate_hits(questions, all_hits, args.k)
+                latency = latency_summary(added)
+                name = f"重排 fetch_k={fetch_k} " + ("无预算" if budget == float("inf") else f"{budget:g}ms")
+                print(f"{name:<22} {quality[f'recall@{args.k}']:>10.3f} {quality['mrr']:>8.3f} "
+                      f"{latency['p50_ms']:>9.2f}/{latency['p95_ms']:<9.2f} {reranking.stats()['degraded']:>6}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+BM25 倒排索引，与向量库使用同一批文本块和同一套 id（rag_manifest.chunk_id）。
+
+- 分词：连续汉字切成二元组（单个汉字保留为一元），英文单词转小写，数字串整体保留。
+  "第一千零六十二条" 这类条文编号会被切成一串二元组，可以精确命中；
+- 倒排表采用 CSR 形式的数组存储：offsets[t]..offsets[t+1] 是词项 t 的倒排区间，
+  docs / tfs 分别是 int32 文档序号和 uint16 词频，整个索引只有几个 NumPy 数组。
+"""
+import json
+import os
+import re
+from array import array
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from rag_manifest import chunk_id
+
+_TERM = re.compile(r"[㐀-䶿一-鿿]+|[A-Za-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """把文本切成检索用的词项。"""
+    tokens = []
+    for match in _TERM.finditer(text):
+        word = match.group()
+        if word.isascii():
+            tokens.append(word.lower())
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class BM25Builder:
+    """流式构建 BM25 索引：用 track 包装文本块生成器，文本块流过时顺便建索引。"""
+
+    def __init__(self):
+        self.vocab = {}
+        self._terms = array("i")
+        self._docs = array("i")
+        self._tfs = array("H")
+        self._doc_lens = array("i")
+        self._doc_ids = array("q")
+        self._seen = set()
+
+    def add(self, doc_id: int, text: str):
+        if doc_id in self._seen:
+            return
+        self._seen.add(doc_id)
+        doc = len(self._doc_ids)
+        tokens = tokenize(text)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            self._terms.append(self.vocab.setdefault(token, len(self.vocab)))
+            self._docs.append(doc)
+            self._tfs.append(min(tf, 65535))
+        self._doc_lens.append(len(tokens))
+        self._doc_ids.append(doc_id)
+
+    def track(self, texts: Iterable[str]) -> Iterator[str]:
+        """原样产出 texts，同时把每个文本块加入索引。"""
+        for text in texts:
+            self.add(chunk_id(text), text)
+            yield text
+
+    def build(self) -> "BM25Index":
+        terms = np.frombuffer(self._terms, dtype=np.int32)
+        order = np.argsort(terms, kind="stable")  # 同一词项内保持文档顺序
+        offsets = np.searchsorted(terms[order], np.arange(len(self.vocab) + 1)).astype(np.int64)
+        return BM25Index(
+            vocab=self.vocab,
+            offsets=offsets,
+            docs=np.frombuffer(self._docs, dtype=np.int32)[order],
+            tfs=np.frombuffer(self._tfs, dtype=np.uint16)[order],
+            doc_lens=np.frombuffer(self._doc_lens, dtype=np.int32).copy(),
+            doc_ids=np.frombuffer(self._doc_ids, dtype=np.int64).copy(),
+        )
+
+
+class BM25Index:
+    """
+    Args:
+        k1 (float): 词频饱和参数。
+        b (float): 文档长度归一化参数。
+    """
+
+    def __init__(self, vocab: dict, offsets, docs, tfs, doc_lens, doc_ids, k1: float = 1.2, b: float = 0.75):
+        self.vocab = vocab
+        self.offsets, self.docs, self.tfs = offsets, docs, tfs
+        self.doc_lens, self.doc_ids = doc_lens, doc_ids
+        self.k1, self.b = k1, b
+        self.avg_len = float(doc_lens.mean()) if len(doc_lens) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """返回按 BM25 分数降序排列的 [(文本块 id, 分数), ...]，没有任何词项命中时返回空列表。"""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        n = len(self.doc_ids)
+        for token in set(tokenize(query)):
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs, tfs = self.docs[start:end], self.tfs[start:end].astype(np.float32)
+            idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lens[docs] / self.avg_len)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        hits = np.flatnonzero(scores)
+        if len(hits) == 0:
+            return []
+        top = hits[np.argsort(-scores[hits], kind="stable")[:limit]]
+        return [(int(self.doc_ids[doc]), float(scores[doc])) for doc in top]
+
+    def save(self, path: str):
+        """保存为 <path>.npz（倒排数组）和 <path>.vocab.json（词表）。"""
+        np.savez(path + ".npz", offsets=self.offsets, docs=self.docs, tfs=self.tfs,
+                 doc_lens=self.doc_lens, doc_ids=self.doc_ids)
+        with open(path + ".vocab.json", "w", encoding="utf-8") as file:
+            json.dump(self.vocab, file, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str):
+        """加载索引，文件不存在时返回 None。"""
+        if not os.path.exists(path + ".npz"):
+            return None
+        arrays = np.load(path + ".npz")
+        with open(path + ".vocab.json", "r", encoding="utf-8") as file:
+            vocab = json.load(file)
+        return cls(vocab, arrays["offsets"], arrays["docs"], arrays["tfs"], arrays["doc_lens"], arrays["doc_ids"])
@@ -0,0 +1,135 @@
+"""
+共享连接池基准测试：在本地 HTTPS 模拟服务器上，对比原来每次请求新建 httpx.AsyncClient 与 http_pool 共享客户端的耗时。
+
+模拟服务器提供 NWS 的 /points 和 /gridpoints 两个接口，get_forecast 的一次调用就是先后请求这两个接口。
+本机回环几乎没有网络延迟，用 --rtt 模拟往返时延：每个新连接在握手阶段等待 2 个 RTT（TCP + TLS），每个请求等待 1 个 RTT。
+模拟服务器只支持 HTTP/1.1，共享客户端通过 ALPN 协商后使用 HTTP/1.1 keep-alive。
+
+用法：
+    python bench_http_pool.py --calls 50 --rtt 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from http_pool import create_http_client
+
+
+def make_certificate(directory: str) -> tuple:
+    """用 openssl 生成 127.0.0.1 的自签名证书，返回 (证书, 私钥) 路径。"""
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                    "-keyout", key, "-out", cert], check=True, capture_output=True)
+    return cert, key
+
+
+def start_stub_server(cert: str, key: str, rtt: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持 keep-alive
+        disable_nagle_algorithm = True  # 响应头和正文分两次写，避免 Nagle 与延迟确认叠加出 40ms 的等待
+
+        def setup(self):
+            time.sleep(2 * rtt)  # 新连接的 TCP + TLS 握手
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(rtt)
+            port = self.server.server_address[1]
+            if self.path.startswith("/points/"):
+                body = {"properties": {"forecast": f"https://127.0.0.1:{port}/gridpoints/TOP/31,80/forecast"}}
+            else:
+                body = {"properties": {"periods": [{"name": "Tonight", "temperature": 60, "temperatureUnit": "F",
+                                                    "windSpeed": "5 mph", "windDirection": "S",
+                                                    "detailedForecast": "Clear."}] * 5}}
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/geo+json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def forecast(get, base_url: str, latitude: float, longitude: float):
+    """与 weather.get_forecast 相同的两步请求。"""
+    points = await get(f"{base_url}/points/{latitude},{longitude}")
+    return await get(points["properties"]["forecast"])
+
+
+async def run(get, base_url: str, calls: int, concurrent: bool) -> list:
+    async def timed(i):
+        start = time.perf_counter()
+        await forecast(get, base_url, 39.0 + i / 100, -95.0)
+        return time.perf_counter() - start
+
+    if concurrent:
+        return await asyncio.gather(*(timed(i) for i in range(calls)))
+    return [await timed(i) for i in range(calls)]
+
+
+async def main_async(args):
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        server = start_stub_server(cert, key, args.rtt / 1000)
+        base_url = f"https://127.0.0.1:{server.server_address[1]}"
+
+        async def per_request_get(url):
+            # 原来的 make_nws_request：每次请求新建客户端（和 SSL 上下文）
+            async with httpx.AsyncClient(verify=ssl.create_default_context(cafile=cert)) as client:
+                response = await client.get(url, timeout=30.0)
+                response.raise_for_status()
+                return response.json()
+
+        shared = create_http_client(verify=ssl.create_default_context(cafile=cert))
+
+        async def pooled_get(url):
+            response = await shared.get(url)
+            response.raise_for_status()
+            return response.json()
+
+        print(f"RTT {args.rtt}ms，{args.calls} 次 get_forecast（每次 2 个请求）")
+        print(f"{'方式':<22} {'平均(ms)':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'总耗时(s)':>10}")
+        try:
+            for concurrent in (False, True):
+                for name, get in (("每次新建客户端", per_request_get), ("共享连接池", pooled_get)):
+                    start = time.perf_counter()
+                    seconds = sorted(await run(get, base_url, args.calls, concurrent))
+                    total = time.perf_counter() - start
+                    label = f"{name}{'（并发）' if concurrent else ''}"
+                    print(f"{label:<22} {statistics.mean(seconds) * 1000:>10.1f} "
+                          f"{statistics.median(seconds) * 1000:>10.1f} "
+                          f"{seconds[int(0.95 * (len(seconds) - 1))] * 1000:>10.1f} {total:>10.2f}")
+        finally:
+            await shared.aclose()
+            server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="每次新建客户端与共享连接池的延迟对比")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--rtt", type=float, default=20.0, help="模拟的网络往返时延（毫秒）")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
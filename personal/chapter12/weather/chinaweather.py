@@ -1,14 +1,28 @@
 from typing import Any
 import asyncio
+import json
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from http_cache import CachePolicy, HTTPResponseCache
+from http_pool import AppContext, bounded_gather, http_client_lifespan
 from settings import GD_API_BASE,GD_API_KEY
 
+# 高德天气响应缓存：实况天气缓存 5 分钟，预报天气缓存 30 分钟；响应带 Cache-Control / Expires 时按响应头，但不超过上限
+amap_cache = HTTPResponseCache(policies={
+    "amap_base": CachePolicy(ttl=300, max_ttl=600),
+    "amap_all": CachePolicy(ttl=1800, max_ttl=3600),
+})
+
+# 批量查询同时进行的请求数，以及单次批量查询的最大城市数
+BATCH_CONCURRENCY = 8
+MAX_BATCH_SIZE = 50
+
 # 创建一个名为 "chinaweather" 的服务器实例
-mcp = FastMCP("chinaweather")
+# 服务器启动时创建一个共享的 httpx.AsyncClient（HTTP/2 + keep-alive 连接池），所有工具调用复用它的连接，退出时关闭
+mcp = FastMCP("chinaweather", lifespan=http_client_lifespan(amap_cache))
 
 @mcp.tool()
-async def get_weather(city: str, extensions: str = 'base',timeout:float  = 30.0) -> dict:
+async def get_weather(city: str, ctx: Context, extensions: str = 'base',timeout:float  = 30.0) -> dict:
     """
     异步获取高德天气API数据
     
@@ -16,11 +30,17 @@ async def get_weather(city: str, extensions: str = 'base',timeout:float  = 30.0)
         api_key: 高德开放平台的API Key
         city: 城市编码或城市名称，如："110101" 或 "北京"
         extensions: 返回结果类型，'base'返回实况天气，'all'返回预报天气
+        timeout: 本次请求的超时（秒）
     
     Returns:
         天气数据的字典,请求失败时返回None
     """
     
+    return await fetch_weather(ctx.request_context.lifespan_context, city, extensions, timeout)
+
+
+async def fetch_weather(app: AppContext, city: str, extensions: str = 'base', timeout: float = 30.0) -> dict:
+    """查询一个城市的天气，get_weather 和 get_weather_batch 共用，请求失败时返回None。"""
     params = {
         'key': GD_API_KEY,
         'city': city,
@@ -28,16 +48,12 @@ async def get_weather(city: str, extensions: str = 'base',timeout:float  = 30.0)
         'output': 'JSON'
     }
     
+    # 使用 lifespan 中创建的共享客户端和响应缓存，复用已经建立的连接
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            
-            # 发起GET请求，获取天气数据
-            response = await client.get(GD_API_BASE, params=params)
-
-            # 检查HTTP状态码，非正常响应则抛出异常
-            response.raise_for_status()
-
-            return response.json()
+        # 命中缓存时直接返回，否则发起GET请求，获取天气数据；非正常的HTTP状态码会抛出异常
+        # 高德在 key 错误、超出配额等情况下也返回 200，status 不为 "1" 的结果不缓存
+        return await app.cache.get_json(app.http_client, GD_API_BASE, f"amap_{extensions}", params=params,
+                                        cacheable=lambda data: data.get("status") == "1", timeout=timeout)
     except httpx.HTTPStatusError as e:
         print(f"HTTP错误: {e.response.status_code} - {e.response.text}")
     except httpx.RequestError as e:
@@ -47,6 +63,48 @@ async def get_weather(city: str, extensions: str = 'base',timeout:float  = 30.0)
     return None
 
 
+@mcp.tool()
+async def get_weather_batch(cities: list[str], ctx: Context, extensions: str = 'base', timeout: float = 30.0) -> dict:
+    """
+    一次获取多个城市的高德天气数据，各城市并发查询，结果汇总返回。
+    需要多个城市的天气时，使用这个工具代替多次调用 get_weather。
+
+    Args:
+        cities: 城市编码或城市名称列表，如：["110101", "上海", "广州"]，最多 50 个
+        extensions: 返回结果类型，'base'返回实况天气，'all'返回预报天气
+        timeout: 每个请求的超时（秒）
+
+    Returns:
+        城市 -> 天气数据的字典，某个城市查询失败时该城市的值为 {"error": 错误信息}，不影响其他城市
+    """
+    # 去掉重复的城市，保留输入顺序
+    cities = list(dict.fromkeys(cities))
+    if len(cities) > MAX_BATCH_SIZE:
+        return {"error": f"一次最多查询 {MAX_BATCH_SIZE} 个城市，当前为 {len(cities)} 个，请分批查询"}
+
+    app = ctx.request_context.lifespan_context
+    results = await bounded_gather(lambda city: fetch_weather(app, city, extensions, timeout), cities,
+                                   BATCH_CONCURRENCY)
+    weather = {}
+    for city, result in zip(cities, results):
+        if isinstance(result, BaseException):
+            weather[city] = {"error": f"{type(result).__name__}: {result}"}
+        elif result is None:
+            weather[city] = {"error": "请求失败"}
+        elif result.get("status") != "1":
+            # 高德的业务错误（key 错误、超出配额、城市不存在等）也返回 HTTP 200
+            weather[city] = {"error": result.get("info", "查询失败"), "infocode": result.get("infocode")}
+        else:
+            weather[city] = result
+    return weather
+
+
+@mcp.resource("cache://stats")
+def cache_stats() -> str:
+    """高德天气响应缓存的命中率和耗时统计（按实况 / 预报分组）。"""
+    return json.dumps(amap_cache.stats(), ensure_ascii=False, indent=2)
+
+
 if __name__ == "__main__":
     mcp.run(transport='stdio')
     # weather_data = asyncio.get_event_loop().run_until_complete(get_weather(city="北京"))
@@ -0,0 +1,204 @@
+"""
+天气 MCP 服务器的 HTTP 响应缓存。
+
+每类请求（kind）有自己的缓存策略 CachePolicy：
+- NWS 的 /points 网格点映射几乎不会变化，固定缓存 30 天并保存到磁盘，重启服务器后仍然有效；
+- 预报、预警和高德天气只缓存几分钟：响应带 Cache-Control（max-age / s-maxage，扣除 Age）或 Expires 时按它们计算有效期，
+  no-store / no-cache 不缓存，没有这些响应头时使用策略中的默认 TTL，最长不超过 max_ttl；
+- 同一时间多个相同请求只发出一次：请求在单独的 Task 中执行，所有调用（包括发起的那个）都通过 asyncio.shield 等待它，
+  任何一个调用被取消都不会取消共享的请求，其余调用照常拿到结果；
+- 请求失败不缓存，失败会传给所有等待的调用。
+
+stats() 按 kind 统计命中、未命中、合并的请求数以及各自的平均耗时。
+"""
+import asyncio
+import email.utils
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import httpx
+
+
+@dataclass
+class CachePolicy:
+    """
+    Args:
+        ttl (float): 默认有效期（秒），为 0 时不缓存。
+        max_ttl (float): 按响应头计算的有效期上限，None 表示不限制。
+        use_headers (bool): 是否按 Cache-Control / Expires 计算有效期。
+        persist (bool): 是否保存到磁盘。
+    """
+    ttl: float
+    max_ttl: float = None
+    use_headers: bool = True
+    persist: bool = False
+
+
+def ttl_from_headers(headers, now: float = None):
+    """
+    按 Cache-Control / Expires 计算响应的剩余有效期（秒），没有相关响应头时返回 None。
+    """
+    directives = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip().strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(0.0, float(directives[name]) - float(headers.get("age", 0)))
+            except ValueError:
+                return 0.0
+
+    expires = headers.get("expires")
+    if expires is None:
+        return None
+    try:
+        expires_at = email.utils.parsedate_to_datetime(expires).timestamp()
+    except (TypeError, ValueError):
+        return 0.0  # 无法解析的 Expires 视为已经过期
+    # 以服务器的 Date 为基准，避免本机时钟偏差
+    date = headers.get("date")
+    try:
+        now = email.utils.parsedate_to_datetime(date).timestamp() if date else (now or time.time())
+    except (TypeError, ValueError):
+        now = now or time.time()
+    return max(0.0, expires_at - now)
+
+
+def cache_key(url: str, params: dict = None) -> str:
+    return str(httpx.URL(url, params=params)) if params else url
+
+
+class HTTPResponseCache:
+    """
+    Args:
+        policies (dict): kind -> CachePolicy。
+        default_policy (CachePolicy): 没有单独配置的 kind 使用的策略。
+        max_entries (int): 内存中的条目上限，超过时按 LRU 淘汰。
+        path (str): 磁盘缓存文件，只保存 persist=True 的条目；为 None 时不落盘。
+    """
+
+    def __init__(self, policies: dict = None, default_policy: CachePolicy = None, max_entries: int = 1024,
+                 path: str = None):
+        self.policies = dict(policies or {})
+        self.default_policy = default_policy or CachePolicy(ttl=300)
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()  # key -> (kind, 过期时间, 数据)
+        self._inflight = {}  # key -> 正在执行的请求 Task
+        self.counters = {}
+        if path and os.path.exists(path):
+            now = time.time()
+            with open(path, "r", encoding="utf-8") as file:
+                for key, kind, expires_at, data in json.load(file):
+                    if expires_at > now:
+                        self._entries[key] = (kind, expires_at, data)
+
+    def _record(self, kind: str, field: str, start: float):
+        counters = self.counters.setdefault(kind, {"hits": 0, "misses": 0, "coalesced": 0, "hits_seconds": 0.0,
+                                                   "misses_seconds": 0.0, "coalesced_seconds": 0.0})
+        counters[field] += 1
+        counters[field + "_seconds"] += time.perf_counter() - start
+
+    async def get_json(self, client: httpx.AsyncClient, url: str, kind: str, params: dict = None,
+                       cacheable=None, **request_kwargs):
+        """
+        GET 请求并返回解析后的 JSON，命中缓存时不发请求。
+
+        Args:
+            client (httpx.AsyncClient): 发请求使用的共享客户端。
+            url (str): 请求地址。
+            kind (str): 请求类别，决定缓存策略和统计分组。
+            params (dict): 查询参数，参与缓存键。
+            cacheable: 可选的判断函数，接收解析后的数据，返回 False 时不缓存（例如业务状态码表示失败）。
+            **request_kwargs: 透传给 client.get，例如 timeout。
+
+        Raises:
+            httpx.HTTPError 等请求或解析时的异常，不会被缓存。
+        """
+        start = time.perf_counter()
+        key = cache_key(url, params)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.time():
+            self._entries.move_to_end(key)
+            self._record(kind, "hits", start)
+            return entry[2]
+
+        task = self._inflight.get(key)
+        field = "coalesced"
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(client, url, key, kind, params, cacheable, request_kwargs))
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self._inflight[key] = task
+            field = "misses"
+        # shield：调用被取消时只取消这次等待，共享的请求继续执行
+        data = await asyncio.shield(task)
+        self._record(kind, field, start)
+        return data
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str, key: str, kind: str, params: dict, cacheable,
+                     request_kwargs: dict):
+        response = await client.get(url, params=params, **request_kwargs)
+        response.raise_for_status()
+        data = response.json()
+        self._store(key, kind, data, response.headers, cacheable)
+        return data
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 所有等待者都已取消时也标记为已读取，避免 "exception was never retrieved" 警告
+
+    def _store(self, key: str, kind: str, data, headers, cacheable):
+        policy = self.policies.get(kind, self.default_policy)
+        ttl = policy.ttl
+        if policy.use_headers:
+            header_ttl = ttl_from_headers(headers)
+            if header_ttl is not None:
+                ttl = header_ttl
+        if policy.max_ttl is not None:
+            ttl = min(ttl, policy.max_ttl)
+        if ttl <= 0 or (cacheable is not None and not cacheable(data)):
+            return
+        self._entries[key] = (kind, time.time() + ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if policy.persist:
+            self.save()  # 需要持久化的条目很少新增，新增时立即落盘
+
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        persistent = {kind for kind, policy in self.policies.items() if policy.persist}
+        rows = [[key, kind, expires_at, data] for key, (kind, expires_at, data) in self._entries.items()
+                if kind in persistent and expires_at > now]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(rows, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        result = {}
+        for kind, counters in self.counters.items():
+            total = counters["hits"] + counters["misses"] + counters["coalesced"]
+            result[kind] = {
+                "hits": counters["hits"],
+                "misses": counters["misses"],
+                "coalesced": counters["coalesced"],
+                # 合并的请求没有单独发出请求，也算作命中
+                "hit_rate": (counters["hits"] + counters["coalesced"]) / total,
+            }
+            # 命中、实际请求、等待合并请求各自的平均耗时
+            for field, name in (("hits", "avg_hit_ms"), ("misses", "avg_fetch_ms"), ("coalesced", "avg_coalesced_ms")):
+                result[kind][name] = counters[field + "_seconds"] / counters[field] * 1000 if counters[field] else None
+        result["entries"] = len(self._entries)
+        return result
@@ -0,0 +1,95 @@
+"""
+weather.py 和 chinaweather.py 共用的长连接 httpx.AsyncClient。
+
+原来每次工具调用都新建一个 httpx.AsyncClient，每个请求都要重新建立 TCP + TLS 连接，get_forecast 连续两次请求就握手两次。
+现在服务器启动时（FastMCP 的 lifespan）创建一个客户端，所有工具调用共用它的连接池：
+- 开启 HTTP/2（需要安装 h2，没有安装时退回 HTTP/1.1 keep-alive），同一连接上可以并发多个请求；
+- 限制最大连接数和 keep-alive 连接数，空闲连接超过 keepalive_expiry 秒后关闭；
+- 服务器退出时关闭客户端，释放连接；配置了响应缓存时一并保存缓存。
+
+bounded_gather 供批量工具使用：多个查询在同一个客户端上并发执行，用信号量限制同时进行的数量。
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import httpx
+
+from http_cache import HTTPResponseCache
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def create_http_client(max_connections: int = 20, max_keepalive_connections: int = 10,
+                       keepalive_expiry: float = 30.0, timeout: float = 30.0, connect_timeout: float = 10.0,
+                       http2: bool = True, **kwargs) -> httpx.AsyncClient:
+    """
+    创建带连接池的 httpx.AsyncClient。
+
+    Args:
+        max_connections (int): 最大连接数。
+        max_keepalive_connections (int): 保持的空闲连接数。
+        keepalive_expiry (float): 空闲连接保留的秒数。
+        timeout (float): 默认的读写超时（秒），单次请求可以用 timeout 参数覆盖。
+        connect_timeout (float): 建立连接的超时（秒）。
+        http2 (bool): 是否启用 HTTP/2，未安装 h2 时忽略。
+        **kwargs: 透传给 httpx.AsyncClient，例如 headers、base_url。
+    """
+    return httpx.AsyncClient(
+        http2=http2 and HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                            keepalive_expiry=keepalive_expiry),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        **kwargs,
+    )
+
+
+@dataclass
+class AppContext:
+    """lifespan 中创建的共享资源，工具中通过 ctx.request_context.lifespan_context 取得。"""
+    http_client: httpx.AsyncClient
+    cache: HTTPResponseCache = None
+
+
+def http_client_lifespan(cache: HTTPResponseCache = None, **client_kwargs):
+    """
+    返回 FastMCP 的 lifespan：服务器启动时创建共享客户端，退出时关闭客户端并保存缓存。
+
+    Args:
+        cache (HTTPResponseCache): 工具共用的响应缓存，放入 AppContext。
+        **client_kwargs: 透传给 create_http_client。
+
+    用法：
+        mcp = FastMCP("weather", lifespan=http_client_lifespan(cache, headers={...}))
+    """
+    @asynccontextmanager
+    async def lifespan(server):
+        http_client = create_http_client(**client_kwargs)
+        try:
+            yield AppContext(http_client=http_client, cache=cache)
+        finally:
+            await http_client.aclose()
+            if cache is not None:
+                cache.save()
+
+    return lifespan
+
+
+async def bounded_gather(fn, items: list, limit: int = 8) -> list:
+    """
+    对 items 中的每一项并发执行 await fn(item)，最多同时执行 limit 个，结果与 items 顺序一致。
+
+    某一项抛出异常时，该位置的结果就是这个异常对象，不影响其他项（与 asyncio.gather(return_exceptions=True) 相同）。
+    单项被取消时结果是 asyncio.CancelledError，它是 BaseException 而不是 Exception，调用方应按 BaseException 判断。
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
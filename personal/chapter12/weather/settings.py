@@ -1,7 +1,12 @@
+import os
+
 # 高德天气
 GD_API_BASE = "https://restapi.amap.com/v3/weather/weatherInfo"
 GD_API_KEY  = "your api key"
 
 # 美国国家气象局 (NWS) API 的基础 URL 和请求头
 NWS_API_BASE = "https://api.weather.gov"
-NWS_USER_AGENT = "weather-app/1.0"
\ No newline at end of file
+NWS_USER_AGENT = "weather-app/1.0"
+
+# NWS 网格点映射的磁盘缓存文件，默认放在本目录，设置 NWS_POINTS_CACHE 环境变量可以改到其他位置
+NWS_POINTS_CACHE = os.getenv("NWS_POINTS_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".nws_points_cache.json"))
\ No newline at end of file
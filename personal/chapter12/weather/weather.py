@@ -1,40 +1,61 @@
+import json
 from typing import Any
 import httpx
-from mcp.server.fastmcp import FastMCP
-from settings import NWS_API_BASE, NWS_USER_AGENT
+from mcp.server.fastmcp import Context, FastMCP
+from http_cache import CachePolicy, HTTPResponseCache
+from pydantic import BaseModel
+from http_pool import AppContext, bounded_gather, http_client_lifespan
+from settings import NWS_API_BASE, NWS_USER_AGENT, NWS_POINTS_CACHE
+
+# NWS 响应缓存：网格点映射几乎不变，缓存 30 天并保存到磁盘；预报和预警上游几分钟更新一次，
+# 按响应的 Cache-Control / Expires 缓存，最长 10 分钟（预警 2 分钟），没有相关响应头时使用默认 TTL
+nws_cache = HTTPResponseCache(
+    policies={
+        "points": CachePolicy(ttl=30 * 86400, use_headers=False, persist=True),
+        "forecast": CachePolicy(ttl=300, max_ttl=600),
+        "alerts": CachePolicy(ttl=60, max_ttl=120),
+    },
+    path=NWS_POINTS_CACHE,
+)
+
+# 批量工具同时进行的查询数（每个查询内部的请求仍然是串行的），以及单次批量查询的最大数量
+BATCH_CONCURRENCY = 8
+MAX_BATCH_SIZE = 50
 
 # 初始化 FastMCP 服务器，创建"weather" 实例
-mcp = FastMCP("weather")
+# 服务器启动时创建一个共享的 httpx.AsyncClient（HTTP/2 + keep-alive 连接池），所有工具调用复用它的连接，退出时关闭并保存缓存
+mcp = FastMCP("weather", lifespan=http_client_lifespan(
+    nws_cache,
+    headers={
+        "User-Agent": NWS_USER_AGENT,
+        "Accept": "application/geo+json"
+    },
+    timeout=30.0,
+))
 
-async def make_nws_request(url: str) -> dict[str, Any] | None:
+async def make_nws_request(app: AppContext, url: str, kind: str) -> dict[str, Any] | None:
     """
     一个通用的异步函数，用于向 NWS API 发起请求并处理常见的错误。
 
     Args:
+        app (AppContext): lifespan 中创建的共享客户端和响应缓存，请求头和超时在创建客户端时已经设置。
         url (str): 要请求的完整 URL。
+        kind (str): 请求类别（points / forecast / alerts），决定缓存策略。
 
     Returns:
         dict[str, Any] | None: 成功时返回解析后的 JSON 字典，失败时返回 None。
     """
-    headers = {
-        "User-Agent": NWS_USER_AGENT,
-        "Accept": "application/geo+json"
-    }
-    
-    # 使用 httpx.AsyncClient 来执行异步 HTTP GET 请求
-    async with httpx.AsyncClient() as client:
-        try:
-            # 发起请求，设置了30秒的超时
-            response = await client.get(url, headers=headers, timeout=30.0)
-            
-            # 如果响应状态码是 4xx 或 5xx（表示客户端或服务器错误），则会引发一个异常
-            response.raise_for_status()
-
-            # 如果请求成功，返回 JSON 格式的响应体
-            return response.json()
-        except Exception:
-            # 捕获所有可能的异常（如网络问题、超时、HTTP错误等），并返回 None
-            return None
+    try:
+        # 命中缓存时直接返回；未命中时复用连接池中已经建立的连接发起请求，
+        # 如果响应状态码是 4xx 或 5xx（表示客户端或服务器错误），则会引发一个异常，失败的响应不会被缓存
+        return await app.cache.get_json(app.http_client, url, kind)
+    except Exception:
+        # 捕获所有可能的异常（如网络问题、超时、HTTP错误等），并返回 None
+        return None
+
+def get_app_context(ctx: Context) -> AppContext:
+    """取得 lifespan 中创建的共享客户端和响应缓存。"""
+    return ctx.request_context.lifespan_context
 
 def format_alert(feature: dict) -> str:
     
@@ -51,19 +72,12 @@ def format_alert(feature: dict) -> str:
 指令: {props.get('instruction', '无具体指令')}
 """
 
-@mcp.tool()
-async def get_alerts(state: str) -> str:
-    """
-    获取美国某个州当前生效的天气预警信息。
-    这个函数被 @mcp.tool() 装饰器标记，意味着它可以被大模型作为工具来调用。
-
-    参数:
-        state: 两个字母的美国州代码 (例如: CA, NY)。
-    """
+async def fetch_alerts(app: AppContext, state: str) -> str:
+    """查询一个州的天气预警，get_alerts 和 get_alerts_batch 共用。"""
 
     # 构造请求特定州天气预警的 URL
     url = f"{NWS_API_BASE}/alerts/active/area/{state}"
-    data = await make_nws_request(url)
+    data = await make_nws_request(app, url, "alerts")
 
     # 健壮性检查：如果请求失败或返回的数据格式不正确
     if not data or "features" not in data:
@@ -79,20 +93,13 @@ async def get_alerts(state: str) -> str:
     # 将所有预警信息用分隔线连接成一个字符串并返回
     return "\n---\n".join(alerts)
 
-@mcp.tool()
-async def get_forecast(latitude: float, longitude: float) -> str:
-    """
-    根据给定的经纬度获取天气预报。
-    同样，这个函数也是一个可被调用的 MCP 工具。
-
-    参数:
-        latitude: 地点的纬度
-        longitude: 地点的经度
-    """
-    # NWS API 获取预报需要两步
+async def fetch_forecast(app: AppContext, latitude: float, longitude: float) -> str:
+    """查询一个地点的天气预报，get_forecast 和 get_forecast_batch 共用。"""
+    # NWS API 获取预报需要两步，两次请求复用同一个连接
     # 第一步：根据经纬度获取一个包含具体预报接口 URL 的网格点信息
-    points_url = f"{NWS_API_BASE}/points/{latitude},{longitude}"
-    points_data = await make_nws_request(points_url)
+    # NWS 只接受最多 4 位小数的坐标，按 4 位小数取整，同一地点的不同写法共用一条网格点缓存
+    points_url = f"{NWS_API_BASE}/points/{latitude:.4f},{longitude:.4f}"
+    points_data = await make_nws_request(app, points_url, "points")
 
     if not points_data:
         return "无法获取该地点的预报数据。"
@@ -101,7 +108,7 @@ async def get_forecast(latitude: float, longitude: float) -> str:
     forecast_url = points_data["properties"]["forecast"]
     
     # 第三步：请求详细的天气预报数据
-    forecast_data = await make_nws_request(forecast_url)
+    forecast_data = await make_nws_request(app, forecast_url, "forecast")
 
     if not forecast_data:
         return "无法获取详细的预报信息。"
@@ -123,6 +130,96 @@ async def get_forecast(latitude: float, longitude: float) -> str:
     # 将格式化后的预报信息连接成一个字符串并返回
     return "\n---\n".join(forecasts)
 
+async def run_batch(items: list, fetch, label) -> str:
+    """
+    并发执行批量查询，最多同时 BATCH_CONCURRENCY 个，把每一项的结果按输入顺序汇总成一个字符串。
+
+    某一项失败时只在该项下给出错误信息，其他项照常返回。
+
+    Args:
+        items (list): 待查询的项。
+        fetch: 异步函数，接收一项，返回该项的结果字符串。
+        label: 函数，接收一项，返回该项在汇总结果中的标题。
+    """
+    if len(items) > MAX_BATCH_SIZE:
+        return f"一次最多查询 {MAX_BATCH_SIZE} 项，当前为 {len(items)} 项，请分批查询。"
+
+    results = await bounded_gather(fetch, items, BATCH_CONCURRENCY)
+    sections = []
+    for item, result in zip(items, results):
+        if isinstance(result, BaseException):
+            result = f"查询失败：{type(result).__name__}: {result}"
+        sections.append(f"### {label(item)}\n{result}")
+    return "\n\n".join(sections)
+
+class Location(BaseModel):
+    """批量预报中的一个地点。"""
+    latitude: float
+    longitude: float
+
+@mcp.tool()
+async def get_alerts(state: str, ctx: Context) -> str:
+    """
+    获取美国某个州当前生效的天气预警信息。
+    这个函数被 @mcp.tool() 装饰器标记，意味着它可以被大模型作为工具来调用。
+
+    参数:
+        state: 两个字母的美国州代码 (例如: CA, NY)。
+    """
+    return await fetch_alerts(get_app_context(ctx), state)
+
+@mcp.tool()
+async def get_forecast(latitude: float, longitude: float, ctx: Context) -> str:
+    """
+    根据给定的经纬度获取天气预报。
+    同样，这个函数也是一个可被调用的 MCP 工具。
+
+    参数:
+        latitude: 地点的纬度
+        longitude: 地点的经度
+    """
+    return await fetch_forecast(get_app_context(ctx), latitude, longitude)
+
+@mcp.tool()
+async def get_alerts_batch(states: list[str], ctx: Context) -> str:
+    """
+    一次获取多个美国州当前生效的天气预警信息，各州并发查询，结果按输入顺序汇总。
+    需要多个州的预警时，使用这个工具代替多次调用 get_alerts。
+
+    参数:
+        states: 两个字母的美国州代码列表 (例如: ["CA", "NY", "TX"])，最多 50 个。
+    """
+    app = get_app_context(ctx)
+    # 去掉重复的州代码，保留输入顺序
+    states = list(dict.fromkeys(state.strip().upper() for state in states))
+    return await run_batch(states, lambda state: fetch_alerts(app, state), lambda state: state)
+
+@mcp.tool()
+async def get_forecast_batch(locations: list[Location], ctx: Context) -> str:
+    """
+    一次获取多个地点的天气预报，各地点并发查询，结果按输入顺序汇总。
+    需要多个地点的预报时，使用这个工具代替多次调用 get_forecast。
+
+    参数:
+        locations: 地点列表，每个地点包含 latitude（纬度）和 longitude（经度），最多 50 个。
+    """
+    app = get_app_context(ctx)
+    # 去掉重复的地点，保留输入顺序；按请求 NWS 时使用的 4 位小数坐标判断，写法不同的同一地点只查询一次
+    unique = {}
+    for location in locations:
+        unique.setdefault(f"{location.latitude:.4f},{location.longitude:.4f}", location)
+    return await run_batch(
+        list(unique),
+        lambda key: fetch_forecast(app, unique[key].latitude, unique[key].longitude),
+        lambda key: key,
+    )
+
+
+@mcp.resource("cache://stats")
+def cache_stats() -> str:
+    """NWS 响应缓存的命中率和耗时统计（按 points / forecast / alerts 分组）。"""
+    return json.dumps(nws_cache.stats(), ensure_ascii=False, indent=2)
+
 
 if __name__ == "__main__":
     # 初始化并运行 MCP 服务器
@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 import json
 from langchain.agents import AgentExecutor, create_openai_functions_agent
@@ -9,12 +10,21 @@ from langchain_core.tools import Tool
 
 BASE_URL =  os.getenv("HUAWEICLOUD_BASEURL", "default_value")
 
-# 初始化 LLM
+# 与 personal 下的脚本共用带连接池、重试退避和指标的客户端
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_client import get_client
+
+llm_client = get_client("ollama", read_timeout=600)
+
+# 初始化 LLM，请求经由 llm_client 发出；重试由 llm_client 负责，关闭 LangChain 自带的重试
 llm = ChatOpenAI(
     model="deepseek-r1:8b",
     openai_api_base=f"{BASE_URL}/v1",
     openai_api_key="ollama",
     temperature=0.7,
+    client=llm_client.chat.completions,
+    root_client=llm_client.openai,
+    max_retries=0,
 )
 
 # 模拟工具实现
@@ -47,11 +57,26 @@ def generate_emoji(context: str) -> str:
         return "😍 💖 💯 🛍️"
     return "✨ 🔥 💖"
 
+# 工具结果缓存与 personal/rednote.py 共用同一个实现
+from json_extract import extract_rednote
+from tool_cache import ToolResultCache
+
+tool_cache = ToolResultCache(
+    ttls={"search_web": 600, "query_product_database": 86400, "generate_emoji": 0},
+    max_entries=2048,
+    path=os.getenv("REDNOTE_TOOL_CACHE"),
+)
+available_tools = tool_cache.wrap_tools({
+    "search_web": search_web,
+    "query_product_database": query_product_database,
+    "generate_emoji": generate_emoji,
+})
+
 # 构造工具列表
 tools = [
-    Tool.from_function(search_web, name="search_web", description="搜索实时热门趋势"),
-    Tool.from_function(query_product_database, name="query_product_database", description="查询产品数据库信息"),
-    Tool.from_function(generate_emoji, name="generate_emoji", description="生成表情符号"),
+    Tool.from_function(available_tools["search_web"], name="search_web", description="搜索实时热门趋势"),
+    Tool.from_function(available_tools["query_product_database"], name="query_product_database", description="查询产品数据库信息"),
+    Tool.from_function(available_tools["generate_emoji"], name="generate_emoji", description="生成表情符号"),
 ]
 
 # Prompt 定义
@@ -82,18 +107,13 @@ agent = create_openai_functions_agent(llm=llm, tools=tools, prompt=prompt)
 agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
 
 import json
-import re
 
 def extract_json_from_text(text: str) -> dict:
-    try:
-        # 提取首个 JSON 块
-        match = re.search(r'\{[\s\S]*\}', text)
-        if match:
-            return json.loads(match.group())
-        else:
-            raise ValueError("未找到合法 JSON 内容")
-    except Exception as e:
-        return {"error": f"解析JSON失败: {e}"}
+    # 单遍扫描：跳过 <think> 推理过程，取第一个完整且字段合法的文案 JSON（优先 ```json 代码块）
+    data, error = extract_rednote(text)
+    if data is None:
+        return {"error": f"解析JSON失败: {error}"}
+    return data
 
 def generate_rednote(product_name: str, style: str = "活泼甜美") -> dict:
     
@@ -130,5 +150,9 @@ if __name__ == "__main__":
             print("\n--- JSON格式 ---")
             print(json.dumps(result, indent=2, ensure_ascii=False))
 
+            tool_cache.save()
+            print(f"\n工具缓存：{tool_cache.stats()}")
+            print(f"LLM 调用：{llm_client.metrics.summary()}")
+
         except Exception as e:
             print(f"发生错误: {str(e)}")
@@ -0,0 +1,172 @@
+"""
+持久化的向量缓存，包装 pymilvus 的 DefaultEmbeddingFunction 等向量模型。
+
+缓存以 (模型 id, 规范化文本) 为键：
+- 向量存放在内存映射的 float32 矩阵文件 <model_id>.f32 中，每行一个向量；
+- 索引（键 -> 行号，按 LRU 顺序排列）和向量维度存放在 <model_id>.meta.json 中；
+- 每一行当前存放的是哪个键记录在内存映射文件 <model_id>.keys 中（每行 20 字节的 SHA-1）。
+
+淘汰条目时行会被立即复用，而索引只在 save() 时写入。进程在两者之间退出时，磁盘上的旧索引会指向已经存放了
+其他文本向量的行；读取时核对该行记录的键，不一致就当作未命中重新编码，不会返回错误的向量。
+
+重复入库或重复提问时直接读缓存，完全不调用模型；模型只在第一次未命中时才加载。
+"""
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：NFKC 统一全半角，合并连续空白，去掉首尾空白。"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class CachedEmbeddingFunction:
+    """
+    带磁盘缓存的向量模型，提供与 DefaultEmbeddingFunction 相同的
+    encode_documents / encode_queries 接口。
+
+    Args:
+        model_factory: 无参可调用对象，返回向量模型，例如 milvus_model.DefaultEmbeddingFunction。
+        model_id (str): 模型标识，不同模型的缓存互不干扰。
+        cache_dir (str): 缓存目录。
+        capacity (int): 最多缓存的向量条数，超出后淘汰最久未使用的条目。
+    """
+
+    def __init__(self, model_factory, model_id: str, cache_dir: str = "./.embedding_cache",
+                 capacity: int = 200_000):
+        self.model_factory = model_factory
+        self.model_id = model_id
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._matrix = None
+        self._dim = None
+        self._index = OrderedDict()  # 键 -> 矩阵行号，越靠后越近被使用
+        self._free_slots = []  # 索引过期后空出来的行
+        self._next_slot = 0  # 从未使用过的第一行
+
+        os.makedirs(cache_dir, exist_ok=True)
+        safe_id = re.sub(r"[^\w.-]", "_", model_id)
+        self._matrix_path = os.path.join(cache_dir, f"{safe_id}.f32")
+        self._meta_path = os.path.join(cache_dir, f"{safe_id}.meta.json")
+        self._keys_path = os.path.join(cache_dir, f"{safe_id}.keys")
+        self._keys = None
+
+        if os.path.exists(self._meta_path) and os.path.exists(self._matrix_path):
+            with open(self._meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+            self._dim = meta["dim"]
+            self.capacity = meta["capacity"]
+            self._index = OrderedDict(meta["index"])
+            self._next_slot = max(self._index.values()) + 1 if self._index else 0
+            upgrade = not os.path.exists(self._keys_path)
+            self._open_matrix("r+")
+            if upgrade:
+                # 旧版本的缓存没有行键文件，按现有索引补写
+                for key, slot in self._index.items():
+                    self._keys[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+
+    @property
+    def model(self):
+        """首次未命中时才加载模型。"""
+        if self._model is None:
+            self._model = self.model_factory()
+        return self._model
+
+    @property
+    def dim(self) -> int:
+        """向量维度，优先读取缓存元数据，只有第一次建缓存时才调用模型探测。"""
+        if self._dim is None:
+            self._dim = len(self.model.encode_queries(["This is a test"])[0])
+            self._open_matrix("w+")
+        return self._dim
+
+    def _open_matrix(self, mode: str):
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode=mode,
+                                 shape=(self.capacity, self._dim))
+        keys_mode = mode if os.path.exists(self._keys_path) else "w+"
+        self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode=keys_mode, shape=(self.capacity, 20))
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha1(f"{kind}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _allocate_slot(self) -> int:
+        """分配一个矩阵行号：优先使用空出来的行和未使用过的行，缓存已满时淘汰最久未使用的条目并复用它的行。"""
+        if self._free_slots:
+            return self._free_slots.pop()
+        if self._next_slot < self.capacity:
+            self._next_slot += 1
+            return self._next_slot - 1
+        _, slot = self._index.popitem(last=False)
+        return slot
+
+    def _encode(self, kind: str, texts: list) -> list:
+        dim = self.dim
+        keys = [self._key(kind, text) for text in texts]
+        results = [None] * len(texts)
+
+        missing = {}  # 键 -> 该键在 texts 中的位置列表，同一批里的重复文本只编码一次
+        for i, key in enumerate(keys):
+            slot = self._index.get(key)
+            if slot is not None and self._keys[slot].tobytes() != bytes.fromhex(key):
+                # 该行已被其他文本复用（上次淘汰后没有来得及 save），索引过期
+                del self._index[key]
+                self._free_slots.append(slot)  # 该行现在的向量不属于任何索引中的键，可以复用
+                slot = None
+            if slot is None:
+                missing.setdefault(key, []).append(i)
+                continue
+            self._index.move_to_end(key)
+            results[i] = np.array(self._matrix[slot])
+            self.hits += 1
+
+        if missing:
+            self.misses += sum(len(positions) for positions in missing.values())
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            encode = self.model.encode_queries if kind == "query" else self.model.encode_documents
+            for (key, positions), vector in zip(missing.items(), encode(miss_texts)):
+                vector = np.asarray(vector, dtype=np.float32).reshape(dim)
+                slot = self._allocate_slot()
+                # 先清掉行键再写向量，最后写入新的行键，任何时刻中断都不会出现键与向量不匹配
+                self._keys[slot] = 0
+                self._matrix[slot] = vector
+                self._keys[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                self._index[key] = slot
+                for i in positions:
+                    results[i] = vector
+        return results
+
+    def encode_documents(self, documents: list) -> list:
+        return self._encode("doc", documents)
+
+    def encode_queries(self, queries: list) -> list:
+        return self._encode("query", queries)
+
+    def save(self):
+        """把矩阵刷回磁盘，并原子地写入索引和元数据。"""
+        if self._matrix is None:
+            return
+        self._matrix.flush()
+        self._keys.flush()
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"model_id": self.model_id, "dim": self._dim, "capacity": self.capacity,
+                       "index": list(self._index.items())}, file)
+        os.replace(tmp_path, self._meta_path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._index),
+            "capacity": self.capacity,
+        }
@@ -1,31 +1,26 @@
-import os
-from openai import OpenAI
+import time
 
-# 从环境变量获取 DeepSeek API Key
-api_key = os.getenv("DEEPSEEK_API_KEY")
-if not api_key:
-    raise ValueError("请设置 DEEPSEEK_API_KEY 环境变量")
+from llm_client import get_client
+from prompt_cache import PromptCacheStats, PromptPrefix
 
-# 初始化 OpenAI 客户端（假设 DeepSeek 的 API 兼容 OpenAI 格式）
-client = OpenAI(
-    api_key=api_key,
-    base_url="https://api.deepseek.com/v1",  # DeepSeek API 的基地址
-)
+# 共享的 DeepSeek 客户端（从环境变量 DEEPSEEK_API_KEY 获取 API Key）；生成整个 HTML 耗时较长，读取超时放宽到 5 分钟
+client = get_client("deepseek", read_timeout=300)
 
-# 定义提示词
+# 定义提示词；system 提示词作为固定前缀，重复运行时可以命中 DeepSeek 的上下文缓存
+GOBANG_PROMPT = PromptPrefix("你是一个专业的 Web 开发助手，擅长用 HTML/CSS/JavaScript 编写游戏。")
 prompt = """请帮我用 HTML 生成一个五子棋游戏，所有代码都保存在一个 HTML 中。"""
+prompt_cache_stats = PromptCacheStats()
 
 try:
     # 调用 DeepSeek Chat API
-    response = client.chat.completions.create(
+    start = time.perf_counter()
+    response = client.chat.completions.create(**GOBANG_PROMPT.request(
+        GOBANG_PROMPT.messages(prompt),
         model="deepseek-chat",  # 或 DeepSeek 提供的其他模型名称
-        messages=[
-            {"role": "system", "content": "你是一个专业的 Web 开发助手，擅长用 HTML/CSS/JavaScript 编写游戏。"},
-            {"role": "user", "content": prompt}
-        ],
         temperature=0.7,
         stream=False
-    )
+    ))
+    prompt_cache_stats.record(response.usage, time.perf_counter() - start)
 
     # 提取生成的 HTML 内容
     if response.choices and len(response.choices) > 0:
@@ -35,6 +30,8 @@ try:
         with open("gobang.html", "w", encoding="utf-8") as f:
             f.write(html_content)
         print("五子棋游戏已保存为 gobang.html")
+        print(f"上下文缓存：{prompt_cache_stats.stats()}")
+        print(f"LLM 调用：{client.metrics.summary()}")
     else:
         print("未收到有效响应")
 
@@ -0,0 +1,185 @@
+"""
+ReAct 对话历史压缩：每轮调用模型前生成一份压缩后的 messages，完整历史保持不变。
+
+DeepSeek 的上下文缓存按请求前缀逐字节匹配，所以压缩只向后推进、不回头改写：
+除最近 keep_recent 轮以外的工具调用轮次，每攒满 chunk_rounds 轮就压缩成一段并固定下来，
+之后每次请求都原样发送这些已经压缩的消息，前缀在各轮迭代之间保持不变。每一段按顺序执行：
+1. 与之前某次工具结果重复（同一个工具、内容相同）的结果替换为指向那次调用的引用；
+2. 其余工具结果截断到 observation_chars 个字符；
+3. 助手回复（例如 JSON 解析失败的回复）和要求修正的 user 消息截断到 observation_chars 个字符。
+最近的轮次和尚未攒满一段的轮次中，工具结果原样发送；助手回复和修正消息除了最后一条以外同样截断，
+一条消息一旦不是最后一条，截断后的内容就不再变化，固定下来时也保持相同。
+
+估算的 token 数仍然超过 max_prompt_tokens 时：
+1. 从最早的一段开始把已固定的工具结果换成占位说明，被引用的结果除外，被省略的结果之后不会恢复；
+2. 仍然超出时，从最早的开始把尚未固定的工具结果先截断到 observation_chars 个字符，再换成占位说明。
+
+工具结果只替换内容、不删除消息，保证每个 tool_call_id 都有对应的 tool 消息，符合接口要求。
+"""
+from token_utils import estimate_tokens
+
+OMITTED_OBSERVATION = "（早期观察结果已省略）"
+
+
+def _as_dict(message) -> dict:
+    """messages 里既有 dict，也有 SDK 返回的 ChatCompletionMessage。"""
+    if isinstance(message, dict):
+        return dict(message)
+    return message.model_dump(exclude_none=True)
+
+
+def message_tokens(message: dict) -> int:
+    tokens = 4 + estimate_tokens(message.get("content") or "")  # 4 个 token 近似每条消息的角色和分隔符开销
+    for tool_call in message.get("tool_calls") or []:
+        tokens += estimate_tokens(tool_call["function"]["name"] + tool_call["function"]["arguments"])
+    return tokens
+
+
+def count_tokens(messages: list) -> int:
+    return sum(message_tokens(_as_dict(message)) for message in messages)
+
+
+def _truncate(content: str, max_chars: int) -> str:
+    if len(content) <= max_chars:
+        return content
+    return content[:max_chars] + f"……（已截断，原文 {len(content)} 字）"
+
+
+class HistoryCompactor:
+    """
+    一次 ReAct 对话的历史压缩器，记住已经压缩的前缀，每轮迭代调用 compact。
+
+    Args:
+        max_prompt_tokens (int): 压缩后 messages 的估算 token 上限。
+        keep_recent (int): 最近几轮工具调用的结果保持原样。
+        observation_chars (int): 较早的工具结果和助手回复保留的字符数。
+        chunk_rounds (int): 每次固定下来的轮数。越大前缀改变得越少，但较早的结果要多原样发送几轮。
+    """
+
+    def __init__(self, max_prompt_tokens: int = 3000, keep_recent: int = 1, observation_chars: int = 200,
+                 chunk_rounds: int = 2):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.keep_recent = keep_recent
+        self.observation_chars = observation_chars
+        self.chunk_rounds = max(1, chunk_rounds)
+        self._compacted = []  # 已经固定的压缩后消息，对应完整历史的前 len(self._compacted) 条
+        self._tool_names = {}  # tool_call_id -> 工具名
+        self._seen = {}  # (工具名, 原始结果) -> 第一次得到该结果的 tool_call_id
+        self._referenced = set()  # 被引用的 tool_call_id，不会被省略
+
+    def compact(self, messages: list) -> list:
+        """
+        Args:
+            messages (list): 完整的对话历史，开头是 system 和 user 消息，每轮只在末尾追加。
+
+        Returns:
+            list: 压缩后的 messages（新的 dict 列表），可以直接传给 chat.completions.create。
+        """
+        history = [_as_dict(message) for message in messages]
+        if len(history) < len(self._compacted):
+            self.__init__(self.max_prompt_tokens, self.keep_recent, self.observation_chars, self.chunk_rounds)
+
+        # 第一条助手消息之前是 system 和任务说明，之后的 user 消息都是要求修正的反馈
+        head = next((i for i, message in enumerate(history) if message["role"] == "assistant"), len(history))
+        # 每一轮从带 tool_calls 的助手消息开始；固定的轮数只按 chunk_rounds 的整数倍增长
+        rounds = [i for i, message in enumerate(history) if message.get("tool_calls")]
+        frozen_rounds = max(0, len(rounds) - max(0, self.keep_recent)) // self.chunk_rounds * self.chunk_rounds
+        if frozen_rounds == 0:
+            boundary = 0  # 还没有可以固定的轮次（例如没有调用过工具），全部原样发送
+        else:
+            boundary = rounds[frozen_rounds] if frozen_rounds < len(rounds) else len(history)
+        for i in range(len(self._compacted), boundary):
+            self._compacted.append(self._compact_message(history[i], i >= head))
+
+        start = len(self._compacted)
+        for i in range(max(start, head), len(history) - 1):
+            # 未固定部分中除最后一条以外的助手回复和修正消息，与固定时的截断方式相同
+            if history[i]["role"] in ("assistant", "user") and history[i].get("content"):
+                history[i]["content"] = _truncate(history[i]["content"], self.observation_chars)
+        compacted = [dict(message) for message in self._compacted] + history[start:]
+
+        # 仍然超出预算时，从最早的一段开始省略工具结果，并记在已固定的前缀里
+        total = count_tokens(compacted)
+        for i, message in enumerate(self._compacted):
+            if total <= self.max_prompt_tokens:
+                break
+            if message["role"] == "tool" and message["content"] != OMITTED_OBSERVATION \
+                    and message["tool_call_id"] not in self._referenced:
+                before = message_tokens(message)
+                message["content"] = OMITTED_OBSERVATION
+                compacted[i] = dict(message)
+                total -= before - message_tokens(message)
+
+        # 仍然超出时，从最早的开始压缩尚未固定的工具结果：先截断，再省略
+        for shrink in (lambda content: _truncate(content, self.observation_chars), lambda _: OMITTED_OBSERVATION):
+            for message in compacted[start:]:
+                if total <= self.max_prompt_tokens:
+                    return compacted
+                if message["role"] == "tool":
+                    before = message_tokens(message)
+                    message["content"] = shrink(message["content"])
+                    total -= before - message_tokens(message)
+        return compacted
+
+    def _compact_message(self, message: dict, after_head: bool) -> dict:
+        for tool_call in message.get("tool_calls") or []:
+            self._tool_names[tool_call["id"]] = tool_call["function"]["name"]
+        if message["role"] == "tool":
+            key = (self._tool_names.get(message["tool_call_id"], ""), message["content"])
+            first = self._seen.setdefault(key, message["tool_call_id"])
+            reference = f"（与之前工具调用 {first} 的结果相同，已省略）"
+            if first != message["tool_call_id"] and len(reference) < len(message["content"]):
+                message["content"] = reference
+                self._referenced.add(first)
+            else:
+                message["content"] = _truncate(message["content"], self.observation_chars)
+        elif message.get("content") and (message["role"] == "assistant" or (message["role"] == "user" and after_head)):
+            message["content"] = _truncate(message["content"], self.observation_chars)
+        return message
+
+
+def compact_messages(messages: list, max_prompt_tokens: int = 3000, keep_recent: int = 1,
+                     observation_chars: int = 200) -> list:
+    """
+    一次性压缩 messages，不需要跨轮保持前缀时使用（例如估算压缩效果），参数同 HistoryCompactor。
+
+    每轮迭代都要压缩时应使用同一个 HistoryCompactor，已经压缩的前缀才会保持不变。
+    """
+    return HistoryCompactor(max_prompt_tokens, keep_recent, observation_chars, chunk_rounds=1).compact(messages)
+
+
+class TokenReport:
+    """记录每轮调用的 token 用量：完整历史与压缩后的估算值，以及接口返回的实际用量。"""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, iteration: int, full_messages: list, sent_messages: list, usage=None):
+        self.rows.append({
+            "iteration": iteration,
+            "full_tokens": count_tokens(full_messages),
+            "sent_tokens": count_tokens(sent_messages),
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "cache_hit_tokens": getattr(usage, "prompt_cache_hit_tokens", None),
+        })
+
+    def print_row(self):
+        row = self.rows[-1]
+        actual = "" if row["prompt_tokens"] is None else \
+            f"，实际 prompt {row['prompt_tokens']} / completion {row['completion_tokens']}"
+        if row["cache_hit_tokens"] is not None:
+            actual += f"（上下文缓存命中 {row['cache_hit_tokens']}）"
+        print(f"[Token] 第 {row['iteration']} 轮：完整历史约 {row['full_tokens']}，压缩后约 {row['sent_tokens']}{actual}")
+
+    def print_summary(self):
+        if not self.rows:
+            return
+        full = sum(row["full_tokens"] for row in self.rows)
+        sent = sum(row["sent_tokens"] for row in self.rows)
+        summary = f"[Token] 共 {len(self.rows)} 轮，估算 prompt token {full} -> {sent}（节省 {1 - sent / full:.0%}）"
+        if any(row["prompt_tokens"] is not None for row in self.rows):
+            prompt = sum(row["prompt_tokens"] or 0 for row in self.rows)
+            completion = sum(row["completion_tokens"] or 0 for row in self.rows)
+            summary += f"，实际 prompt {prompt} / completion {completion}"
+        print(summary)
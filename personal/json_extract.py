@@ -0,0 +1,222 @@
+"""
+从模型输出中增量提取 JSON 对象，rednote.py 和 chapter6/rednotelangchain.py 共用。
+
+IncrementalJSONExtractor 每次 feed 一段新收到的文本，只扫描这段新文本，整体是单遍线性扫描：
+- 可选地跳过 deepseek-r1 输出开头的 <think>...</think> 推理过程；
+- 要求代码块时先找 ```json 的开头，否则直接找第一个 {；
+- 按大括号深度找对象的结尾，字符串里的括号和转义字符不计入深度；
+- { 之后的第一个非空白字符不是 " 或 } 时（例如前言里的“注意使用 { 号开头的格式：”），它不可能是 JSON 对象，
+  从下一个字符重新查找，不会被这个落单的 { 卡住；
+- 对象一闭合就解析，解析失败或不符合 validator 时，依次尝试其中已经闭合的嵌套对象，再接着找下一个对象；
+  输入结束时仍未闭合的对象同样回退到其中已经闭合的嵌套对象，返回第一个完整且合法的对象。
+
+不像贪婪正则 \\{.*\\} 那样在大量括号上回溯，也不会把多个对象连同中间的文字当成一个对象。
+"""
+import json
+
+FENCE = "```json"
+THINK_START = "<think>"
+THINK_END = "</think>"
+
+
+def validate_rednote(data) -> list:
+    """检查小红书文案的字段，返回错误列表，合法时为空列表。"""
+    if not isinstance(data, dict):
+        return [f"文案应为 JSON 对象，实际为 {type(data).__name__}"]
+    errors = []
+    for field in ("title", "body"):
+        if not isinstance(data.get(field), str) or not data[field].strip():
+            errors.append(f"字段 {field} 应为非空字符串")
+    for field in ("hashtags", "emojis"):
+        if not isinstance(data.get(field), list) or not all(isinstance(item, str) for item in data[field]):
+            errors.append(f"字段 {field} 应为字符串列表")
+    return errors
+
+
+class IncrementalJSONExtractor:
+    """
+    Args:
+        require_fence (bool): True 时只提取 ```json 代码块中的对象；False 时提取文本中的 JSON 对象。
+        validator: 可选的校验函数，接收解析后的对象、返回错误列表；有错误时跳过该对象继续查找。
+        skip_think (bool): 输出以 <think> 开头时，忽略 </think> 之前的推理内容。
+    """
+
+    def __init__(self, require_fence: bool = True, validator=None, skip_think: bool = True):
+        self.require_fence = require_fence
+        self.validator = validator
+        self.result = None
+        self.error = None  # 最近一次找到完整对象但解析或校验失败的原因
+        self._search_state = "fence" if require_fence else "start"
+        self._state = "head" if skip_think else self._search_state
+        self._head = ""  # 判断输出是否以 <think> 开头时暂存的开头文本
+        self._tail = ""  # 查找标记时保留的末尾几个字符，防止标记被切在两段之间
+        self._parts = []  # 当前候选对象的文本（从它的 { 开始）
+        self._length = 0  # 当前候选对象已经扫描的字符数
+        self._stack = []  # 尚未闭合的 { 在候选对象中的位置，开头不合法的嵌套对象记为 None
+        self._spans = []  # 候选对象中已经闭合的嵌套对象 (开始, 结束)
+        self._expect_key = False  # 刚遇到 {，下一个非空白字符应该是 " 或 }
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str):
+        """输入新收到的一段文本，找到合法对象时返回解析结果，否则返回 None。"""
+        if self.result is not None or not chunk:
+            return self.result
+
+        pos = 0
+        while pos < len(chunk):
+            if self._state == "head":
+                self._head += chunk[pos:]
+                head = self._head.lstrip()
+                if len(head) < len(THINK_START) and THINK_START.startswith(head):
+                    return None  # 还不能确定是否以 <think> 开头
+                self._state = "think" if head.startswith(THINK_START) else self._search_state
+                # 暂存的开头文本重新按新状态处理
+                chunk, pos, self._head = self._head, 0, ""
+            elif self._state in ("think", "fence"):
+                marker = THINK_END if self._state == "think" else FENCE
+                found = self._find_marker(chunk, pos, marker)
+                if found < 0:
+                    return None
+                pos = found
+                # <think> 结束后开始查找代码块或对象；代码块开头之后紧接着应该是对象
+                self._state = self._search_state if self._state == "think" else "start"
+            elif self._state == "start":
+                # 代码块开头之后只允许空白，下一个非空白字符必须是 {；不要求代码块时跳过 { 之前的任何文本
+                while pos < len(chunk) and chunk[pos] != "{":
+                    if self.require_fence and not chunk[pos].isspace():
+                        self._state = "fence"
+                        break
+                    pos += 1
+                else:
+                    if pos < len(chunk):
+                        self._state = "object"
+                        self._parts, self._length, self._stack, self._spans = [], 0, [], []
+                        self._expect_key = self._in_string = self._escape = False
+            else:
+                end, closed = self._scan(chunk, pos)
+                if end < 0:
+                    self._parts.append(chunk[pos:])
+                    self._length += len(chunk) - pos
+                    return None
+                self._state = self._search_state
+                if not closed:
+                    # 最外层的 { 不是 JSON 对象的开头，从当前字符重新查找
+                    pos = end
+                    continue
+                self._parts.append(chunk[pos:end])
+                pos = end
+                if self._accept("".join(self._parts)) or self._accept_nested():
+                    return self.result
+        return None
+
+    def close(self):
+        """输入结束。文本短到还没判断完是否以 <think> 开头时，按普通文本处理暂存的内容。"""
+        if self._state == "head" and self.result is None:
+            self._state, head, self._head = self._search_state, self._head, ""
+            return self.feed(head)
+        if self._state == "object" and self.result is None:
+            # 候选对象到结尾也没有闭合（例如前面有一个落单的 {），退回其中已经闭合的嵌套对象
+            self._state = self._search_state
+            self._accept_nested()
+        return self.result
+
+    def _find_marker(self, chunk: str, pos: int, marker: str) -> int:
+        """在 chunk[pos:] 中查找 marker（可能跨越上一段末尾），找到时返回 marker 之后的位置，否则返回 -1。"""
+        text = self._tail + chunk[pos:]
+        index = text.find(marker)
+        if index < 0:
+            self._tail = text[-(len(marker) - 1):]
+            return -1
+        found = pos + index + len(marker) - len(self._tail)
+        self._tail = ""
+        return found
+
+    def _accept_nested(self) -> bool:
+        """按开始位置依次尝试候选对象中已经闭合的嵌套对象，外层的对象优先。"""
+        text = "".join(self._parts)
+        error = self.error
+        for start, end in sorted(self._spans):
+            if self._accept(text[start:end]):
+                return True
+        self.error = error  # 报告外层对象的错误，而不是某个嵌套片段的
+        return False
+
+    def _accept(self, text: str) -> bool:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            # 括号配平但内容不合法，继续找下一个对象
+            self.error = f"JSON 解析失败：{e}"
+            return False
+        errors = self.validator(data) if self.validator else []
+        if errors:
+            self.error = "；".join(errors)
+            return False
+        self.result = data
+        return True
+
+    def _scan(self, chunk: str, pos: int):
+        """
+        从 pos 开始扫描候选对象。
+
+        Returns:
+            tuple: (位置, 是否闭合)。对象闭合时返回 (右大括号之后的位置, True)；
+                   最外层的 { 之后不是合法的对象开头时返回 (该字符的位置, False)；需要更多输入时返回 (-1, False)。
+        """
+        stack, spans = self._stack, self._spans
+        in_string, escape, expect_key = self._in_string, self._escape, self._expect_key
+        offset = self._length - pos  # chunk[i] 在候选对象中的位置为 offset + i
+        for i in range(pos, len(chunk)):
+            char = chunk[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif char == "\\":
+                    escape = True
+                elif char == '"':
+                    in_string = False
+                continue
+            if expect_key:
+                if char.isspace():
+                    continue
+                expect_key = False
+                if char != '"' and char != "}":
+                    if len(stack) == 1:
+                        return i, False
+                    stack[-1] = None
+            if char == '"':
+                in_string = True
+            elif char == "{":
+                stack.append(offset + i)
+                expect_key = True
+            elif char == "}":
+                start = stack.pop()
+                if not stack:
+                    return i + 1, True
+                if start is not None:
+                    spans.append((start, offset + i + 1))
+        self._in_string, self._escape, self._expect_key = in_string, escape, expect_key
+        return -1, False
+
+
+def extract_json(text: str, require_fence: bool = False, validator=None, skip_think: bool = True):
+    """
+    从完整文本中提取第一个完整且合法的 JSON 对象。
+
+    Returns:
+        tuple: (对象, 错误信息)。找到时错误信息为 None；没找到时对象为 None。
+    """
+    extractor = IncrementalJSONExtractor(require_fence, validator, skip_think)
+    extractor.feed(text)
+    if extractor.close() is not None:
+        return extractor.result, None
+    return None, extractor.error or "未找到 JSON 对象"
+
+
+def extract_rednote(text: str):
+    """优先取 ```json 代码块中的文案，没有合法代码块时再找正文中的 JSON 对象，返回 (文案, 错误信息)。"""
+    data, error = extract_json(text, require_fence=True, validator=validate_rednote)
+    if data is None:
+        data, error = extract_json(text, require_fence=False, validator=validate_rednote)
+    return data, error
@@ -0,0 +1,285 @@
+"""
+共享的 LLM 客户端：各脚本通过 get_client 取得同一个带连接池的客户端，不再各自在 import 时创建 OpenAI(...)。
+
+- 底层是一个 keep-alive 的 httpx 连接池，连接、读取超时可配置；
+- 429 和 5xx、连接错误、超时会按带随机抖动的指数退避重试，响应带 Retry-After 时按它等待；
+  收到 429 后整个客户端进入冷却，所有并发调用都等冷却结束再发请求；
+- 连续失败达到阈值时断路器打开，冷却期内的调用直接抛出 CircuitOpenError，冷却结束后放一个请求试探；
+- 每次调用记录耗时、token 用量、重试次数和结果，metrics.summary() 汇总。
+
+LLMClient 提供与 OpenAI 客户端相同的 client.chat.completions.create(...) 接口，原有调用代码不用修改。
+流式调用在流结束或被关闭时记录指标。
+"""
+import os
+import random
+import threading
+import time
+
+import httpx
+import openai
+from openai import OpenAI
+
+# 预置的服务端配置：名称 -> (base_url, API Key 环境变量 / 固定值)
+PROVIDERS = {
+    "deepseek": lambda: ("https://api.deepseek.com/v1", os.getenv("DEEPSEEK_API_KEY")),
+    # Ollama 不需要真实 API Key
+    "ollama": lambda: (f"{os.getenv('HUAWEICLOUD_BASEURL', 'default_value')}/v1", "ollama"),
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """断路器打开期间发起的调用。"""
+
+
+class CircuitBreaker:
+    """
+    Args:
+        failure_threshold (int): 连续失败多少次后打开断路器。
+        reset_timeout (float): 打开后多少秒允许一个试探请求通过。
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                raise CircuitOpenError(f"LLM 服务连续失败 {self._failures} 次，断路器已打开，请稍后重试")
+            self._probing = True  # 半开状态只放一个试探请求
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self):
+        """调用结束但结果不计入断路器（例如 4xx）：不改变失败计数和状态，只放开半开状态的试探名额。"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+def _percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class LLMMetrics:
+    """每次调用一条记录：模型、耗时、prompt/completion token、重试次数、是否成功。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = []
+
+    def record(self, model: str, seconds: float, usage=None, retries: int = 0, ok: bool = True, stream: bool = False):
+        with self._lock:
+            self.calls.append({
+                "model": model,
+                "seconds": seconds,
+                "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                "completion_tokens": getattr(usage, "completion_tokens", None),
+                "retries": retries,
+                "ok": ok,
+                "stream": stream,
+            })
+
+    def summary(self) -> dict:
+        with self._lock:
+            calls = list(self.calls)
+        if not calls:
+            return {"calls": 0}
+        seconds = [call["seconds"] for call in calls]
+        return {
+            "calls": len(calls),
+            "failed": sum(not call["ok"] for call in calls),
+            "retries": sum(call["retries"] for call in calls),
+            "prompt_tokens": sum(call["prompt_tokens"] or 0 for call in calls),
+            "completion_tokens": sum(call["completion_tokens"] or 0 for call in calls),
+            "p50_ms": _percentile(seconds, 50) * 1000,
+            "p95_ms": _percentile(seconds, 95) * 1000,
+            "max_ms": max(seconds) * 1000,
+        }
+
+
+class _MeteredStream:
+    """包装流式响应：透传每个 chunk，流结束或被关闭时记录指标（usage 来自最后一个 chunk）。"""
+
+    def __init__(self, stream, on_finish):
+        self._stream = stream
+        self._on_finish = on_finish
+        self._usage = None
+        self._finished = False
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                self._usage = getattr(chunk, "usage", None) or self._usage
+                yield chunk
+        finally:
+            self._finish()
+
+    def _finish(self):
+        if not self._finished:
+            self._finished = True
+            self._on_finish(self._usage)
+
+    def close(self):
+        self._stream.close()
+        self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LLMClient:
+    """
+    Args:
+        base_url (str): OpenAI 兼容接口的地址。
+        api_key (str): API Key。
+        max_connections (int): 连接池最大连接数，同时也是 keep-alive 连接数。
+        connect_timeout (float): 建立连接的超时（秒）。
+        read_timeout (float): 等待响应的超时（秒），长文本生成需要调大。
+        max_retries (int): 可重试错误的最大重试次数。
+        base_delay (float): 第一次重试前的退避上限（秒），之后每次翻倍。
+        max_delay (float): 单次退避的上限（秒）。
+        breaker (CircuitBreaker): 断路器，默认连续 5 次失败后打开 30 秒。
+    """
+
+    RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError,
+                        openai.APIConnectionError, openai.APITimeoutError)
+
+    def __init__(self, base_url: str, api_key: str, max_connections: int = 16, connect_timeout: float = 10.0,
+                 read_timeout: float = 120.0, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 breaker: CircuitBreaker = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = LLMMetrics()
+        self._cooldown_lock = threading.Lock()
+        self._resume_at = 0.0
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        # 重试由本类负责，关闭 SDK 自带的重试，避免两层重试叠加
+        self.openai = OpenAI(api_key=api_key, base_url=base_url, http_client=self.http_client, max_retries=0)
+        self.chat = _Chat(self)
+
+    def _backoff(self, attempt: int, error) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return min(self.max_delay, float(retry_after))
+        except (TypeError, ValueError):
+            # full jitter：在 [0, base * 2^attempt] 之间随机，避免并发调用同时重试
+            return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _wait_cooldown(self):
+        with self._cooldown_lock:
+            wait = self._resume_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def create_chat_completion(self, **kwargs):
+        """带重试、断路器和指标的 chat.completions.create。"""
+        model = kwargs.get("model", "")
+        stream = bool(kwargs.get("stream"))
+        self.breaker.before_call()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            self._wait_cooldown()
+            try:
+                response = self.openai.chat.completions.create(**kwargs)
+                break
+            except self.RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    self.metrics.record(model, time.perf_counter() - start, retries=attempt, ok=False, stream=stream)
+                    raise
+                delay = self._backoff(attempt, e)
+                if isinstance(e, openai.RateLimitError):
+                    with self._cooldown_lock:
+                        self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                print(f"[LLM] {type(e).__name__}，{delay:.1f}s 后第 {attempt + 1} 次重试")
+                time.sleep(delay)
+                attempt += 1
+            except Exception:
+                # 4xx 等请求本身的问题不重试，也不计入断路器；若这是半开状态的试探请求，放开名额让下一个请求试探
+                self.breaker.release()
+                self.metrics.record(model, time.perf_counter() - start, retries=attempt, ok=False, stream=stream)
+                raise
+
+        self.breaker.record_success()
+        if stream:
+            return _MeteredStream(response, lambda usage: self.metrics.record(
+                model, time.perf_counter() - start, usage, attempt, stream=True))
+        self.metrics.record(model, time.perf_counter() - start, getattr(response, "usage", None), attempt)
+        return response
+
+    def close(self):
+        self.http_client.close()
+
+
+class _Chat:
+    def __init__(self, client: LLMClient):
+        self.completions = _Completions(client)
+
+
+class _Completions:
+    def __init__(self, client: LLMClient):
+        self._client = client
+
+    def create(self, **kwargs):
+        return self._client.create_chat_completion(**kwargs)
+
+
+def create_client(provider: str = "deepseek", **kwargs) -> LLMClient:
+    """创建 provider 对应的独立客户端（自己的连接池和指标），kwargs 透传给 LLMClient。"""
+    base_url, api_key = PROVIDERS[provider]()
+    if not api_key:
+        raise ValueError(f"请设置 {provider.upper()}_API_KEY 环境变量")
+    return LLMClient(base_url, api_key, **kwargs)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider: str = "deepseek", **kwargs) -> LLMClient:
+    """
+    返回 provider 对应的共享客户端，同一进程内多次调用得到同一个实例（第一次调用时的 kwargs 生效）。
+
+    Args:
+        provider (str): PROVIDERS 中的名称。
+        **kwargs: 透传给 LLMClient，例如 max_connections、read_timeout、max_retries。
+    """
+    with _clients_lock:
+        if provider not in _clients:
+            _clients[provider] = create_client(provider, **kwargs)
+        return _clients[provider]
@@ -0,0 +1,90 @@
+"""
+面向 DeepSeek 上下文硬盘缓存的请求布局。
+
+DeepSeek 会缓存请求的公共前缀，命中部分按更低的价格计费、首 token 也更快，但前缀必须逐字节相同。
+PromptPrefix 把每个调用点不变的部分（system 提示词、工具定义、固定的任务说明）在构造时固定下来，
+每次请求按 [system, 固定说明 + 可变内容] 的顺序组装，可变内容（产品名、检索上下文、问题等）一律放在最后。
+
+PromptCacheStats 从响应的 usage 中记录 prompt_cache_hit_tokens / prompt_cache_miss_tokens 和调用耗时，
+用来衡量缓存带来的成本和延迟收益。
+"""
+import hashlib
+import json
+import threading
+
+
+class PromptPrefix:
+    """
+    Args:
+        system_prompt (str): system 提示词。
+        tools (list): 工具定义，构造时深拷贝一份，之后外部修改原列表也不会影响请求前缀。
+        user_prefix (str): user 消息开头固定的任务说明，可变内容拼在它后面。
+    """
+
+    def __init__(self, system_prompt: str, tools: list = None, user_prefix: str = ""):
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.tools = json.loads(json.dumps(tools, ensure_ascii=False)) if tools else None
+        self.user_prefix = user_prefix
+        # 前缀指纹，便于在日志中确认不同请求确实共用同一个前缀
+        self.fingerprint = hashlib.sha1(json.dumps([system_prompt, self.tools, user_prefix], ensure_ascii=False,
+                                                   sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    def user_message(self, variable_content: str) -> dict:
+        return {"role": "user", "content": self.user_prefix + variable_content}
+
+    def messages(self, variable_content: str) -> list:
+        """一次新对话的初始 messages：[system, 固定说明 + 可变内容]。"""
+        return [self.system_message, self.user_message(variable_content)]
+
+    def request(self, messages: list, with_tools: bool = True, **kwargs) -> dict:
+        """
+        组装 chat.completions.create 的参数，工具定义始终使用构造时固定的那一份。
+
+        不希望模型再调用工具时，优先传 tool_choice="none" 而不是 with_tools=False，这样前缀保持不变；
+        只有服务端不支持工具（例如 Ollama 上的 deepseek-r1）时才去掉工具定义。
+        """
+        if self.tools and with_tools:
+            kwargs["tools"] = self.tools
+        kwargs["messages"] = messages
+        return kwargs
+
+
+class PromptCacheStats:
+    """
+    按调用记录前缀缓存命中情况。
+
+    Args:
+        hit_price_ratio (float): 缓存命中 token 相对未命中 token 的单价比例，用于估算节省的输入成本。
+    """
+
+    def __init__(self, hit_price_ratio: float = 0.1):
+        self.hit_price_ratio = hit_price_ratio
+        self._lock = threading.Lock()
+        self.calls = []  # (hit_tokens, miss_tokens, seconds)
+
+    def record(self, usage, seconds: float):
+        """usage 为响应中的 usage 对象，没有缓存字段时（例如非 DeepSeek 的兼容服务）不记录。"""
+        hit = getattr(usage, "prompt_cache_hit_tokens", None)
+        miss = getattr(usage, "prompt_cache_miss_tokens", None)
+        if hit is None or miss is None:
+            return
+        with self._lock:
+            self.calls.append((hit, miss, seconds))
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = list(self.calls)
+        hit = sum(call[0] for call in calls)
+        miss = sum(call[1] for call in calls)
+        hit_seconds = [call[2] for call in calls if call[0] > 0]
+        miss_seconds = [call[2] for call in calls if call[0] == 0]
+        return {
+            "calls": len(calls),
+            "hit_tokens": hit,
+            "miss_tokens": miss,
+            "hit_rate": hit / (hit + miss) if hit + miss else 0.0,
+            # 与全部按未命中计费相比节省的输入成本比例
+            "input_cost_saved": hit * (1 - self.hit_price_ratio) / (hit + miss) if hit + miss else 0.0,
+            "avg_seconds_with_hit": sum(hit_seconds) / len(hit_seconds) if hit_seconds else None,
+            "avg_seconds_without_hit": sum(miss_seconds) / len(miss_seconds) if miss_seconds else None,
+        }
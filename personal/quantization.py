@@ -0,0 +1,120 @@
+"""
+向量量化：用压缩编码代替 float32 向量常驻内存。
+
+- ScalarQuantizer（sq8）：每一维按训练集的最小/最大值线性映射到 0..255，每维 1 字节，压缩 4 倍；
+- ProductQuantizer（pq）：把向量切成 m 段，每段用 256 个 k-means 中心之一表示，每个向量只占 m 字节；
+  训练向量不足 256 条时（例如只有几十个文本块的小语料）每段的中心数减少为训练向量数。
+
+两种量化器都提供 score(queries, codes)，直接在编码上近似计算内积，不需要解码出完整向量。
+LocalVectorStore 用它们做两阶段检索：先在编码上挑出候选，再从磁盘上的原始向量精确重算分数。
+Milvus 端使用服务端的 IVF_SQ8 / IVF_PQ 索引（见 apply_milvus_quantized_index）。
+"""
+import numpy as np
+
+from vector_store import kmeans, nearest_centroid
+
+
+class ScalarQuantizer:
+    kind = "sq8"
+
+    def __init__(self, low=None, scale=None):
+        self.low = low
+        self.scale = scale
+
+    def train(self, x: np.ndarray):
+        self.low = x.min(axis=0)
+        self.scale = (x.max(axis=0) - self.low) / 255.0
+        self.scale[self.scale == 0] = 1.0
+        return self
+
+    def encode(self, x: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint((x - self.low) / self.scale), 0, 255).astype(np.uint8)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """q·x ≈ q·(low + scale * code) = q·low + (q * scale)·code，返回 (nq, n)。"""
+        return (queries * self.scale) @ codes.T.astype(np.float32) + (queries @ self.low)[:, None]
+
+    @property
+    def codebook_bytes(self) -> int:
+        return self.low.nbytes + self.scale.nbytes
+
+    def state(self) -> dict:
+        return {"low": self.low, "scale": self.scale}
+
+
+class ProductQuantizer:
+    """
+    Args:
+        m (int): 子空间个数，向量维度必须能被 m 整除；每个向量编码为 m 个字节。
+    """
+    kind = "pq"
+
+    def __init__(self, m: int = 16, centroids=None):
+        self.m = m
+        self.centroids = centroids  # (m, k, dim / m)，k = min(256, 训练向量数)
+
+    def _split(self, x: np.ndarray) -> np.ndarray:
+        if x.shape[1] % self.m:
+            raise ValueError(f"向量维度 {x.shape[1]} 不能被子空间个数 {self.m} 整除")
+        return x.reshape(len(x), self.m, -1)
+
+    def train(self, x: np.ndarray, iterations: int = 10):
+        if len(x) == 0:
+            raise ValueError("训练 PQ 至少需要 1 条向量")
+        parts = self._split(x)
+        # 每段最多 256 个中心（编码为 1 字节），向量比 256 少时每个向量各自成为一个中心
+        k = min(256, len(x))
+        self.centroids = np.stack([kmeans(np.ascontiguousarray(parts[:, j]), k, iterations)
+                                   for j in range(self.m)])
+        return self
+
+    def encode(self, x: np.ndarray) -> np.ndarray:
+        parts = self._split(x)
+        return np.stack([nearest_centroid(np.ascontiguousarray(parts[:, j]), self.centroids[j])
+                         for j in range(self.m)], axis=1).astype(np.uint8)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """非对称距离计算：先算查询每段与 k 个中心的内积表，再按编码查表求和，返回 (nq, n)。"""
+        tables = np.einsum("qjd,jkd->qjk", self._split(queries), self.centroids)  # (nq, m, k)
+        scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for j in range(self.m):
+            scores += tables[:, j, :][:, codes[:, j]]
+        return scores
+
+    @property
+    def codebook_bytes(self) -> int:
+        """码本大小：训练向量少于 256 条时 k 等于训练向量数，码本可能比原始向量还大。"""
+        return self.centroids.nbytes
+
+    def state(self) -> dict:
+        return {"m": np.asarray(self.m), "centroids": self.centroids}
+
+
+def load_quantizer(kind: str, state: dict):
+    if kind == "sq8":
+        return ScalarQuantizer(state["low"], state["scale"])
+    if kind == "pq":
+        return ProductQuantizer(int(state["m"]), state["centroids"])
+    raise ValueError(f"未知的量化方式 {kind}")
+
+
+def apply_milvus_quantized_index(milvus_client, collection_name: str, kind: str = "sq8",
+                                 nlist: int = 128, m: int = 16, metric_type: str = "IP"):
+    """
+    把 Milvus collection 的向量索引换成 IVF_SQ8 或 IVF_PQ，索引在服务端只保存量化后的编码。
+
+    快速创建的 collection 默认使用 AUTOINDEX，这里先释放并删除原索引，再创建量化索引并重新加载。
+    检索时可通过 search_params={"params": {"nprobe": n}} 调整精度。
+    """
+    index_type = {"sq8": "IVF_SQ8", "pq": "IVF_PQ"}[kind]
+    params = {"nlist": nlist}
+    if kind == "pq":
+        params.update({"m": m, "nbits": 8})
+
+    milvus_client.release_collection(collection_name=collection_name)
+    for index_name in milvus_client.list_indexes(collection_name=collection_name):
+        milvus_client.drop_index(collection_name=collection_name, index_name=index_name)
+    index_params = milvus_client.prepare_index_params()
+    index_params.add_index(field_name="vector", index_type=index_type, metric_type=metric_type, params=params)
+    milvus_client.create_index(collection_name=collection_name, index_params=index_params)
+    milvus_client.load_collection(collection_name=collection_name)
@@ -0,0 +1,211 @@
+"""
+RAG 回答生成：把检索结果去重后按 token 预算拼成上下文，流式调用 DeepSeek 生成回答，
+并记录检索耗时、首 token 耗时和总耗时。
+"""
+import json
+import re
+import time
+
+from prompt_cache import PromptCacheStats, PromptPrefix
+from token_utils import estimate_tokens
+
+SYSTEM_PROMPT = """
+Human: 你是一个 AI 助手。你能够从提供的上下文段落片段中找到问题的答案。
+"""
+
+# 固定的说明在前、检索上下文和问题在后，所有问题共用 system 提示词加说明这一段前缀，可以命中 DeepSeek 的上下文缓存
+USER_PROMPT_PREFIX = """
+请使用以下用 <context> 标签括起来的信息片段来回答用 <question> 标签括起来的问题。
+"""
+
+USER_PROMPT_TEMPLATE = """<context>
+{context}
+</context>
+<question>
+{question}
+</question>
+"""
+
+RAG_PROMPT = PromptPrefix(SYSTEM_PROMPT, user_prefix=USER_PROMPT_PREFIX)
+prompt_cache_stats = PromptCacheStats()
+
+
+def _shingles(text: str) -> set:
+    """去掉空白后的字符二元组集合，用于估计两段文本的相似度。"""
+    text = re.sub(r"\s+", "", text)
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def dedupe_hits(hits: list, threshold: float = 0.9) -> list:
+    """
+    去掉与排名更靠前的结果几乎相同的文本（例如切分时的重叠部分、FAQ 中重复的段落）。
+
+    Args:
+        hits (list): 按相似度排序的 [(text, distance), ...]。
+        threshold (float): 字符二元组 Jaccard 相似度不低于该值视为重复。
+    """
+    kept, kept_shingles = [], []
+    for text, distance in hits:
+        shingles = _shingles(text)
+        if any(len(shingles & other) / len(shingles | other) >= threshold for other in kept_shingles):
+            continue
+        kept.append((text, distance))
+        kept_shingles.append(shingles)
+    return kept
+
+
+def assemble_context(hits: list, max_tokens: int = 2000, dedupe_threshold: float = 0.9) -> str:
+    """按相似度顺序拼接去重后的检索结果，总 token 数不超过 max_tokens。"""
+    parts, used = [], 0
+    for text, _ in dedupe_hits(hits, dedupe_threshold):
+        tokens = estimate_tokens(text)
+        if used + tokens > max_tokens:
+            continue  # 跳过放不下的长文本，后面更短的结果仍有机会放进去
+        parts.append(text)
+        used += tokens
+    return "\n\n".join(parts)
+
+
+class AnswerTimings:
+    """单个问题各阶段的耗时（秒），均从该问题开始处理时计时。"""
+
+    def __init__(self, retrieval: float = 0.0):
+        self.retrieval = retrieval
+        self.first_token = None
+        self.total = None
+        self.cached = False  # 是否由语义缓存直接返回
+        self.prompt_cache_hit_tokens = None  # 命中 DeepSeek 上下文缓存的 prompt token 数
+
+    def __str__(self) -> str:
+        first_token = f"{self.first_token * 1000:.0f}ms" if self.first_token is not None else "-"
+        text = f"检索 {self.retrieval * 1000:.0f}ms，首 token {first_token}，总耗时 {self.total * 1000:.0f}ms"
+        if self.prompt_cache_hit_tokens is not None:
+            text += f"，上下文缓存命中 {self.prompt_cache_hit_tokens} token"
+        return text
+
+
+def stream_answer(deepseek_client, question: str, hits: list, retrieval_seconds: float = 0.0,
+                  max_context_tokens: int = 2000, model: str = "deepseek-chat", on_token=None):
+    """
+    根据检索结果流式生成回答。
+
+    Args:
+        deepseek_client: OpenAI 兼容的 DeepSeek 客户端。
+        question (str): 用户问题。
+        hits (list): 该问题的检索结果 [(text, distance), ...]。
+        retrieval_seconds (float): 检索阶段已经花费的时间，计入首 token 和总耗时。
+        max_context_tokens (int): 上下文的 token 预算。
+        model (str): 模型名称。
+        on_token: 每收到一段文本就调用一次，默认直接打印，让用户尽早看到回答。
+
+    Returns:
+        tuple: (完整回答, AnswerTimings)
+    """
+    if on_token is None:
+        on_token = lambda text: print(text, end="", flush=True)
+    timings = AnswerTimings(retrieval_seconds)
+    start = time.perf_counter() - retrieval_seconds
+
+    context = assemble_context(hits, max_context_tokens)
+    messages = RAG_PROMPT.messages(USER_PROMPT_TEMPLATE.format(context=context, question=question))
+    call_start = time.perf_counter()
+    stream = deepseek_client.chat.completions.create(**RAG_PROMPT.request(
+        messages,
+        model=model,
+        stream=True,
+        stream_options={"include_usage": True},
+    ))
+
+    answer = []
+    usage = None
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if not chunk.choices:
+            continue
+        text = chunk.choices[0].delta.content
+        if not text:
+            continue
+        if timings.first_token is None:
+            timings.first_token = time.perf_counter() - start
+        answer.append(text)
+        on_token(text)
+    timings.total = time.perf_counter() - start
+    prompt_cache_stats.record(usage, time.perf_counter() - call_start)
+    timings.prompt_cache_hit_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+    return "".join(answer), timings
+
+
+def answer_questions(deepseek_client, retriever, questions: list, limit: int = 5,
+                     semantic_cache=None, show_context: bool = False, **kwargs) -> list:
+    """
+    批量回答问题：未命中语义缓存的问题一次向量化、一次检索，然后逐个流式回答。
+
+    只有要走向量检索的问题才计算向量，算好的向量同时用于语义缓存和检索；
+    混合检索中只走关键词检索的问题（retriever.is_keyword_query）不计算向量，语义缓存只按文本精确匹配。
+
+    Args:
+        deepseek_client: OpenAI 兼容的 DeepSeek 客户端。
+        retriever: rag_retriever.Retriever 或 HybridRetriever 实例。
+        questions (list): 问题列表。
+        limit (int): 每个问题检索的文本块数。
+        semantic_cache: 可选的 semantic_cache.SemanticCache，命中时跳过检索和 LLM 调用。
+        show_context (bool): 是否打印检索到的文本块。
+        **kwargs: 透传给 stream_answer。
+
+    Returns:
+        list: 与 questions 一一对应的 (回答, AnswerTimings)。
+    """
+    results = [None] * len(questions)
+    pending = list(range(len(questions)))
+
+    start = time.perf_counter()
+    is_keyword_query = getattr(retriever, "is_keyword_query", None)
+    keyword_only = {i for i in pending if is_keyword_query is not None and is_keyword_query(questions[i])}
+    if semantic_cache is not None:
+        # 问题文本完全相同时连向量都不用算；只走关键词检索的问题不会再按向量匹配，文本未命中即计为未命中
+        for i in list(pending):
+            answer = semantic_cache.lookup_text(questions[i], count_miss=i in keyword_only)
+            if answer is not None:
+                results[i] = (answer, _cached_timings(start))
+                pending.remove(i)
+
+    vectors = {}  # 问题下标 -> 问题向量
+    embed = [i for i in pending if i not in keyword_only]
+    if semantic_cache is not None and embed:
+        # 语义缓存需要问题向量；不用缓存时交给检索器决定是否需要向量化
+        for i, vector in zip(embed, retriever.embedding_model.encode_queries([questions[i] for i in embed])):
+            vectors[i] = vector
+            answer = semantic_cache.lookup(questions[i], vector)
+            if answer is not None:
+                results[i] = (answer, _cached_timings(start))
+        pending = [i for i in pending if results[i] is None]
+
+    all_hits = retriever.search_many([questions[i] for i in pending], limit, with_ids=True,
+                                     vectors=[vectors.get(i) for i in pending] if vectors else None) \
+        if pending else []
+    retrieval_seconds = time.perf_counter() - start
+
+    for i, hits in zip(pending, all_hits):
+        question = questions[i]
+        print(f"\n问题：{question}")
+        if show_context:
+            print(json.dumps([(text, distance) for _, text, distance in hits], indent=4, ensure_ascii=False))
+        print("回答：", end="")
+        answer, timings = stream_answer(deepseek_client, question, [(text, distance) for _, text, distance in hits],
+                                        retrieval_seconds, **kwargs)
+        print(f"\n[{timings}]")
+        if semantic_cache is not None:
+            semantic_cache.put(question, vectors.get(i), [chunk for chunk, _, _ in hits], answer)
+        results[i] = (answer, timings)
+
+    for question, (answer, timings) in zip(questions, results):
+        if timings.cached:
+            print(f"\n问题：{question}\n回答（语义缓存）：{answer}\n[{timings}]")
+    return results
+
+
+def _cached_timings(start: float) -> "AnswerTimings":
+    timings = AnswerTimings(time.perf_counter() - start)
+    timings.first_token = timings.total = timings.retrieval
+    timings.cached = True
+    return timings
@@ -0,0 +1,177 @@
+"""
+结构感知的文本切分：识别民法典的 编/章/节/条 结构和 markdown 的标题层级，
+把同一小节内的零碎段落合并到一个 token 预算以内，并支持相邻文本块之间的重叠。
+
+所有函数都是生成器，逐行读取文件，可以直接接到 rag_ingest.ingest 上处理大文件。
+每个文本块前面会带上它所在的标题路径，例如 "第一编 总则 / 第一章 基本规定"，
+这样即使条文本身不含关键词，也能靠标题被检索到。
+"""
+import re
+from glob import glob
+from typing import Iterable, Iterator
+
+from rag_ingest import iter_text_lines
+from token_utils import TOKEN_PATTERN, estimate_tokens
+
+# 中文数字
+_CN_NUM = "零〇一二三四五六七八九十百千"
+# 民法典的结构标题，按层级从高到低排列；"分编" 位于 "编" 和 "章" 之间
+_LEGAL_LEVELS = ("编", "分编", "章", "节")
+_LEGAL_HEADING = re.compile(rf"^第[{_CN_NUM}]+(分编|编|章|节)[\s　]+(.*)$")
+_LEGAL_ARTICLE = re.compile(rf"^第[{_CN_NUM}]+条[\s　]")
+_MD_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_SENTENCE_END = re.compile(r"(?<=[。！？；!?;])|(?<=\.)\s")
+
+
+def _split_long(text: str, max_tokens: int) -> Iterator[str]:
+    """把超过预算的单个段落先按句子切分，单句仍然过长时按 token 硬切。"""
+    for sentence in _SENTENCE_END.split(text):
+        if not sentence.strip():
+            continue
+        tokens = list(TOKEN_PATTERN.finditer(sentence))
+        if len(tokens) <= max_tokens:
+            yield sentence
+            continue
+        for start in range(0, len(tokens), max_tokens):
+            end = min(start + max_tokens, len(tokens)) - 1
+            yield sentence[tokens[start].start():tokens[end].end()]
+
+
+def iter_civil_code_units(lines: Iterable[str]) -> Iterator[tuple]:
+    """
+    把民法典逐行解析为 (标题路径, 条文) 单元。
+
+    一条法条可能跨多行（款、项），后续行会并入同一条；编/章/节 标题只更新标题路径，不单独产出。
+    """
+    path = {}
+    article = []
+
+    def current_path():
+        return tuple(path[level] for level in _LEGAL_LEVELS if level in path)
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        heading = _LEGAL_HEADING.match(line)
+        if heading:
+            if article:
+                yield current_path(), "\n".join(article)
+                article = []
+            level = heading.group(1)
+            # 进入新的上级标题时，清空它下面所有层级
+            for lower in _LEGAL_LEVELS[_LEGAL_LEVELS.index(level):]:
+                path.pop(lower, None)
+            path[level] = re.sub(r"[\s　]+", " ", line)
+            continue
+        if _LEGAL_ARTICLE.match(line) and article:
+            yield current_path(), "\n".join(article)
+            article = []
+        article.append(line)
+    if article:
+        yield current_path(), "\n".join(article)
+
+
+def iter_markdown_units(lines: Iterable[str]) -> Iterator[tuple]:
+    """
+    把 markdown 逐行解析为 (标题路径, 段落) 单元。
+
+    段落以空行分隔；代码块整体作为一个段落，代码块中以 # 开头的行不会被当成标题。
+    """
+    stack = []  # [(级别, 标题文本)]
+    paragraph = []
+    in_code = False
+
+    def flush():
+        text = "\n".join(paragraph).strip()
+        paragraph.clear()
+        if text:
+            return tuple(title for _, title in stack), text
+        return None
+
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+            paragraph.append(line)
+            continue
+        if in_code:
+            paragraph.append(line)
+            continue
+        heading = _MD_HEADING.match(line)
+        if heading or not line.strip():
+            unit = flush()
+            if unit:
+                yield unit
+            if heading:
+                level = len(heading.group(1))
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                stack.append((level, heading.group(2)))
+            continue
+        paragraph.append(line)
+    unit = flush()
+    if unit:
+        yield unit
+
+
+def merge_units(units: Iterable[tuple], max_tokens: int = 256, overlap_tokens: int = 32) -> Iterator[str]:
+    """
+    把同一标题路径下的相邻单元合并成不超过 max_tokens 的文本块。
+
+    Args:
+        units: (标题路径, 文本) 的可迭代对象。
+        max_tokens (int): 每个文本块的 token 预算（不含标题路径）。
+        overlap_tokens (int): 因超出预算而切分时，下一个文本块从上一个文本块末尾
+            最多带上这么多 token 的完整单元作为重叠；跨标题切分时不重叠。
+
+    Yields:
+        str: "标题路径\\n正文" 形式的文本块。
+    """
+    current_path = None
+    buffer = []  # [(文本, token 数)]
+    buffer_tokens = 0
+
+    def render(path, parts):
+        body = "\n".join(text for text, _ in parts)
+        return f"{' / '.join(path)}\n{body}" if path else body
+
+    for path, text in units:
+        if path != current_path:
+            if buffer:
+                yield render(current_path, buffer)
+            current_path, buffer, buffer_tokens = path, [], 0
+
+        tokens = estimate_tokens(text)
+        pieces = [(text, tokens)] if tokens <= max_tokens else \
+            [(piece, estimate_tokens(piece)) for piece in _split_long(text, max_tokens)]
+
+        for piece, piece_tokens in pieces:
+            if buffer and buffer_tokens + piece_tokens > max_tokens:
+                yield render(current_path, buffer)
+                # 从末尾保留不超过 overlap_tokens 的单元作为下一块的开头
+                overlap, overlap_total = [], 0
+                for item in reversed(buffer):
+                    if overlap_total + item[1] > overlap_tokens:
+                        break
+                    overlap.insert(0, item)
+                    overlap_total += item[1]
+                if overlap_total + piece_tokens > max_tokens:
+                    overlap, overlap_total = [], 0
+                buffer, buffer_tokens = overlap, overlap_total
+            buffer.append((piece, piece_tokens))
+            buffer_tokens += piece_tokens
+
+    if buffer:
+        yield render(current_path, buffer)
+
+
+def chunk_civil_code(file_path: str, max_tokens: int = 256, overlap_tokens: int = 32) -> Iterator[str]:
+    """流式切分民法典文本文件。"""
+    return merge_units(iter_civil_code_units(iter_text_lines(file_path)), max_tokens, overlap_tokens)
+
+
+def chunk_markdown_files(pattern: str, max_tokens: int = 256, overlap_tokens: int = 32) -> Iterator[str]:
+    """逐个文件流式切分 markdown（例如 Milvus FAQ），文本块不会跨文件合并。"""
+    for file_path in glob(pattern, recursive=True):
+        yield from merge_units(iter_markdown_units(iter_text_lines(file_path)), max_tokens, overlap_tokens)
@@ -0,0 +1,96 @@
+"""
+RAG 评测工具：标注问题集加载、检索质量指标（recall@k、MRR）、延迟分位数、峰值内存，
+以及不依赖模型下载的哈希向量模型，供各个 bench_*.py 脚本复用。
+
+标注文件 rag_eval_questions.jsonl 每行一个问题，articles 为能回答该问题的法条编号：
+    {"question": "多少岁是成年人？", "articles": ["第十七条"]}
+文本块只要包含某条法条（以 "第X条" 开头的行）就视为与该法条相关，因此评测结果不依赖具体的切分方式。
+"""
+import hashlib
+import json
+import re
+import sys
+
+import numpy as np
+
+from bm25_index import tokenize
+
+
+def load_questions(path: str = "./rag_eval_questions.jsonl") -> list:
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _contains_article(text: str, article: str) -> bool:
+    return re.search(rf"(^|\n){article}[\s　]", text) is not None
+
+
+def evaluate_hits(questions: list, all_hits: list, k: int) -> dict:
+    """
+    计算检索质量。
+
+    Args:
+        questions (list): load_questions 的结果。
+        all_hits (list): 与 questions 一一对应，每项为按排名排列的文本列表。
+        k (int): 只看前 k 条结果。
+
+    Returns:
+        dict: recall@k 为标注法条被前 k 条结果覆盖的比例的平均值；
+              mrr 为第一条相关结果排名倒数的平均值（前 k 条都不相关记 0）。
+    """
+    recalls, reciprocal_ranks = [], []
+    for item, texts in zip(questions, all_hits):
+        texts = texts[:k]
+        articles = item["articles"]
+        found = sum(any(_contains_article(text, article) for text in texts) for article in articles)
+        recalls.append(found / len(articles))
+        rank = next((i for i, text in enumerate(texts, start=1)
+                     if any(_contains_article(text, article) for article in articles)), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    return {f"recall@{k}": float(np.mean(recalls)), "mrr": float(np.mean(reciprocal_ranks))}
+
+
+def latency_summary(seconds: list) -> dict:
+    """把一组耗时（秒）汇总为 p50/p95/p99 毫秒。"""
+    ms = np.asarray(seconds) * 1000
+    return {f"p{p}_ms": float(np.percentile(ms, p)) for p in (50, 95, 99)}
+
+
+def peak_rss_mb():
+    """进程的峰值常驻内存（MB），无法获取时返回 None。"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:  # Windows 没有 resource 模块
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 / 1024
+        except (ImportError, AttributeError):
+            return None
+
+
+class HashingEmbeddingFunction:
+    """
+    用词项哈希生成向量的简易模型，不需要下载模型，结果稳定可复现，
+    用于 CI 上跟踪流水线本身的性能回归（检索质量只作参考）。
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _encode(self, texts: list) -> list:
+        vectors = []
+        for text in texts:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for token in tokenize(text):
+                digest = hashlib.md5(token.encode("utf-8")).digest()
+                vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+            vectors.append(vector / max(float(np.linalg.norm(vector)), 1e-12))
+        return vectors
+
+    def encode_documents(self, documents: list) -> list:
+        return self._encode(documents)
+
+    def encode_queries(self, queries: list) -> list:
+        return self._encode(queries)
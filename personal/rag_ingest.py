@@ -0,0 +1,138 @@
+"""
+流式入库流水线：惰性读取文档 -> 分批计算向量 -> 分批写入 Milvus。
+
+任意时刻内存中只保留一个向量批次和一个待写入批次，峰值内存与语料大小无关。
+"""
+import time
+from glob import glob
+from itertools import islice
+from typing import Iterable, Iterator
+
+from tqdm import tqdm
+
+
+def iter_faq_sections(pattern: str) -> Iterator[str]:
+    """
+    逐个读取 FAQ markdown 文件，按 "# " 标题切分后逐段返回。
+
+    Args:
+        pattern (str): glob 匹配模式，例如 "../../milvusdocs/faq/*.md"。
+
+    Yields:
+        str: 一个标题段落的文本。
+    """
+    for file_path in glob(pattern, recursive=True):
+        section = []
+        with open(file_path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("# ") and section:
+                    yield "".join(section)
+                    section = []
+                section.append(line[2:] if line.startswith("# ") else line)
+        if section:
+            yield "".join(section)
+
+
+def iter_text_lines(file_path: str) -> Iterator[str]:
+    """逐行读取文本文件（例如民法典），不会一次性读入整个文件。"""
+    with open(file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            yield line.rstrip("\n")
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """把任意可迭代对象切成固定大小的批次，最后一批可能不足 size。"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class StageStats:
+    """记录某个流水线阶段处理的行数和耗时，用于计算吞吐量（行/秒）。"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0
+
+    def add(self, items: int, seconds: float):
+        self.items += items
+        self.seconds += seconds
+
+    @property
+    def lines_per_sec(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return f"{self.name:<8} {self.items:>8} 行  {self.seconds:8.2f}s  {self.lines_per_sec:10.1f} 行/秒"
+
+
+def ingest(milvus_client, collection_name: str, embedding_model, lines: Iterable[str],
+           embed_batch_size: int = 64, insert_batch_size: int = 512, start_id: int = 0,
+           id_fn=None, upsert: bool = False) -> dict:
+    """
+    流式地把文本写入 Milvus。
+
+    Args:
+        milvus_client: MilvusClient 实例。
+        collection_name (str): 目标 collection 名称。
+        embedding_model: 提供 encode_documents 方法的向量模型。
+        lines (Iterable[str]): 待入库的文本，可以是生成器。
+        embed_batch_size (int): 每次调用向量模型的文本条数。
+        insert_batch_size (int): 每次 insert 到 Milvus 的行数。
+        start_id (int): 第一条数据的 id，未指定 id_fn 时按顺序递增。
+        id_fn: 可选，根据文本计算 id 的函数（例如 rag_manifest.chunk_id）。
+        upsert (bool): 为 True 时使用 upsert 写入，重复运行不会产生重复数据。
+
+    Returns:
+        dict: 各阶段的 StageStats，键为 "read"、"embed"、"insert"。
+    """
+    stats = {name: StageStats(name) for name in ("read", "embed", "insert")}
+    next_id = start_id
+    pending = []
+
+    def flush():
+        start = time.perf_counter()
+        write = milvus_client.upsert if upsert else milvus_client.insert
+        write(collection_name=collection_name, data=pending)
+        stats["insert"].add(len(pending), time.perf_counter() - start)
+        pending.clear()
+
+    progress = tqdm(desc="Creating embeddings", unit="line")
+    batches = batched(lines, embed_batch_size)
+    while True:
+        start = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            break
+        stats["read"].add(len(batch), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        embeddings = embedding_model.encode_documents(batch)
+        stats["embed"].add(len(batch), time.perf_counter() - start)
+
+        for text, vector in zip(batch, embeddings):
+            if id_fn is not None:
+                row_id = id_fn(text)
+            else:
+                row_id, next_id = next_id, next_id + 1
+            pending.append({"id": row_id, "vector": vector, "text": text})
+        progress.update(len(batch))
+
+        if len(pending) >= insert_batch_size:
+            flush()
+
+    if pending:
+        flush()
+    progress.close()
+    return stats
+
+
+def print_stats(stats: dict):
+    """打印各阶段吞吐量。"""
+    print("--- 入库吞吐量 ---")
+    for stage in stats.values():
+        print(stage)
@@ -0,0 +1,85 @@
+"""
+增量索引清单：记录每个文本块的内容哈希与稳定 id 的对应关系。
+
+id 由内容哈希计算得到，与文本所在行号无关，因此在文件开头插入一段文字
+不会让后面所有文本块的 id 失效；每次运行只需要向量化新增/修改过的文本块，
+并删除已经消失的文本块。
+"""
+import hashlib
+import json
+import os
+from typing import Iterable, Iterator
+
+from rag_ingest import batched
+
+
+def content_hash(text: str) -> str:
+    """计算文本块的内容哈希（16 位十六进制）。"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def chunk_id(text: str) -> int:
+    """根据内容哈希生成稳定的 id，截断为 Milvus INT64 主键可用的非负整数。"""
+    return int(content_hash(text), 16) & 0x7FFF_FFFF_FFFF_FFFF
+
+
+class ChunkManifest:
+    """
+    本地清单文件，格式为 {"chunks": {内容哈希: id}}。
+
+    用法：
+        manifest = ChunkManifest("rag_manifest.json")
+        new_texts = manifest.new_chunks(all_texts)   # 生成器，只产出新增的文本块
+        ...                                          # 把 new_texts 向量化并写入
+        removed = manifest.removed_ids()             # 必须在 new_texts 耗尽后调用
+        manifest.save()
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.chunks = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.chunks = json.load(file).get("chunks", {})
+        self._seen = {}
+
+    def reset(self):
+        """清空清单，用于 collection 被删除或需要全量重建的情况。"""
+        self.chunks = {}
+
+    def new_chunks(self, texts: Iterable[str]) -> Iterator[str]:
+        """
+        流式过滤文本块：记录本次出现的所有文本块，只产出清单中不存在的文本块。
+        重复出现的相同文本只会产出一次。
+        """
+        self._seen = {}
+        for text in texts:
+            digest = content_hash(text)
+            if digest in self._seen:
+                continue
+            self._seen[digest] = chunk_id(text)
+            if digest not in self.chunks:
+                yield text
+
+    def removed_ids(self) -> list:
+        """返回上次入库存在、本次已经消失的文本块 id。"""
+        return [chunk for digest, chunk in self.chunks.items() if digest not in self._seen]
+
+    def added_ids(self) -> list:
+        """返回本次新增（包括内容被修改）的文本块 id，必须在 save 之前调用。"""
+        return [chunk for digest, chunk in self._seen.items() if digest not in self.chunks]
+
+    def save(self):
+        """用本次出现的文本块更新清单，先写临时文件再替换，避免写到一半损坏。"""
+        self.chunks = self._seen
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"chunks": self.chunks}, file)
+        os.replace(tmp_path, self.path)
+
+
+def delete_ids(milvus_client, collection_name: str, ids: list, batch_size: int = 1000) -> int:
+    """分批从 Milvus 删除指定 id，返回删除的条数。"""
+    for batch in batched(ids, batch_size):
+        milvus_client.delete(collection_name=collection_name, ids=batch)
+    return len(ids)
@@ -1,88 +1,160 @@
 import os
+from functools import partial
+from itertools import chain
 from openai import OpenAI
-from glob import glob
 from pymilvus import model as milvus_model
-from pymilvus import MilvusClient
-from tqdm import tqdm
+
+from bm25_index import BM25Builder, BM25Index
+from embedding_cache import CachedEmbeddingFunction
+from quantization import apply_milvus_quantized_index
+from rag_answer import answer_questions, prompt_cache_stats
+from rag_chunker import chunk_civil_code, chunk_markdown_files
+from rag_ingest import ingest, print_stats
+from rag_manifest import ChunkManifest, chunk_id, delete_ids
+from rag_parallel_embed import ParallelEmbeddingFunction
+from rag_retriever import HybridRetriever, Retriever
+from reranker import RerankingRetriever
+from semantic_cache import SemanticCache
+from vector_store import LocalVectorStore, connect
+
+# 默认增量索引：只向量化新增/修改的文本块；设置 RAG_FULL_REBUILD=1 时删除 collection 全量重建
+FULL_REBUILD = os.getenv("RAG_FULL_REBUILD") == "1"
+
+# 文本块的 token 预算和相邻文本块的重叠 token 数
+CHUNK_MAX_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = 32
+
+# 向量量化方式："sq8" 或 "pq"，为空时存储完整的 float32 向量；只在新建 collection 时生效
+QUANTIZATION = os.getenv("RAG_QUANTIZATION", "")
+
+# 向量化进程数，大于 1 时启用多进程并行向量化
+EMBED_WORKERS = int(os.getenv("RAG_EMBED_WORKERS", "1"))
 
 #因本地windows环境无法安装Milvus数据库，采用了远程服务器安装
-milvus_client = MilvusClient("http://192.168.1.175:19530")
+# 设置 RAG_VECTOR_STORE_URI=local://./.vector_store 时使用进程内的本地向量库，不需要 Milvus 服务
+VECTOR_STORE_URI = os.getenv("RAG_VECTOR_STORE_URI", "http://192.168.1.175:19530")
 
-# 创建相关collection
 collection_name = "my_rag_collection"
-if milvus_client.has_collection(collection_name):
-    milvus_client.drop_collection(collection_name)
-
-from pymilvus import model as milvus_model
-embedding_model = milvus_model.DefaultEmbeddingFunction()
-
-test_embedding = embedding_model.encode_queries(["This is a test"])[0]
-embedding_dim = len(test_embedding)
-
-milvus_client.create_collection(
-    collection_name=collection_name,
-    dimension=embedding_dim,
-    metric_type="IP",  # 内积距离
-    consistency_level="Strong",  # 
-)
-
-# 读取相关文件，相关文档放在了项目上一级目录
-text_lines = []
-for file_path in glob("../../milvusdocs/faq/*.md", recursive=True):
-    with open(file_path, "r") as file:
-        file_text = file.read()
-
-    text_lines += file_text.split("# ")
-
-# 读取民法典
-with open("./民法典节选.txt","r",encoding="utf-8") as file:
-    file_text = file.read()
-
-text_lines += file_text.split("\n")
-
-# 把数据存到向量数据库
-data = []
-doc_embeddings = embedding_model.encode_documents(text_lines)
-
-for i, line in enumerate(tqdm(text_lines, desc="Creating embeddings")):
-    data.append({"id": i, "vector": doc_embeddings[i], "text": line})
-
-milvus_client.insert(collection_name=collection_name, data=data)
-
-
-print("question1:How is data stored in milvus?")
-question = "How is data stored in milvus?"
-
-search_res = milvus_client.search(
-    collection_name=collection_name,
-    data=embedding_model.encode_queries(
-        [question]
-    ),  # 将问题转换为嵌入向量
-    limit=5,  # 返回前5个结果
-    search_params={"metric_type": "IP", "params": {}},  # 内积距离
-    output_fields=["text"],  # 返回 text 字段
-)
-
-import json
-
-retrieved_lines_with_distances = [
-    (res["entity"]["text"], res["distance"]) for res in search_res[0]
-]
-print(json.dumps(retrieved_lines_with_distances, indent=4))
-
-
-print("question2:基本规定")
-question = "基本规定"
-search_res = milvus_client.search(
-    collection_name=collection_name,
-    data=embedding_model.encode_queries(
-        [question]
-    ),  # 将问题转换为嵌入向量
-    limit=5,  # 返回前5个结果
-    search_params={"metric_type": "IP", "params": {}},  # 内积距离
-    output_fields=["text"],  # 返回 text 字段
-)
-retrieved_lines_with_distances = [
-    (res["entity"]["text"], res["distance"]) for res in search_res[0]
-]
-print(json.dumps(retrieved_lines_with_distances, indent=4,ensure_ascii=False))
+bm25_index_path = f"./.{collection_name}_bm25"
+
+
+def build_embedding_model() -> CachedEmbeddingFunction:
+    """创建带磁盘缓存的向量模型：命中缓存时不会加载/调用模型，向量维度直接读取缓存元数据。"""
+    model_factory = milvus_model.DefaultEmbeddingFunction
+    if EMBED_WORKERS > 1:
+        # 缓存未命中的文本交给进程池并行编码
+        model_factory = partial(ParallelEmbeddingFunction, milvus_model.DefaultEmbeddingFunction,
+                                workers=EMBED_WORKERS)
+    return CachedEmbeddingFunction(
+        model_factory,
+        model_id="GPTCache/paraphrase-albert-onnx",
+        cache_dir="./.embedding_cache",
+        capacity=200_000,
+    )
+
+
+def build_index(milvus_client, embedding_model):
+    """创建 collection 并增量地把 FAQ 和民法典写入向量数据库，返回新增/修改/删除的文本块 id。"""
+    manifest = ChunkManifest(f"./{collection_name}_manifest.json")
+    if FULL_REBUILD and milvus_client.has_collection(collection_name):
+        milvus_client.drop_collection(collection_name)
+
+    embedding_dim = embedding_model.dim
+
+    created = not milvus_client.has_collection(collection_name)
+    if created:
+        # collection 不存在时清单已经失效，需要全量入库
+        manifest.reset()
+        milvus_client.create_collection(
+            collection_name=collection_name,
+            dimension=embedding_dim,
+            metric_type="IP",  # 内积距离
+            consistency_level="Strong",  #
+        )
+
+    # 流式读取相关文件，按标题结构切分成文本块后分批入库，相关文档放在了项目上一级目录
+    chunks = chain(
+        chunk_markdown_files("../../milvusdocs/faq/*.md", CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS),
+        chunk_civil_code("./民法典节选.txt", CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS),  # 读取民法典
+    )
+
+    # 文本块流过时同时构建 BM25 倒排索引（分词很快，每次全量重建）
+    bm25_builder = BM25Builder()
+    chunks = bm25_builder.track(chunks)
+
+    # 向量按固定批次计算，数据按固定批次写入向量数据库，内存占用不随语料增长
+    # id 由内容哈希生成，只有清单中不存在的文本块才会被向量化并 upsert
+    # 并行模式下每批文本会再切分给各个进程，所以批次随进程数放大
+    stats = ingest(milvus_client, collection_name, embedding_model, manifest.new_chunks(chunks),
+                   embed_batch_size=64 * max(EMBED_WORKERS, 1), insert_batch_size=512,
+                   id_fn=chunk_id, upsert=True)
+    print_stats(stats)
+
+    # 删除本次语料中已经不存在的文本块，再更新清单
+    removed_ids = manifest.removed_ids()
+    changed_ids = manifest.added_ids() + removed_ids
+    removed = delete_ids(milvus_client, collection_name, removed_ids)
+    bm25_builder.build().save(bm25_index_path)
+    milvus_client.flush(collection_name)
+    if created and QUANTIZATION:
+        # 本地向量库：编码常驻内存，原始向量留在磁盘上做二次精排；Milvus：换成服务端的 IVF_SQ8 / IVF_PQ 索引
+        # 量化只影响检索方式，失败时数据已经完整入库，照常保存清单，继续使用原来的索引
+        try:
+            if isinstance(milvus_client, LocalVectorStore):
+                milvus_client.create_quantized_index(collection_name, kind=QUANTIZATION, m=64)
+                usage = milvus_client.memory_usage(collection_name)
+                print(f"向量量化：{usage}")
+                if usage["ratio"] <= 1:
+                    print(f"⚠️ 语料较小，{QUANTIZATION} 的编码加码本不比 float32 向量小，量化没有节省内存")
+            else:
+                apply_milvus_quantized_index(milvus_client, collection_name, kind=QUANTIZATION, m=64)
+        except Exception as e:
+            print(f"⚠️ 向量量化（{QUANTIZATION}）失败，继续使用未量化的索引：{e}")
+    manifest.save()
+    print(f"增量索引：新增/修改 {stats['embed'].items} 条，删除 {removed} 条")
+    embedding_model.save()
+    return changed_ids
+
+
+def build_deepseek_client() -> OpenAI:
+    # 从环境变量获取 DeepSeek API Key
+    api_key = os.getenv("DEEPSEEK_API_KEY")
+    if not api_key:
+        raise ValueError("请设置 DEEPSEEK_API_KEY 环境变量")
+    return OpenAI(
+        api_key=api_key,
+        base_url="https://api.deepseek.com/v1",  # DeepSeek API 的基地址
+    )
+
+
+def main():
+    milvus_client = connect(VECTOR_STORE_URI)
+    embedding_model = build_embedding_model()
+
+    # 语义答案缓存：文本块被重新索引后，引用这些文本块的缓存回答随之失效
+    semantic_cache = SemanticCache(threshold=0.95, ttl=24 * 3600, max_entries=1000,
+                                   path=f"./.{collection_name}_semantic_cache.json")
+    changed_ids = build_index(milvus_client, embedding_model)
+    if changed_ids:
+        semantic_cache.invalidate_ids(changed_ids)
+
+    # 未命中缓存的问题一次向量化、一次 search，再逐个流式生成回答，第一个 token 到达后立即输出
+    # 向量检索 + BM25 关键词检索混合，带条文编号的问题只走关键词检索；
+    # 再从 30 个候选中重排序取前 5 个，每个问题的重排序预算为 50ms
+    retriever = HybridRetriever(Retriever(milvus_client, collection_name, embedding_model),
+                                BM25Index.load(bm25_index_path))
+    retriever = RerankingRetriever(retriever, fetch_k=30, budget_ms=50)
+    questions = ["How is data stored in milvus?", "基本规定", "第一百五十九条"]
+    answer_questions(build_deepseek_client(), retriever, questions, limit=5,
+                     semantic_cache=semantic_cache, show_context=True)
+
+    semantic_cache.save()
+    print(f"语义缓存：{semantic_cache.stats()}")
+    print(f"上下文缓存：{prompt_cache_stats.stats()}")
+    embedding_model.save()
+    print(f"向量缓存：{embedding_model.stats()}")
+
+
+if __name__ == "__main__":
+    # 多进程向量化在 Windows 下以 spawn 方式启动子进程，入口代码必须放在 main 中
+    main()
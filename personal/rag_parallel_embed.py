@@ -0,0 +1,74 @@
+"""
+多进程并行向量化：把文本切成小批次分发到进程池，每个进程各自加载一份模型。
+
+输出顺序与输入顺序严格一致，因此基于顺序或内容生成的 id 都是确定的。
+注意：Windows 下进程池使用 spawn 方式启动，调用脚本必须放在 if __name__ == "__main__": 之下。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from rag_ingest import batched
+
+_worker_model = None
+
+
+def _init_worker(model_factory, threads_per_worker: int):
+    """子进程初始化：限制每个进程的计算线程数，避免多个进程抢占同一批 CPU 核心，然后加载模型。"""
+    global _worker_model
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    _worker_model = model_factory()
+
+
+def _encode_batch(batch: list) -> list:
+    return _worker_model.encode_documents(batch)
+
+
+class ParallelEmbeddingFunction:
+    """
+    提供 encode_documents / encode_queries 接口的并行向量模型。
+
+    Args:
+        model_factory: 无参可调用对象，返回向量模型；必须可以被 pickle（模块级函数或类）。
+        workers (int): 进程数，默认使用全部 CPU 核心。
+        batch_size (int): 每个子任务的文本条数。
+        threads_per_worker (int): 每个进程内模型使用的线程数。
+    """
+
+    def __init__(self, model_factory, workers: int = None, batch_size: int = 32,
+                 threads_per_worker: int = 1):
+        self.model_factory = model_factory
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._query_model = None
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(model_factory, threads_per_worker),
+        )
+
+    def encode_documents(self, documents: list) -> list:
+        """把 documents 切成小批次并行编码，结果按输入顺序返回。"""
+        embeddings = []
+        for batch_embeddings in self._pool.map(_encode_batch, batched(documents, self.batch_size)):
+            embeddings.extend(batch_embeddings)
+        return embeddings
+
+    def encode_queries(self, queries: list) -> list:
+        """查询通常只有几条，直接在当前进程编码，避免进程间通信开销。"""
+        if self._query_model is None:
+            self._query_model = self.model_factory()
+        return self._query_model.encode_queries(queries)
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
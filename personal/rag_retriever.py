@@ -0,0 +1,148 @@
+"""
+批量检索接口：一次向量化多个问题，并用一次多向量 search 调用取回所有结果。
+
+HybridRetriever 在向量检索之外再做 BM25 关键词检索，用倒数排名融合（RRF）合并两路结果；
+含有条文编号（如 "第一千零六十二条"）的问题只走关键词检索，不需要计算问题向量；关键词检索没有命中时退回向量检索。
+"""
+import re
+
+from rag_ingest import batched
+
+_ARTICLE_NUMBER = re.compile(r"第[零〇一二三四五六七八九十百千0-9]+条")
+
+
+class Retriever:
+    """
+    Args:
+        milvus_client: MilvusClient 实例。
+        collection_name (str): collection 名称。
+        embedding_model: 提供 encode_queries 方法的向量模型。
+        max_batch (int): 单次 search 调用最多携带的问题数，避免超出 Milvus 的 nq 上限。
+    """
+
+    def __init__(self, milvus_client, collection_name: str, embedding_model, max_batch: int = 256):
+        self.milvus_client = milvus_client
+        self.collection_name = collection_name
+        self.embedding_model = embedding_model
+        self.max_batch = max_batch
+
+    def search_many(self, questions: list, limit: int = 5, with_ids: bool = False, vectors: list = None) -> list:
+        """
+        批量检索。
+
+        Args:
+            questions (list): 问题列表。
+            limit (int): 每个问题返回的结果条数。
+            with_ids (bool): 为 True 时每条结果为 (id, text, distance)。
+            vectors (list): 可选，已经算好的问题向量，与 questions 一一对应；为 None 的项现场向量化。
+
+        Returns:
+            list: 与 questions 一一对应，每项为按相似度排序的 [(text, distance), ...]。
+        """
+        results = []
+        for batch in batched(range(len(questions)), self.max_batch):
+            batch_vectors = [vectors[i] for i in batch] if vectors is not None else [None] * len(batch)
+            missing = [k for k, vector in enumerate(batch_vectors) if vector is None]
+            if missing:
+                # 一次把整批缺少向量的问题转换为嵌入向量
+                encoded = self.embedding_model.encode_queries([questions[batch[k]] for k in missing])
+                for k, vector in zip(missing, encoded):
+                    batch_vectors[k] = vector
+            results.extend(self.search_vectors(batch_vectors, limit, with_ids))
+        return results
+
+    def search_vectors(self, vectors: list, limit: int = 5, with_ids: bool = False) -> list:
+        """用已经算好的问题向量检索，一次 search 调用携带全部向量。"""
+        search_res = self.milvus_client.search(
+            collection_name=self.collection_name,
+            data=vectors,
+            limit=limit,
+            search_params={"metric_type": "IP", "params": {}},  # 内积距离
+            output_fields=["text"],  # 返回 text 字段
+        )
+        if with_ids:
+            return [[(res["id"], res["entity"]["text"], res["distance"]) for res in hits] for hits in search_res]
+        return [[(res["entity"]["text"], res["distance"]) for res in hits] for hits in search_res]
+
+    def search(self, question: str, limit: int = 5) -> list:
+        """检索单个问题。"""
+        return self.search_many([question], limit)[0]
+
+
+class HybridRetriever:
+    """
+    Args:
+        retriever (Retriever): 向量检索器。
+        bm25_index: bm25_index.BM25Index，文本块 id 与向量库一致。
+        candidates (int): 每一路检索取回的候选数。
+        rrf_k (int): RRF 平滑常数，score = Σ 1 / (rrf_k + 排名)。
+    """
+
+    def __init__(self, retriever: Retriever, bm25_index, candidates: int = 20, rrf_k: int = 60):
+        self.retriever = retriever
+        self.bm25_index = bm25_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+    @property
+    def embedding_model(self):
+        return self.retriever.embedding_model
+
+    @staticmethod
+    def is_keyword_query(question: str) -> bool:
+        """问题里带有条文编号时，关键词检索比语义检索准确得多。"""
+        return bool(_ARTICLE_NUMBER.search(question))
+
+    def _fetch_texts(self, ids: list) -> dict:
+        """关键词命中的文本块按 id 从向量库取回文本，不需要向量化。"""
+        if not ids:
+            return {}
+        rows = self.retriever.milvus_client.get(
+            collection_name=self.retriever.collection_name, ids=ids, output_fields=["text"])
+        return {row["id"]: row["text"] for row in rows}
+
+    def search_many(self, questions: list, limit: int = 5, with_ids: bool = False, vectors: list = None) -> list:
+        """
+        批量混合检索，参数和返回格式与 Retriever.search_many 相同；
+        distance 为 RRF 融合分数（关键词检索时为 BM25 分数，退回向量检索时为向量距离）。
+        vectors 中只走关键词检索的问题对应的项可以为 None。
+        """
+        keyword_hits = [self.bm25_index.search(question, self.candidates) for question in questions]
+        keyword_only = [self.is_keyword_query(question) for question in questions]
+        # 关键词检索没有命中的问题（例如条文编号超出语料范围）退回向量检索，不返回空结果
+        semantic = [i for i, only in enumerate(keyword_only) if not only or not keyword_hits[i]]
+        vector_hits = {}
+        if semantic:
+            semantic_vectors = [vectors[i] for i in semantic] if vectors is not None else None
+            found = self.retriever.search_many([questions[i] for i in semantic], self.candidates,
+                                               with_ids=True, vectors=semantic_vectors)
+            vector_hits = dict(zip(semantic, found))
+
+        fused, texts = [], {}
+        for i in range(len(questions)):
+            if i in vector_hits:
+                texts.update((chunk, text) for chunk, text, _ in vector_hits[i])
+            if keyword_only[i]:
+                if keyword_hits[i]:
+                    fused.append(keyword_hits[i][:limit])
+                else:
+                    fused.append([(chunk, distance) for chunk, _, distance in vector_hits[i][:limit]])
+                continue
+            scores = {}
+            for rank, (chunk, _, _) in enumerate(vector_hits[i]):
+                scores[chunk] = scores.get(chunk, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            for rank, (chunk, _) in enumerate(keyword_hits[i]):
+                scores[chunk] = scores.get(chunk, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            fused.append(sorted(scores.items(), key=lambda item: -item[1])[:limit])
+
+        missing = list({chunk for hits in fused for chunk, _ in hits if chunk not in texts})
+        texts.update(self._fetch_texts(missing))
+
+        results = []
+        for hits in fused:
+            hits = [(chunk, texts[chunk], score) for chunk, score in hits if chunk in texts]
+            results.append(hits if with_ids else [(text, score) for _, text, score in hits])
+        return results
+
+    def search(self, question: str, limit: int = 5) -> list:
+        return self.search_many([question], limit)[0]
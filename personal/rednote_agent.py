@@ -0,0 +1,575 @@
+"""
+小红书文案生成 Agent：提示词、工具、并发工具调用、历史压缩和 react / structured 两种生成模式。
+
+rednote.py（交互式脚本）、rednote_batch.py（批量生成）和 chapter6/rednote.py（Ollama 上的 deepseek-r1）共用本模块；
+模块名与两个 rednote.py 脚本不同，可以从任意目录直接导入。
+"""
+import os
+
+from llm_client import get_client
+
+SYSTEM_PROMPT = """
+你是一个资深的小红书爆款文案专家，擅长结合最新潮流和产品卖点，创作引人入胜、高互动、高转化的笔记文案。
+
+你的任务是根据用户提供的产品和需求，生成包含标题、正文、相关标签和表情符号的完整小红书笔记。
+
+请始终采用'Thought-Action-Observation'模式进行推理和行动。文案风格需活泼、真诚、富有感染力。当完成任务后，请以JSON格式直接输出最终文案，格式如下：
+```json
+{
+  "title": "小红书标题",
+  "body": "小红书正文",
+  "hashtags": ["#标签1", "#标签2", "#标签3", "#标签4", "#标签5"],
+  "emojis": ["✨", "🔥", "💖"]
+}
+```
+在生成文案前，请务必先思考并收集足够的信息。
+"""
+
+TOOLS_DEFINITION = [
+    {
+        "type": "function",
+        "function": {
+            "name": "search_web",
+            "description": "搜索互联网上的实时信息，用于获取最新新闻、流行趋势、用户评价、行业报告等。请确保搜索关键词精确，避免宽泛的查询。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "要搜索的关键词或问题，例如'最新小红书美妆趋势'或'深海蓝藻保湿面膜 用户评价'"
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "query_product_database",
+            "description": "查询内部产品数据库，获取指定产品的详细卖点、成分、适用人群、使用方法等信息。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "product_name": {
+                        "type": "string",
+                        "description": "要查询的产品名称，例如'深海蓝藻保湿面膜'"
+                    }
+                },
+                "required": ["product_name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "generate_emoji",
+            "description": "根据提供的文本内容，生成一组适合小红书风格的表情符号。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "context": {
+                        "type": "string",
+                        "description": "文案的关键内容或情感，例如'惊喜效果'、'补水保湿'"
+                    }
+                },
+                "required": ["context"]
+            }
+        }
+    }
+]
+
+import random # 用于模拟生成表情
+import time # 用于模拟网络延迟
+
+def mock_search_web(query: str) -> str:
+    
+    """模拟网页搜索工具，返回预设的搜索结果。"""
+    print(f"[Tool Call] 模拟搜索网页：{query}")
+    
+    time.sleep(1) # 模拟网络延迟
+    
+    if "小红书美妆趋势" in query:
+        return "近期小红书美妆流行'多巴胺穿搭'、'早C晚A'护肤理念、'伪素颜'妆容，热门关键词有#氛围感、#抗老、#屏障修复。"
+    elif "保湿面膜" in query:
+        return "小红书保湿面膜热门话题：沙漠干皮救星、熬夜急救面膜、水光肌养成。用户痛点：卡粉、泛红、紧绷感。"
+    elif "深海蓝藻保湿面膜" in query:
+        return "关于深海蓝藻保湿面膜的用户评价：普遍反馈补水效果好，吸收快，对敏感肌友好。有用户提到价格略高，但效果值得。"
+    else:
+        return f"未找到关于 '{query}' 的特定信息，但市场反馈通常关注产品成分、功效和用户体验。"
+
+def mock_query_product_database(product_name: str) -> str:
+    
+    """模拟查询产品数据库，返回预设的产品信息。"""
+    print(f"[Tool Call] 模拟查询产品数据库：{product_name}")
+    
+    time.sleep(0.5) # 模拟数据库查询延迟
+    
+    if "深海蓝藻保湿面膜" in product_name:
+        return "深海蓝藻保湿面膜：核心成分为深海蓝藻提取物，富含多糖和氨基酸，能深层补水、修护肌肤屏障、舒缓敏感泛红。质地清爽不粘腻，适合所有肤质，尤其适合干燥、敏感肌。规格：25ml*5片。"
+    elif "美白精华" in product_name:
+        return "美白精华：核心成分是烟酰胺和VC衍生物，主要功效是提亮肤色、淡化痘印、改善暗沉。质地轻薄易吸收，适合需要均匀肤色的人群。"
+    else:
+        return f"产品数据库中未找到关于 '{product_name}' 的详细信息。"
+
+def mock_generate_emoji(context: str) -> list:
+
+    """模拟生成表情符号，根据上下文提供常用表情。"""
+    print(f"[Tool Call] 模拟生成表情符号，上下文：{context}")
+
+    time.sleep(0.2) # 模拟生成延迟
+    
+    if "补水" in context or "水润" in context or "保湿" in context:
+        return ["💦", "💧", "🌊", "✨"]
+    elif "惊喜" in context or "哇塞" in context or "爱了" in context:
+        return ["💖", "😍", "🤩", "💯"]
+    elif "熬夜" in context or "疲惫" in context:
+        return ["😭", "😮‍💨", "😴", "💡"]
+    elif "好物" in context or "推荐" in context:
+        return ["✅", "👍", "⭐", "🛍️"]
+    else:
+        return random.sample(["✨", "🔥", "💖", "💯", "🎉", "👍", "🤩", "💧", "🌿"], k=min(5, len(context.split())))
+
+from tool_cache import ToolResultCache
+
+# 工具结果缓存：趋势搜索 10 分钟过期，产品资料 1 天过期；表情生成本身很快且带随机性，不缓存
+# 设置 REDNOTE_TOOL_CACHE 环境变量时把缓存保存到该文件，跨进程复用
+tool_cache = ToolResultCache(
+    ttls={"search_web": 600, "query_product_database": 86400, "generate_emoji": 0},
+    max_entries=2048,
+    path=os.getenv("REDNOTE_TOOL_CACHE"),
+)
+
+# 将模拟工具函数映射到一个字典，方便通过名称调用；相同参数的调用直接返回缓存结果
+available_tools = tool_cache.wrap_tools({
+    "search_web": mock_search_web,
+    "query_product_database": mock_query_product_database,
+    "generate_emoji": mock_generate_emoji,
+})
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# 每个工具的超时时间（秒），从工具开始执行时计时；超时的工具返回错误信息作为 Observation，不阻塞本轮其他工具
+TOOL_TIMEOUTS = {
+    "search_web": 5.0,
+    "query_product_database": 3.0,
+    "generate_emoji": 2.0,
+}
+DEFAULT_TOOL_TIMEOUT = 5.0
+
+# 工具执行结果统计：abandoned 为超时后无法取消、仍在后台线程中运行的工具调用
+tool_run_stats = {"completed": 0, "failed": 0, "abandoned": 0}
+_tool_stats_lock = threading.Lock()
+
+def _count_tool_run(field: str):
+    with _tool_stats_lock:
+        tool_run_stats[field] += 1
+
+def _run_tool(function, started: dict, function_args: dict):
+    """在工具线程中执行工具，并记录开始执行的时间，超时从这里开始计算。"""
+    started["at"] = time.monotonic()
+    return function(**function_args)
+
+def execute_tool_calls(tool_calls) -> list:
+    """
+    并发执行模型在同一轮返回的所有工具调用。
+
+    每轮使用自己的线程池，线程数等于工具调用数，工具提交后立即开始执行，不会在其他会话的工具后面排队；
+    超时的工具线程无法被中断，记为 abandoned 并在后台跑完，不占用其他会话的线程。
+
+    Args:
+        tool_calls: response_message.tool_calls。
+
+    Returns:
+        list: role 为 tool 的消息列表，顺序与 tool_calls 中的 tool_call_id 顺序一致。
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, len(tool_calls)), thread_name_prefix="rednote-tool")
+    pending = []
+    for tool_call in tool_calls:
+        function_name = tool_call.function.name
+        timeout = TOOL_TIMEOUTS.get(function_name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            # 确保参数是合法的JSON字符串，即使工具不要求参数，也需要传递空字典
+            function_args = json.loads(tool_call.function.arguments) if tool_call.function.arguments else {}
+        except json.JSONDecodeError as e:
+            pending.append((tool_call, None, f"错误：工具 '{function_name}' 的参数不是合法的JSON：{e}", None, 0))
+            continue
+
+        print(f"Agent Action: 调用工具 '{function_name}'，参数：{function_args}")
+        if function_name in available_tools:
+            started = {}
+            future = executor.submit(_run_tool, available_tools[function_name], started, function_args)
+            pending.append((tool_call, future, None, started, timeout))
+        else:
+            pending.append((tool_call, None, f"错误：未知的工具 '{function_name}'", None, 0))
+
+    # 按原顺序收集结果，每个工具从开始执行时计算自己的超时
+    tool_outputs = []
+    for tool_call, future, content, started, timeout in pending:
+        if future is not None:
+            content = _wait_tool_result(tool_call.function.name, future, started, timeout)
+        else:
+            print(content)
+        tool_outputs.append({
+            "tool_call_id": tool_call.id,
+            "role": "tool",
+            "content": content
+        })
+    # 不等待被放弃的工具线程，它们跑完后线程自行退出
+    executor.shutdown(wait=False)
+    return tool_outputs
+
+def _wait_tool_result(function_name: str, future, started: dict, timeout: float) -> str:
+    while True:
+        # 还没开始执行时先按完整的超时等待，开始执行后按开始时间重新计算剩余时间
+        deadline = started.get("at", time.monotonic()) + timeout
+        try:
+            content = str(future.result(timeout=max(0.0, deadline - time.monotonic())))  # 工具结果作为字符串返回
+            _count_tool_run("completed")
+            print(f"Observation: 工具返回结果：{content}")
+            return content
+        except FutureTimeoutError:
+            if "at" not in started and future.cancel():
+                # 一直没有开始执行，已取消
+                content = f"错误：工具 '{function_name}' 未能开始执行"
+            elif "at" in started and time.monotonic() >= started["at"] + timeout:
+                # 正在运行的线程不能取消（future.cancel() 会失败），只能放弃等待
+                _count_tool_run("abandoned")
+                content = f"错误：工具 '{function_name}' 执行超时（{timeout:g}s），已放弃，结果不会被使用"
+            else:
+                continue  # 刚开始执行，按开始时间继续等待
+        except Exception as e:
+            _count_tool_run("failed")
+            content = f"错误：工具 '{function_name}' 执行失败：{e}"
+        print(content)
+        return content
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+
+from history_compaction import HistoryCompactor, TokenReport
+from json_extract import IncrementalJSONExtractor, extract_json, extract_rednote, validate_rednote
+from prompt_cache import PromptCacheStats, PromptPrefix
+
+# 固定的任务说明放在 user 消息开头，产品名和语气放在最后，
+# 这样 system 提示词、工具定义和任务说明在所有产品之间组成逐字节相同的前缀，可以命中 DeepSeek 的上下文缓存
+# 增加了“结合当前最新的流行趋势“，否则search_web这个函数不会调用
+USER_PROMPT_PREFIX = "请结合当前最新的流行趋势，为下面的产品生成一篇小红书爆款文案。要求：包含标题、正文、至少5个相关标签和5个表情符号。请以完整的JSON格式输出，并确保JSON内容用markdown代码块包裹（例如：```json{...}```）。\n"
+REDNOTE_PROMPT = PromptPrefix(SYSTEM_PROMPT, TOOLS_DEFINITION, USER_PROMPT_PREFIX)
+prompt_cache_stats = PromptCacheStats()
+
+# 结构化输出模式下，工具收集结束后追加的最终指令；DeepSeek 的 JSON 模式要求提示词中出现 json 字样并给出格式
+STRUCTURED_OUTPUT_PROMPT = "请根据以上收集到的信息，直接输出最终文案的json对象，包含 title、body、hashtags、emojis 四个字段，格式与系统提示中的示例相同，不要输出其他内容。"
+# 服务端不支持工具调用（gather_tools=False）时使用的 JSON 模式提示词：没有工具，不要求 Thought-Action-Observation 推理，
+# 也不要求 markdown 代码块，直接输出 response_format=json_object 所需的 json 对象
+JSON_SYSTEM_PROMPT = """
+你是一个资深的小红书爆款文案专家，擅长结合最新潮流和产品卖点，创作引人入胜、高互动、高转化的笔记文案。
+
+你的任务是根据用户提供的产品和需求，生成包含标题、正文、相关标签和表情符号的完整小红书笔记。文案风格需活泼、真诚、富有感染力。
+只输出一个 json 对象，不要输出代码块标记或其他内容，格式如下：
+{
+  "title": "小红书标题",
+  "body": "小红书正文",
+  "hashtags": ["#标签1", "#标签2", "#标签3", "#标签4", "#标签5"],
+  "emojis": ["✨", "🔥", "💖"]
+}
+"""
+JSON_USER_PROMPT_PREFIX = "请结合当前最新的流行趋势，为下面的产品生成一篇小红书爆款文案。要求：包含标题、正文、至少5个相关标签和5个表情符号，以json对象输出。\n"
+JSON_REDNOTE_PROMPT = PromptPrefix(JSON_SYSTEM_PROMPT, None, JSON_USER_PROMPT_PREFIX)
+
+# 结构化输出的内容不符合文案格式时追加的重试指令
+STRUCTURED_RETRY_PROMPT = "上面的输出不是合法的文案json对象：{error}。请重新输出完整的json对象，包含 title、body、hashtags、emojis 四个字段，不要输出其他内容。"
+
+def stream_chat_completion(llm_client, messages: list, extractor: IncrementalJSONExtractor = None,
+                           prompt: PromptPrefix = REDNOTE_PROMPT, **request_kwargs):
+    """
+    以流式方式调用模型，正文边生成边打印。
+
+    工具调用以增量形式返回：同一个 index 的 id、函数名和参数分散在多个 chunk 里，需要拼接起来。
+    正文里的 ```json 代码块（或 extractor 要找的对象）一闭合就解析并关闭连接，不再等待后续输出。
+
+    Args:
+        extractor: 增量 JSON 提取器，默认提取 ```json 代码块中字段合法的文案。
+        prompt (PromptPrefix): 请求前缀，决定是否带工具定义；默认为带工具的 REDNOTE_PROMPT。
+        **request_kwargs: 透传给 chat.completions.create，例如 model、tool_choice、response_format。
+
+    Returns:
+        tuple: (response_message, final_json, usage)。response_message 是拼好的 ChatCompletionMessage，
+               final_json 是提前解析出的文案 dict，没有解析出时为 None；
+               usage 是最后一个 chunk 带回的 token 用量，提前结束时为 None。
+    """
+    response = llm_client.chat.completions.create(**prompt.request(
+        messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        **request_kwargs
+    ))
+
+    extractor = extractor or IncrementalJSONExtractor(validator=validate_rednote)
+    content_parts = []
+    tool_calls = {}  # index -> 拼接中的工具调用
+    final_json = None
+    usage = None
+    try:
+        for chunk in response:
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                print(delta.content, end="", flush=True)
+                content_parts.append(delta.content)
+                final_json = extractor.feed(delta.content)
+                if final_json is not None:
+                    break
+            for tool_call_delta in delta.tool_calls or []:
+                tool_call = tool_calls.setdefault(tool_call_delta.index, {
+                    "id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+                if tool_call_delta.id:
+                    tool_call["id"] = tool_call_delta.id
+                if tool_call_delta.function:
+                    tool_call["function"]["name"] += tool_call_delta.function.name or ""
+                    tool_call["function"]["arguments"] += tool_call_delta.function.arguments or ""
+    finally:
+        response.close()  # 提前拿到 JSON 时停止接收剩余输出
+    if content_parts:
+        print()
+
+    response_message = ChatCompletionMessage(
+        role="assistant",
+        content="".join(content_parts) or None,
+        tool_calls=[ChatCompletionMessageToolCall(**tool_calls[index]) for index in sorted(tool_calls)] or None,
+    )
+    return response_message, final_json, usage
+
+def request_structured_output(llm_client, messages: list, compactor: HistoryCompactor, stream: bool,
+                              prompt: PromptPrefix = REDNOTE_PROMPT, **request_kwargs):
+    """
+    结构化输出模式的一次最终调用：用 response_format=json_object 约束模型只输出 JSON 对象。
+    最终指令（或重试指令）由调用方追加到 messages 末尾。
+
+    使用带工具的 REDNOTE_PROMPT 时请求里仍然带着工具定义（tool_choice="none" 禁止调用），历史由前面各轮共用的
+    compactor 压缩，保持与前面各轮相同的前缀以命中上下文缓存；不收集工具信息时使用没有工具的 JSON_REDNOTE_PROMPT。
+
+    Returns:
+        tuple: (文案 dict, 错误信息, usage, 实际发送的 messages, 模型输出的原文)，成功时错误信息为 None。
+    """
+    request_messages = compactor.compact(messages)
+    request_kwargs["response_format"] = {"type": "json_object"}
+    if prompt.tools:
+        request_kwargs["tool_choice"] = "none"
+
+    if stream:
+        extractor = IncrementalJSONExtractor(require_fence=False, validator=validate_rednote)
+        response_message, final_response, usage = stream_chat_completion(
+            llm_client, request_messages, extractor, prompt, **request_kwargs)
+        content = response_message.content or ""
+        if final_response is not None:
+            return final_response, None, usage, request_messages, content
+    else:
+        response = llm_client.chat.completions.create(**prompt.request(request_messages, **request_kwargs))
+        usage = getattr(response, "usage", None)
+        content = response.choices[0].message.content or ""
+        print(f"[模型生成结果] {content}")
+    # deepseek-r1 等推理模型可能在 JSON 前输出 <think> 推理过程，由 extract_json 跳过
+    final_response, error = extract_json(content, validator=validate_rednote)
+    return final_response, error, usage, request_messages, content
+
+def generate_rednote(product_name: str, tone_style: str = "活泼甜美", max_iterations: int = 5, llm_client=None,
+                     stream: bool = False, max_prompt_tokens: int = 3000, mode: str = "react",
+                     model: str = "deepseek-chat", gather_tools: bool = True, **request_kwargs) -> str:
+    """
+    使用 DeepSeek Agent 生成小红书爆款文案。
+
+    两种模式共用工具调用、历史压缩和上下文缓存布局，区别在于模型没有给出合法 JSON 时怎么办：
+    - react：把错误反馈给模型，再走一轮完整的 ReAct 迭代，最多 max_iterations 轮；
+    - structured：模型不再调用工具后，如果回复里没有合法文案，改用 response_format=json_object 调用，
+      直接得到 JSON 对象，不再走完整的 ReAct 迭代；工具收集阶段最多 max_iterations - 1 轮，为最终调用留出至少一轮，
+      JSON 对象不符合文案格式时把错误反馈给模型重新生成，直到用满 max_iterations 次调用。
+    
+    Args:
+        product_name (str): 要生成文案的产品名称。
+        tone_style (str): 文案的语气和风格，如"活泼甜美"、"知性"、"搞怪"等。
+        max_iterations (int): Agent 最大迭代次数（即最多调用模型的次数），防止无限循环。
+        llm_client: 调用模型使用的客户端，默认使用 llm_client.get_client("deepseek")；批量生成时传入共享的连接池客户端。
+        stream (bool): 是否流式输出，流式时正文边生成边打印，JSON 一闭合就返回。
+        max_prompt_tokens (int): 每次请求的估算 prompt token 上限，较早的工具结果会被截断或省略。
+        mode (str): "react" 或 "structured"。
+        model (str): 模型名称。
+        gather_tools (bool): 是否让模型调用工具收集信息；服务端不支持工具调用时设为 False，结构化模式下改用
+                             不带工具、直接要求 json 对象的 JSON_REDNOTE_PROMPT，只做最终的 JSON 调用。
+        **request_kwargs: 透传给 chat.completions.create 的其他参数，例如 temperature。
+        
+    Returns:
+        str: 生成的爆款文案(JSON 格式字符串）。
+    """
+    if mode not in ("react", "structured"):
+        raise ValueError(f"未知的生成模式 {mode}，可选 react / structured")
+    structured = mode == "structured"
+    llm_client = llm_client or get_client("deepseek")
+    request_kwargs["model"] = model
+    print(f"\n🚀 启动小红书文案生成助手，产品：{product_name}，风格：{tone_style}，模式：{mode}\n")
+    
+    # 结构化模式不收集工具信息时，不发送工具定义和 ReAct 推理要求
+    json_only = structured and not gather_tools
+    prompt = JSON_REDNOTE_PROMPT if json_only else REDNOTE_PROMPT
+    # 存储对话历史，包括系统提示词和用户请求；可变的产品名和语气放在请求的最后
+    messages = prompt.messages(f"产品：{product_name}\n语气：{tone_style}")
+    
+    
+    iteration_count = 0
+    final_response = None
+    token_report = TokenReport()
+    # 同一次对话的各轮共用一个压缩器，已经压缩的较早轮次保持逐字节不变，整段历史前缀都能命中上下文缓存
+    compactor = HistoryCompactor(max_prompt_tokens)
+    # 结构化模式为最终的 JSON 调用留出一轮；不收集工具信息时直接进入最终调用
+    tool_rounds = (max_iterations - 1 if gather_tools else 0) if structured else max_iterations
+    
+    while iteration_count < tool_rounds:
+        iteration_count += 1
+        print(f"-- Iteration {iteration_count} --")
+        
+        try:
+            # 完整历史保留在 messages 中，每轮只发送压缩后的副本
+            request_messages = compactor.compact(messages)
+            call_start = time.perf_counter()
+            if stream:
+                response_message, final_response, usage = stream_chat_completion(
+                    llm_client, request_messages, tool_choice="auto", **request_kwargs)
+                prompt_cache_stats.record(usage, time.perf_counter() - call_start)
+                token_report.add(iteration_count, messages, request_messages, usage)
+                token_report.print_row()
+                if final_response is not None:
+                    print("Agent: 任务完成，流式解析出最终JSON文案。")
+                    token_report.print_summary()
+                    return json.dumps(final_response, ensure_ascii=False, indent=2)
+            else:
+                # 调用 DeepSeek API，传入对话历史和工具定义
+                # 工具定义由 REDNOTE_PROMPT 固定提供，告知模型可用的工具
+                response = llm_client.chat.completions.create(**REDNOTE_PROMPT.request(
+                    request_messages,
+                    tool_choice="auto", # 允许模型自动决定是否使用工具
+                    **request_kwargs
+                ))
+
+                # print(f"message：{0}",messages)
+
+                response_message = response.choices[0].message
+                prompt_cache_stats.record(getattr(response, "usage", None), time.perf_counter() - call_start)
+                token_report.add(iteration_count, messages, request_messages, getattr(response, "usage", None))
+                token_report.print_row()
+
+            # print(f"response_message：{0}",response_message)
+            
+            # **ReAct模式：处理工具调用**
+            if response_message.tool_calls: # 如果模型决定调用工具
+                print("Agent: 决定调用工具...")
+                messages.append(response_message) # 将工具调用信息添加到对话历史
+                
+                # print(f"append_message：{0}",messages)
+
+                # 同一轮的多个工具调用并发执行，耗时取决于最慢的那个工具
+                tool_outputs = execute_tool_calls(response_message.tool_calls)
+                messages.extend(tool_outputs) # 将工具执行结果作为 Observation 添加到对话历史
+                
+            # **ReAct 模式：处理最终内容**
+            elif response_message.content: # 如果模型直接返回内容（通常是最终答案）
+                if not stream: # 流式模式下正文已经边生成边打印过了
+                    print(f"[模型生成结果] {response_message.content}")
+                
+                # 单遍扫描：优先取 ```json 代码块，其次取正文中第一个完整且字段合法的 JSON 对象
+                final_response, error = extract_rednote(response_message.content)
+                if final_response is not None:
+                    print("Agent: 任务完成，成功解析最终JSON文案。")
+                    token_report.print_summary()
+                    return json.dumps(final_response, ensure_ascii=False, indent=2)
+                messages.append(response_message)
+                if structured:
+                    print(f"Agent: 回复中没有合法的JSON文案（{error}），改用结构化输出生成最终文案。")
+                    break
+                print(f"Agent: 未能提取到合法的JSON文案（{error}），继续对话。")
+                messages.append({"role": "user", "content": f"上面的回复没有包含合法的文案JSON：{error}。请修正后重新输出完整的```json代码块，包含 title、body、hashtags、emojis 四个字段。"})
+            else:
+                print("Agent: 未知响应，可能需要更多交互。")
+                break
+                
+        except Exception as e:
+            # 可重试的错误已经由 llm_client 按退避策略重试过，到这里说明重试用尽或请求本身有问题
+            print(f"调用 DeepSeek API 时发生错误: {e}")
+            token_report.print_summary()
+            return "未能成功生成文案"
+
+    if structured:
+        if not json_only:  # JSON 模式的任务说明本身就要求输出 json 对象
+            messages.append({"role": "user", "content": STRUCTURED_OUTPUT_PROMPT})
+        while True:
+            iteration_count += 1
+            print(f"-- Iteration {iteration_count}（结构化输出） --")
+            try:
+                call_start = time.perf_counter()
+                final_response, error, usage, request_messages, content = request_structured_output(
+                    llm_client, messages, compactor, stream, prompt, **request_kwargs)
+                prompt_cache_stats.record(usage, time.perf_counter() - call_start)
+                token_report.add(iteration_count, messages, request_messages, usage)
+                token_report.print_row()
+            except Exception as e:
+                print(f"调用 DeepSeek API 时发生错误: {e}")
+                token_report.print_summary()
+                return "未能成功生成文案"
+            if final_response is not None:
+                token_report.print_summary()
+                print("Agent: 任务完成，结构化输出得到最终JSON文案。")
+                return json.dumps(final_response, ensure_ascii=False, indent=2)
+            print(f"Agent: 结构化输出的内容不符合文案格式：{error}")
+            if iteration_count >= max_iterations:
+                break
+            # 把不合格的输出和错误反馈给模型，重新生成
+            messages.append({"role": "assistant", "content": content})
+            messages.append({"role": "user", "content": STRUCTURED_RETRY_PROMPT.format(error=error)})
+
+    token_report.print_summary()
+    print("\nAgent 达到最大迭代次数或未能生成最终文案。请检查Prompt或增加迭代次数。")
+    return "未能成功生成文案"
+
+import json
+
+def format_rednote_for_markdown(json_string: str) -> str:
+    """
+    将 JSON 格式的小红书文案转换为 Markdown 格式，以便于阅读和发布。
+
+    Args:
+        json_string (str): 包含小红书文案的 JSON 字符串。
+                           预计格式为 {"title": "...", "body": "...", "hashtags": [...], "emojis": [...]}
+
+    Returns:
+        str: 格式化后的 Markdown 文本。
+    """
+    try:
+        data = json.loads(json_string)
+    except json.JSONDecodeError as e:
+        return f"错误：无法解析 JSON 字符串 - {e}\n原始字符串：\n{json_string}"
+
+    title = data.get("title", "无标题")
+    body = data.get("body", "")
+    hashtags = data.get("hashtags", [])
+    # 表情符号通常已经融入标题和正文中，这里可以选择是否单独列出
+    # emojis = data.get("emojis", []) 
+
+    # 构建 Markdown 文本
+    markdown_output = f"## {title}\n\n" # 标题使用二级标题
+    
+    # 正文，保留换行符
+    markdown_output += f"{body}\n\n"
+    
+    # Hashtags
+    if hashtags:
+        hashtag_string = " ".join(hashtags) # 小红书标签通常是空格分隔
+        markdown_output += f"{hashtag_string}\n"
+        
+    # 如果需要，可以单独列出表情符号，但通常它们已经包含在标题和正文中
+    # if emojis:
+    #     emoji_string = " ".join(emojis)
+    #     markdown_output += f"\n使用的表情：{emoji_string}\n"
+        
+    return markdown_output.strip() # 去除末尾多余的空白
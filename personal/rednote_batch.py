@@ -0,0 +1,147 @@
+"""
+小红书文案批量生成：从 JSONL / CSV 读取产品和语言风格，多个 generate_rednote 会话并发执行。
+
+- 所有会话共享同一个 llm_client.LLMClient，连接池大小与并发数一致；
+- 遇到 429 限流时，客户端进入冷却，所有会话一起暂停（优先使用 Retry-After，否则指数退避加随机抖动），
+  再重试被限流的请求；
+- 每完成一个产品就把结果追加写入输出 JSONL，输出文件同时是断点：重新运行时跳过已经成功的产品。
+
+输入格式（每个产品可以带 id，没有 id 时用 "产品名称|语言风格" 作为 id）：
+    {"product_name": "深海蓝藻保湿面膜", "tone_style": "活泼甜美"}
+    product_name,tone_style        （CSV 需要表头）
+用法：
+    python rednote_batch.py products.jsonl rednotes.jsonl --concurrency 16
+    python rednote_batch.py products.csv rednotes.jsonl --quiet
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from llm_client import create_client
+from rednote_agent import generate_rednote, prompt_cache_stats, tool_cache, tool_run_stats
+
+
+def load_products(path: str) -> list:
+    """读取 JSONL 或 CSV 文件，返回 [{"id", "product_name", "tone_style"}, ...]。"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as file:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(file))
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+
+    products = []
+    for row in rows:
+        product_name = (row.get("product_name") or "").strip()
+        if not product_name:
+            continue
+        tone_style = (row.get("tone_style") or "").strip() or "活泼甜美"
+        products.append({
+            "id": str(row.get("id") or f"{product_name}|{tone_style}"),
+            "product_name": product_name,
+            "tone_style": tone_style,
+        })
+    return products
+
+
+def load_finished_ids(path: str) -> set:
+    """读取已有的输出文件，返回已经成功生成的产品 id；失败的记录会在下次运行时重试。"""
+    if not os.path.exists(path):
+        return set()
+    finished = set()
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 上次运行中断时可能留下写了一半的行
+            if record.get("ok"):
+                finished.add(record["id"])
+    return finished
+
+
+def run_one(product: dict, llm_client, max_iterations: int, mode: str = "react") -> dict:
+    start = time.perf_counter()
+    result = generate_rednote(product["product_name"], product["tone_style"],
+                              max_iterations=max_iterations, llm_client=llm_client, mode=mode)
+    record = dict(product, seconds=round(time.perf_counter() - start, 3))
+    try:
+        record.update(ok=True, note=json.loads(result))
+    except json.JSONDecodeError:
+        record.update(ok=False, error=result)
+    return record
+
+
+def run_batch(products: list, output_path: str, concurrency: int = 8, max_iterations: int = 5,
+              llm_client=None, mode: str = "react") -> dict:
+    """
+    并发生成文案，每完成一个产品立即追加写入 output_path，返回汇总统计。
+
+    Args:
+        products (list): load_products 的返回值。
+        output_path (str): 输出 JSONL，也是断点文件，已经成功的产品会被跳过。
+        concurrency (int): 同时运行的会话数。
+        max_iterations (int): 每个会话的最大迭代次数。
+        llm_client: 所有会话共享的客户端，默认创建一个连接池大小等于 concurrency 的 LLMClient。
+        mode (str): generate_rednote 的生成模式，react 或 structured。
+    """
+    finished = load_finished_ids(output_path)
+    todo = [product for product in products if product["id"] not in finished]
+    print(f"共 {len(products)} 个产品，已完成 {len(products) - len(todo)} 个，本次生成 {len(todo)} 个",
+          file=sys.stderr)
+
+    if llm_client is None:
+        llm_client = create_client("deepseek", max_connections=concurrency)
+
+    stats = {"total": len(todo), "ok": 0, "failed": 0, "skipped": len(products) - len(todo)}
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as output, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="rednote-batch") as executor:
+        futures = {executor.submit(run_one, product, llm_client, max_iterations, mode): product for product in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                record = future.result()
+            except Exception as e:
+                record = dict(futures[future], ok=False, error=str(e))
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()  # 逐条落盘，中断后可以从这里继续
+            stats["ok" if record["ok"] else "failed"] += 1
+            print(f"[{done}/{len(todo)}] {'✅' if record['ok'] else '❌'} {record['id']}", file=sys.stderr)
+
+    tool_cache.save()
+    stats["seconds"] = time.perf_counter() - start
+    stats["tool_cache"] = tool_cache.stats()
+    stats["tools"] = dict(tool_run_stats)
+    stats["prompt_cache"] = prompt_cache_stats.stats()
+    if hasattr(llm_client, "metrics"):
+        stats["llm"] = llm_client.metrics.summary()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="小红书文案批量生成")
+    parser.add_argument("input", help="产品列表，JSONL 或 CSV（字段 product_name、tone_style，可选 id）")
+    parser.add_argument("output", help="输出 JSONL，中断后用同一个文件重新运行即可继续")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-iterations", type=int, default=5)
+    parser.add_argument("--mode", choices=["react", "structured"], default="react",
+                        help="structured：工具调用结束后用 response_format=json_object 直接生成最终文案")
+    parser.add_argument("--quiet", action="store_true", help="不输出每个会话的 Agent 过程，只在 stderr 输出进度")
+    args = parser.parse_args()
+
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w", encoding="utf-8")
+    stats = run_batch(load_products(args.input), args.output, args.concurrency, args.max_iterations, mode=args.mode)
+    print(f"完成：成功 {stats['ok']}，失败 {stats['failed']}，跳过 {stats['skipped']}，"
+          f"耗时 {stats['seconds']:.1f}s", file=sys.stderr)
+    print(f"LLM 调用：{stats.get('llm')}", file=sys.stderr)
+    print(f"工具缓存：{stats['tool_cache']}", file=sys.stderr)
+    print(f"工具执行：{stats['tools']}", file=sys.stderr)
+    print(f"上下文缓存：{stats['prompt_cache']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
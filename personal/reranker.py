@@ -0,0 +1,117 @@
+"""
+重排序阶段：从向量检索多取 fetch_k 个候选，用重排序模型重新打分后取前 limit 个。
+
+每个问题都有时间预算：候选按批次打分，预算用完时停止打分，
+已打分的候选按新分数排序，剩余候选保持原来的向量检索顺序排在后面。
+重排序模型可插拔：
+- LexicalOverlapReranker（默认）：问题词项在候选中的覆盖率，纯 Python 实现，几乎不增加延迟；
+- CrossEncoderReranker：本地 cross-encoder 模型，需要安装 sentence-transformers。
+"""
+import time
+
+from bm25_index import tokenize
+
+
+class LexicalOverlapReranker:
+    """按问题词项（汉字二元组、英文单词）在候选文本中出现的比例打分。"""
+
+    def score(self, question: str, texts: list) -> list:
+        query_terms = set(tokenize(question))
+        if not query_terms:
+            return [0.0] * len(texts)
+        return [len(query_terms.intersection(tokenize(text))) / len(query_terms) for text in texts]
+
+
+class CrossEncoderReranker:
+    """
+    本地 cross-encoder 重排序模型，第一次打分时才加载。
+
+    Args:
+        model_name (str): sentence-transformers 支持的 cross-encoder 模型名称。
+        batch_size (int): 模型内部的推理批大小。
+    """
+
+    def __init__(self, model_name: str = "BAAI/bge-reranker-base", batch_size: int = 16):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+
+    def score(self, question: str, texts: list) -> list:
+        if self._model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise ImportError("CrossEncoderReranker 需要安装 sentence-transformers：pip install sentence-transformers") from e
+            self._model = CrossEncoder(self.model_name)
+        return [float(s) for s in self._model.predict([(question, text) for text in texts],
+                                                     batch_size=self.batch_size)]
+
+
+class RerankingRetriever:
+    """
+    Args:
+        retriever: Retriever 或 HybridRetriever。
+        reranker: 提供 score(question, texts) 方法的重排序模型。
+        fetch_k (int): 从 retriever 取回的候选数。
+        budget_ms (float): 每个问题的重排序时间预算（毫秒）。
+        batch_size (int): 每批打分的候选数，每批结束后检查一次预算。
+    """
+
+    def __init__(self, retriever, reranker=None, fetch_k: int = 30, budget_ms: float = 50.0, batch_size: int = 8):
+        self.retriever = retriever
+        self.reranker = reranker or LexicalOverlapReranker()
+        self.fetch_k = fetch_k
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.counters = {"queries": 0, "degraded": 0, "rerank_seconds": 0.0}
+
+    @property
+    def embedding_model(self):
+        return self.retriever.embedding_model
+
+    @property
+    def is_keyword_query(self):
+        """
+        转发 HybridRetriever 的判断，answer_questions 据此不为只走关键词检索的问题计算向量；
+        包装的是 Retriever 时没有这个属性（抛出 AttributeError），getattr 得到默认值。
+        """
+        return self.retriever.is_keyword_query
+
+    def rerank(self, question: str, hits: list) -> list:
+        """对 [(id, text, distance), ...] 重排序，返回同样格式的列表，distance 换成重排序分数。"""
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000
+        scores = []
+        for begin in range(0, len(hits), self.batch_size):
+            if begin > 0 and time.perf_counter() >= deadline:
+                break
+            scores.extend(self.reranker.score(question, [text for _, text, _ in hits[begin:begin + self.batch_size]]))
+
+        scored = sorted(zip(scores, range(len(scores))), key=lambda item: (-item[0], item[1]))
+        reranked = [(hits[i][0], hits[i][1], score) for score, i in scored]
+        reranked += hits[len(scores):]  # 预算用完没来得及打分的候选，保持向量检索顺序
+
+        self.counters["queries"] += 1
+        self.counters["degraded"] += len(scores) < len(hits)
+        self.counters["rerank_seconds"] += time.perf_counter() - start
+        return reranked
+
+    def search_many(self, questions: list, limit: int = 5, with_ids: bool = False, vectors: list = None) -> list:
+        """参数和返回格式与 Retriever.search_many 相同。"""
+        candidates = self.retriever.search_many(questions, self.fetch_k, with_ids=True, vectors=vectors)
+        results = []
+        for question, hits in zip(questions, candidates):
+            hits = self.rerank(question, hits)[:limit]
+            results.append(hits if with_ids else [(text, score) for _, text, score in hits])
+        return results
+
+    def search(self, question: str, limit: int = 5) -> list:
+        return self.search_many([question], limit)[0]
+
+    def stats(self) -> dict:
+        queries = self.counters["queries"]
+        return {
+            "queries": queries,
+            "degraded": self.counters["degraded"],
+            "avg_rerank_ms": self.counters["rerank_seconds"] * 1000 / queries if queries else 0.0,
+        }
@@ -0,0 +1,147 @@
+"""
+语义答案缓存：放在 RAG 流程前面，相同或语义相近的问题直接返回缓存的回答，
+省掉向量检索和 LLM 调用。
+
+每条缓存记录保存 (问题向量, 检索到的文本块 id, 最终回答)：
+- 问题文本规范化后完全相同时直接命中，连问题向量都不需要计算；
+- 否则与所有缓存问题向量比较余弦相似度，达到阈值即命中；
+- 只走关键词检索的问题没有计算向量，记录里不保存向量，只能按文本精确命中；
+- 文本块被重新索引（修改或删除）后，引用了这些 id 的记录会被清除；
+- 超过 TTL 的记录视为过期，超过容量时淘汰最久未使用的记录。
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import normalize_text
+
+
+class _Entry:
+    def __init__(self, question: str, vector, ids: list, answer: str, created_at: float):
+        self.question = question
+        self.vector = None
+        if vector is not None:
+            self.vector = np.asarray(vector, dtype=np.float32)
+            self.vector = self.vector / max(float(np.linalg.norm(self.vector)), 1e-12)
+        self.ids = [int(i) for i in ids]
+        self.answer = answer
+        self.created_at = created_at
+
+
+class SemanticCache:
+    """
+    Args:
+        threshold (float): 余弦相似度达到该值视为同一个问题。
+        ttl (float): 记录的有效期（秒），None 表示不过期。
+        max_entries (int): 最多缓存的记录数，超出后按 LRU 淘汰。
+        path (str): 可选，缓存文件路径；指定后启动时加载，调用 save 时写入。
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 24 * 3600, max_entries: int = 1000,
+                 path: str = None):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()  # 规范化问题 -> _Entry，越靠后越近被使用
+        self._matrix = None  # 所有记录问题向量组成的矩阵，记录变化后惰性重建
+        self._keys = []
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                         "expired": 0, "evicted": 0, "invalidated": 0}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for item in json.load(file):
+                    entry = _Entry(item["question"], item["vector"], item["ids"], item["answer"], item["created_at"])
+                    self._entries[normalize_text(entry.question)] = entry
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.ttl is not None and time.time() - entry.created_at > self.ttl
+
+    def _remove(self, key: str):
+        del self._entries[key]
+        self._matrix = None
+
+    def lookup_text(self, question: str, count_miss: bool = False):
+        """
+        问题文本规范化后完全相同时返回缓存的回答，否则返回 None。
+
+        默认不计入未命中（之后通常还会调用 lookup 按向量匹配）；不再按向量匹配的问题传入 count_miss=True。
+        """
+        key = normalize_text(question)
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            self._remove(key)
+            self.counters["expired"] += 1
+            entry = None
+        if entry is None:
+            self.counters["misses"] += count_miss
+            return None
+        self._entries.move_to_end(key)
+        self.counters["exact_hits"] += 1
+        return entry.answer
+
+    def lookup(self, question: str, vector):
+        """先按文本精确匹配，再按问题向量的余弦相似度匹配；未命中返回 None。"""
+        answer = self.lookup_text(question)
+        if answer is not None:
+            return answer
+        if self._matrix is None:
+            self._keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+            if self._keys:
+                self._matrix = np.stack([self._entries[key].vector for key in self._keys])
+        if self._keys:
+            query = np.asarray(vector, dtype=np.float32)
+            scores = self._matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+            for best in np.argsort(-scores):
+                if scores[best] < self.threshold:
+                    break
+                key = self._keys[best]
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if self._expired(entry):
+                    self._remove(key)
+                    self.counters["expired"] += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.counters["semantic_hits"] += 1
+                return entry.answer
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, question: str, vector, ids: list, answer: str):
+        """缓存一个问题的回答，ids 为生成回答时用到的文本块 id；vector 为 None 时只能按文本精确命中。"""
+        key = normalize_text(question)
+        self._entries[key] = _Entry(question, vector, ids, answer, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evicted"] += 1
+        self._matrix = None
+
+    def invalidate_ids(self, ids) -> int:
+        """清除引用了任一给定文本块 id 的记录，返回清除的条数。"""
+        ids = {int(i) for i in ids}
+        stale = [key for key, entry in self._entries.items() if ids.intersection(entry.ids)]
+        for key in stale:
+            self._remove(key)
+        self.counters["invalidated"] += len(stale)
+        return len(stale)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump([{"question": entry.question, "vector": None if entry.vector is None else entry.vector.tolist(), "ids": entry.ids,
+                        "answer": entry.answer, "created_at": entry.created_at}
+                       for entry in self._entries.values()], file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+        total = hits + self.counters["misses"]
+        return dict(self.counters, size=len(self._entries), hit_rate=hits / total if total else 0.0)
@@ -0,0 +1,47 @@
+import json
+import unittest
+
+from history_compaction import HistoryCompactor, count_tokens
+
+
+def tool_round(call_id: str, content: str) -> list:
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "search_web", "arguments": "{}"}}]},
+        {"role": "tool", "tool_call_id": call_id, "content": content},
+    ]
+
+
+class TestHistoryCompactor(unittest.TestCase):
+    def setUp(self):
+        self.messages = [{"role": "system", "content": "系统提示"}, {"role": "user", "content": "为面膜生成文案"}]
+
+    def test_failed_retries_within_budget(self):
+        """测试一轮工具调用之后连续多次 JSON 解析失败时，发送的估算 token 数仍不超过预算"""
+        self.messages += tool_round("call_0", "搜索结果" * 1000)
+        for _ in range(4):
+            self.messages.append({"role": "assistant", "content": "文案草稿" * 1250})
+            self.messages.append({"role": "user", "content": "上面的回复没有包含合法的文案JSON，请修正。"})
+        compactor = HistoryCompactor(max_prompt_tokens=3000)
+        self.assertGreater(count_tokens(self.messages), 3000)
+        sent = compactor.compact(self.messages)
+        self.assertLessEqual(count_tokens(sent), 3000)
+        self.assertEqual(len(sent), len(self.messages))
+        self.assertEqual(sent[-1], self.messages[-1])
+
+    def test_prefix_stable_between_chunks(self):
+        """测试已经固定的消息在之后的请求中逐字节不变，没有新固定一段时上一次请求整体是这一次的前缀"""
+        compactor = HistoryCompactor(max_prompt_tokens=100_000, chunk_rounds=2)
+        previous, previous_frozen = [], 0
+        for i in range(7):
+            self.messages += tool_round(f"call_{i}", f"第 {i} 次搜索结果" * 100)
+            current = [json.dumps(message, ensure_ascii=False) for message in compactor.compact(self.messages)]
+            frozen = len(compactor._compacted)
+            self.assertEqual(current[:previous_frozen], previous[:previous_frozen])
+            if frozen == previous_frozen:
+                self.assertEqual(current[:len(previous)], previous)
+            previous, previous_frozen = current, frozen
+        self.assertGreater(previous_frozen, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import random
+import unittest
+
+from json_extract import IncrementalJSONExtractor, extract_json, extract_rednote, validate_rednote
+
+NOTE = '{"title": "补水{神器}", "body": "他说：\\"真的}好用\\"", "hashtags": ["#面膜"], "emojis": ["💧"]}'
+
+
+class TestExtractRednote(unittest.TestCase):
+    def test_fenced_object(self):
+        """测试从 ```json 代码块中提取文案，字符串里的括号和转义引号不影响配对"""
+        data, error = extract_rednote(f"好的，文案如下：\n```json\n{NOTE}\n```\n希望你喜欢 {{}}")
+        self.assertIsNone(error)
+        self.assertEqual(data["title"], "补水{神器}")
+        self.assertEqual(data["body"], '他说："真的}好用"')
+
+    def test_first_valid_of_several_objects(self):
+        """测试有多个对象时取第一个完整且字段合法的对象，而不是把它们连成一段"""
+        text = '示例格式 {"title": ""} 以及 {x} 最终结果：' + NOTE + ' 另外 {"title": "其他"}'
+        data, error = extract_rednote(text)
+        self.assertIsNone(error)
+        self.assertEqual(data["hashtags"], ["#面膜"])
+
+    def test_skip_think(self):
+        """测试跳过 deepseek-r1 的 <think> 推理内容，其中的对象不会被当成结果"""
+        text = '<think>\n先想想格式 {"title": "草稿", "body": "b", "hashtags": [], "emojis": []}\n</think>\n' + NOTE
+        data, _ = extract_rednote(text)
+        self.assertEqual(data["title"], "补水{神器}")
+
+    def test_invalid_schema(self):
+        """测试字段缺失或类型错误时返回错误信息"""
+        data, error = extract_rednote('```json\n{"title": "t", "body": "b", "hashtags": "#a"}\n```')
+        self.assertIsNone(data)
+        self.assertIn("hashtags", error)
+        self.assertIn("emojis", error)
+        self.assertEqual(validate_rednote([]), ["文案应为 JSON 对象，实际为 list"])
+
+    def test_stray_open_brace(self):
+        """测试对象前面有落单的 { 时仍能找到后面的对象，包括 { 后紧跟对象和候选对象到结尾都没有闭合的情况"""
+        for text in ("注意使用 { 号开头的格式：" + NOTE,
+                     "注意使用 {" + NOTE,
+                     '{"note": ' + NOTE,
+                     '```json\n{"note": ' + NOTE + "\n```"):
+            with self.subTest(text=text):
+                data, error = extract_rednote(text)
+                self.assertIsNone(error)
+                self.assertEqual(data["title"], "补水{神器}")
+
+    def test_not_found(self):
+        """测试没有 JSON 对象的文本"""
+        data, error = extract_json("没有任何对象 {")
+        self.assertIsNone(data)
+        self.assertTrue(error)
+
+
+class TestIncrementalJSONExtractor(unittest.TestCase):
+    def test_random_chunks(self):
+        """测试任意切分的流式输入都能在对象闭合时得到相同结果"""
+        text = f"<think>想一想 ```json {{}}</think>好的\n```json\n{NOTE}\n```\n后续内容"
+        rng = random.Random(0)
+        for _ in range(200):
+            cuts = sorted(rng.sample(range(1, len(text)), rng.randint(0, 30)))
+            chunks = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+            with self.subTest(chunks=chunks):
+                extractor = IncrementalJSONExtractor(validator=validate_rednote)
+                results = [extractor.feed(chunk) for chunk in chunks]
+                self.assertEqual(next(r for r in results if r is not None)["title"], "补水{神器}")
+
+    def test_returns_when_object_closes(self):
+        """测试右大括号一到就返回，不需要等代码块结束"""
+        extractor = IncrementalJSONExtractor()
+        self.assertIsNone(extractor.feed('```json\n{"a": {"b": 1}'))
+        self.assertEqual(extractor.feed("}"), {"a": {"b": 1}})
+
+    def test_stray_open_brace_streaming(self):
+        """测试落单的 { 不会让流式提取卡住，后面的对象闭合时立即返回"""
+        extractor = IncrementalJSONExtractor(require_fence=False, validator=validate_rednote)
+        results = [extractor.feed(chunk) for chunk in ("注意使用 {", " 号开头的格式：", NOTE[:20], NOTE[20:])]
+        self.assertEqual(results[-1]["title"], "补水{神器}")
+
+    def test_think_prefix_split(self):
+        """测试开头像 <think> 的前缀被切开时，确认不是推理块后照常提取"""
+        extractor = IncrementalJSONExtractor(require_fence=False)
+        self.assertIsNone(extractor.feed(" <th"))
+        self.assertEqual(extractor.feed('x> {"k": 1}'), {"k": 1})
+        self.assertEqual(extract_json("{}"), ({}, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
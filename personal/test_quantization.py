@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from quantization import ProductQuantizer
+from rag_chunker import chunk_civil_code
+from rag_eval import HashingEmbeddingFunction
+from rag_ingest import ingest
+from rag_manifest import chunk_id
+from vector_store import LocalVectorStore
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "民法典节选.txt")
+
+
+class TestProductQuantizerSmallCorpus(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = LocalVectorStore(self.directory)
+        self.embedding_model = HashingEmbeddingFunction()
+        self.store.create_collection(collection_name="docs", dimension=self.embedding_model.dim, metric_type="IP")
+        self.chunks = list(chunk_civil_code(CORPUS, 256, 32))
+        ingest(self.store, "docs", self.embedding_model, iter(self.chunks), id_fn=chunk_id)
+        self.store.flush("docs")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pq_on_shipped_corpus(self):
+        """测试随仓库附带的语料（不足 256 个文本块）也能构建 pq 索引，并检索到原文本块"""
+        self.assertLess(len(self.chunks), 256)
+        self.store.create_quantized_index("docs", kind="pq", m=64)
+        # 常驻内存包括码本：64 段 × 60 个中心 × 4 维 × 4 字节，比 60 条 256 维 float32 向量还大
+        usage = self.store.memory_usage("docs")
+        self.assertEqual(usage["codebook_bytes"], 64 * len(self.chunks) * 4 * 4)
+        self.assertEqual(usage["resident_bytes"], len(self.chunks) * 64 + usage["codebook_bytes"])
+        self.assertLess(usage["ratio"], 1)
+
+        query = self.chunks[10]
+        results = self.store.search("docs", self.embedding_model.encode_queries([query]), limit=3,
+                                    output_fields=["text"])
+        self.assertEqual(results[0][0]["entity"]["text"], query)
+
+    def test_fewer_vectors_than_centroids(self):
+        """测试训练向量少于 256 条时，每段的中心数等于训练向量数"""
+        x = np.random.default_rng(0).standard_normal((10, 8)).astype(np.float32)
+        quantizer = ProductQuantizer(m=4).train(x)
+        self.assertEqual(quantizer.centroids.shape, (4, 10, 2))
+        self.assertEqual(quantizer.score(x[:1], quantizer.encode(x)).shape, (1, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
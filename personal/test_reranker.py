@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from bm25_index import BM25Builder
+from rag_answer import answer_questions
+from rag_chunker import chunk_civil_code
+from rag_eval import HashingEmbeddingFunction
+from rag_ingest import ingest
+from rag_retriever import HybridRetriever, Retriever
+from reranker import RerankingRetriever
+from semantic_cache import SemanticCache
+from vector_store import LocalVectorStore
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "民法典节选.txt")
+
+
+class CountingEmbeddingFunction(HashingEmbeddingFunction):
+    """记录每次 encode_queries 收到的问题。"""
+
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+
+    def encode_queries(self, queries: list) -> list:
+        self.queries.extend(queries)
+        return super().encode_queries(queries)
+
+
+class TestRerankingHybridRetriever(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        store = LocalVectorStore(self.directory)
+        self.embedding_model = CountingEmbeddingFunction()
+        store.create_collection(collection_name="docs", dimension=self.embedding_model.dim, metric_type="IP")
+        builder = BM25Builder()
+        ingest(store, "docs", self.embedding_model, builder.track(chunk_civil_code(CORPUS, 256, 32)))
+        store.flush("docs")
+        self.retriever = RerankingRetriever(HybridRetriever(Retriever(store, "docs", self.embedding_model),
+                                                            builder.build()))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def answer(self, questions: list, semantic_cache=None) -> list:
+        # 不调用 DeepSeek：流式回答直接结束
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: iter([]))))
+        return answer_questions(client, self.retriever, questions, semantic_cache=semantic_cache,
+                                on_token=lambda text: None)
+
+    def test_article_number_query_not_embedded(self):
+        """测试重排序包装混合检索后，带条文编号的问题仍然只走关键词检索，不调用向量模型"""
+        self.assertTrue(self.retriever.is_keyword_query("第一百五十九条"))
+        self.embedding_model.queries.clear()
+        self.answer(["第一百五十九条", "基本规定"], SemanticCache())
+        self.assertEqual(self.embedding_model.queries, ["基本规定"])
+
+    def test_keyword_query_cache_stats(self):
+        """测试只走关键词检索的问题第一次未命中、第二次按文本命中，命中率为 0.5"""
+        semantic_cache = SemanticCache()
+        self.answer(["第一百五十九条"], semantic_cache)
+        self.answer(["第一百五十九条"], semantic_cache)
+        stats = semantic_cache.stats()
+        self.assertEqual((stats["misses"], stats["exact_hits"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_plain_retriever_has_no_keyword_route(self):
+        """测试包装普通 Retriever 时没有 is_keyword_query，所有问题都走向量检索"""
+        retriever = RerankingRetriever(self.retriever.retriever.retriever)
+        self.assertIsNone(getattr(retriever, "is_keyword_query", None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,14 @@
+"""
+token 数的粗略估计，文本切分（rag_chunker）、检索上下文预算（rag_answer）和对话历史压缩（history_compaction）共用。
+
+不依赖具体模型的分词器：每个汉字、每个英文单词/数字串、每个标点各算一个 token，
+对中文为主的文本与 DeepSeek 的实际用量大致相当，用来做预算足够了。
+"""
+import re
+
+TOKEN_PATTERN = re.compile(r"[㐀-䶿一-鿿]|[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：每个汉字、每个英文单词/数字串、每个标点各算一个 token。"""
+    return len(TOKEN_PATTERN.findall(text))
@@ -0,0 +1,149 @@
+"""
+Agent 工具结果缓存：包在工具注册表外面，相同参数的调用直接返回缓存结果。
+
+- 缓存键是工具名加归一化后的参数（Unicode NFKC、去首尾空白、合并连续空白、小写、按参数名排序）；
+- 每个工具有自己的 TTL，TTL 为 0 的工具不缓存；总条目数超过上限时淘汰最久未使用的条目；
+- 可选地把缓存保存到磁盘 JSON 文件，下次启动时加载仍未过期的条目；
+- 多个会话并发请求同一个未缓存的键时只执行一次工具调用，其余调用等待同一个结果；
+- stats() 按工具统计命中、未命中、合并等待的次数和命中率。
+
+工具抛出的异常不会被缓存，等待同一次调用的会话会收到同样的异常。
+"""
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def normalize_value(value):
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", value)).strip().lower()
+    if isinstance(value, dict):
+        return {key: normalize_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(item) for item in value]
+    return value
+
+
+def cache_key(tool_name: str, arguments: dict) -> str:
+    return tool_name + ":" + json.dumps(normalize_value(arguments), ensure_ascii=False, sort_keys=True)
+
+
+class ToolResultCache:
+    """
+    Args:
+        ttls (dict): 工具名 -> TTL（秒）。
+        default_ttl (float): 没有单独配置的工具使用的 TTL。
+        max_entries (int): 缓存条目上限，超过时按 LRU 淘汰。
+        path (str): 磁盘缓存文件，为 None 时只在内存中缓存；工具结果需要能被 JSON 序列化。
+    """
+
+    def __init__(self, ttls: dict = None, default_ttl: float = 300.0, max_entries: int = 1024, path: str = None):
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()  # key -> (tool_name, 过期时间, 结果)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.counters = {}
+        if path and os.path.exists(path):
+            now = time.time()
+            with open(path, "r", encoding="utf-8") as file:
+                for key, tool_name, expires_at, result in json.load(file):
+                    if expires_at > now:
+                        self._entries[key] = (tool_name, expires_at, result)
+
+    def _count(self, tool_name: str, field: str):
+        counters = self.counters.setdefault(tool_name, {"hits": 0, "misses": 0, "coalesced": 0})
+        counters[field] += 1
+
+    def call(self, tool_name: str, fn, arguments: dict):
+        """按 arguments 查缓存，未命中时调用 fn(**arguments) 并缓存结果。"""
+        ttl = self.ttls.get(tool_name, self.default_ttl)
+        if ttl <= 0:
+            with self._lock:
+                self._count(tool_name, "misses")
+            return fn(**arguments)
+
+        key = cache_key(tool_name, arguments)
+        leader = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self._count(tool_name, "hits")
+                return entry[2]
+            future = self._inflight.get(key)
+            if future is not None:
+                self._count(tool_name, "coalesced")
+            else:
+                future = self._inflight[key] = Future()
+                self._count(tool_name, "misses")
+                leader = True
+        if not leader:
+            return future.result()  # 其他会话正在执行同一个调用，等待它的结果
+
+        try:
+            result = fn(**arguments)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[key] = (tool_name, time.time() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._inflight[key]
+        future.set_result(result)
+        return result
+
+    def wrap(self, tool_name: str, fn):
+        """返回带缓存的 fn，位置参数和关键字参数都会先按 fn 的签名绑定成参数字典。"""
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def cached(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            return self.call(tool_name, fn, dict(bound.arguments))
+
+        return cached
+
+    def wrap_tools(self, tools: dict) -> dict:
+        """把 {工具名: 函数} 注册表整体换成带缓存的版本。"""
+        return {name: self.wrap(name, fn) for name, fn in tools.items()}
+
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            rows = [[key, tool_name, expires_at, result]
+                    for key, (tool_name, expires_at, result) in self._entries.items() if expires_at > now]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(rows, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """清空缓存条目和计数（不影响正在进行的调用）。"""
+        with self._lock:
+            self._entries.clear()
+            self.counters = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for tool_name, counters in self.counters.items():
+                total = counters["hits"] + counters["misses"] + counters["coalesced"]
+                result[tool_name] = dict(counters, hit_rate=(counters["hits"] + counters["coalesced"]) / total)
+            result["entries"] = len(self._entries)
+            return result
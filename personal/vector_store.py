@@ -0,0 +1,411 @@
+"""
+可插拔的向量库后端。
+
+LocalVectorStore 是一个进程内的向量库，提供与脚本中用到的 MilvusClient 方法同名、同参数的接口
+（has_collection / drop_collection / create_collection / insert / upsert / delete / get / search / flush），
+可以直接替换 MilvusClient，在没有 Milvus 服务的机器上运行整个 RAG 流水线和基准测试：
+- 向量存放在内存映射的 float32 矩阵中，精确检索用 NumPy 分块矩阵乘法完成；
+- 可选用 create_ivf_index 构建 IVF（k-means 分区）索引，检索时只扫描 nprobe 个分区；
+- 可选用 create_quantized_index 构建 sq8 / pq 量化编码，编码常驻内存，原始向量留在磁盘上，
+  检索时先在编码上取 rerank_k 个候选，再读取候选的原始向量精确重算分数。
+
+用 connect(uri) 选择后端："local://<目录>" 使用本地向量库，其余 uri 交给 MilvusClient。
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+LOCAL_PREFIX = "local://"
+
+
+def connect(uri: str):
+    """根据 uri 创建向量库客户端。"""
+    if uri.startswith(LOCAL_PREFIX):
+        return LocalVectorStore(uri[len(LOCAL_PREFIX):])
+    from pymilvus import MilvusClient
+    return MilvusClient(uri)
+
+
+def _topk(scores: np.ndarray, rows: np.ndarray, k: int):
+    """从 scores (nq, n) 中取每行最大的 k 个，返回按分数降序排列的 (行号, 分数)。"""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0), dtype=np.float32)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return rows[np.take_along_axis(part, order, axis=1)], np.take_along_axis(part_scores, order, axis=1)
+
+
+def kmeans(x: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """简单的 k-means 聚类，返回 (nlist, dim) 的聚类中心。"""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_centroid(x, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # 空簇重新随机选一个点作为中心
+        centroids[empty] = x[rng.choice(len(x), int(empty.sum()))]
+    return centroids
+
+
+def nearest_centroid(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """按欧氏距离找最近的中心：argmin ||x - c||² 等价于 argmax (x·c - ||c||²/2)。"""
+    return np.argmax(x @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+
+
+class _LocalCollection:
+    """一个 collection 在磁盘上的全部数据，目录结构：
+    meta.json / vectors.f32（内存映射矩阵）/ ids.npy / alive.npy / fields.jsonl / centroids.npy / assign.npy
+    / quantizer.npz / codes.npy
+    """
+
+    def __init__(self, path: str, dim: int = None, metric_type: str = "IP"):
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+            self.dim, self.metric_type = meta["dim"], meta["metric_type"]
+            self.count, self.capacity = meta["count"], meta["capacity"]
+            self.ids = np.load(os.path.join(path, "ids.npy"))
+            self.alive = np.load(os.path.join(path, "alive.npy"))
+            with open(os.path.join(path, "fields.jsonl"), "r", encoding="utf-8") as file:
+                self.fields = [json.loads(line) for line in file]
+            self.centroids = self._load_optional("centroids.npy")
+            self.assign = self._load_optional("assign.npy")
+            self.codes = self._load_optional("codes.npy")
+            self.quantizer = None
+            if meta.get("quantizer"):
+                from quantization import load_quantizer
+                self.quantizer = load_quantizer(meta["quantizer"], np.load(os.path.join(path, "quantizer.npz")))
+            self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                     shape=(self.capacity, self.dim))
+        else:
+            if metric_type not in ("IP", "COSINE"):
+                raise ValueError(f"本地向量库只支持 IP 和 COSINE 距离，不支持 {metric_type}")
+            os.makedirs(path, exist_ok=True)
+            self.dim, self.metric_type = dim, metric_type
+            self.count, self.capacity = 0, 1024
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.alive = np.zeros(0, dtype=bool)
+            self.fields = []
+            self.centroids = None
+            self.assign = None
+            self.codes = None
+            self.quantizer = None
+            self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="w+",
+                                     shape=(self.capacity, self.dim))
+            self.flush()
+        self.id_to_row = {int(row_id): row for row, row_id in enumerate(self.ids) if self.alive[row]}
+        self._lists = None  # IVF 倒排表，分区号 -> 行号数组，惰性构建
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    def _load_optional(self, name: str):
+        file_path = os.path.join(self.path, name)
+        return np.load(file_path) if os.path.exists(file_path) else None
+
+    def _reserve(self, extra: int):
+        """容量不足时成倍扩容，分块复制到新的内存映射文件，不会把整个矩阵读入内存。"""
+        needed = self.count + extra
+        if needed <= self.capacity:
+            return
+        capacity = max(self.capacity * 2, needed)
+        tmp_path = self._vectors_path + ".tmp"
+        grown = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        for start in range(0, self.count, 65536):
+            end = min(start + 65536, self.count)
+            grown[start:end] = self.vectors[start:end]
+        grown.flush()
+        del grown
+        self.vectors._mmap.close()
+        del self.vectors
+        os.replace(tmp_path, self._vectors_path)
+        self.capacity = capacity
+        self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self.metric_type == "COSINE":
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def write(self, rows: list, upsert: bool) -> int:
+        vectors = self._prepare([row["vector"] for row in rows])
+        self._reserve(len(rows))
+        new_ids, new_alive = [], []
+        for row, vector in zip(rows, vectors):
+            row_id = int(row["id"])
+            fields = {key: value for key, value in row.items() if key not in ("id", "vector")}
+            target = self.id_to_row.get(row_id) if upsert else None
+            if target is None:
+                target = self.count
+                self.count += 1
+                self.fields.append(fields)
+                new_ids.append(row_id)
+                new_alive.append(True)
+            else:
+                self.fields[target] = fields
+            self.vectors[target] = vector
+            self.id_to_row[row_id] = target
+        self.ids = np.concatenate([self.ids, np.asarray(new_ids, dtype=np.int64)])
+        self.alive = np.concatenate([self.alive, np.asarray(new_alive, dtype=bool)])
+        if self.centroids is not None:
+            # 已有 IVF 索引时，新写入/覆盖的行分配到最近的分区
+            rows_written = np.asarray([self.id_to_row[int(row["id"])] for row in rows])
+            assign = np.full(self.count, -1, dtype=np.int32)
+            assign[:len(self.assign)] = self.assign
+            assign[rows_written] = nearest_centroid(vectors, self.centroids)
+            self.assign = assign
+            self._lists = None
+        if self.quantizer is not None:
+            rows_written = np.asarray([self.id_to_row[int(row["id"])] for row in rows])
+            codes = np.zeros((self.count, self.codes.shape[1]), dtype=np.uint8)
+            codes[:len(self.codes)] = self.codes
+            codes[rows_written] = self.quantizer.encode(vectors)
+            self.codes = codes
+        return len(rows)
+
+    def delete(self, ids: list) -> int:
+        deleted = 0
+        for row_id in ids:
+            row = self.id_to_row.pop(int(row_id), None)
+            if row is not None:
+                self.alive[row] = False
+                deleted += 1
+        return deleted
+
+    def build_ivf(self, nlist: int, iterations: int = 10, sample_per_list: int = 256):
+        alive_rows = np.flatnonzero(self.alive)
+        if len(alive_rows) < nlist:
+            raise ValueError(f"数据量 {len(alive_rows)} 少于分区数 {nlist}")
+        rng = np.random.default_rng(0)
+        sample = rng.choice(alive_rows, min(len(alive_rows), nlist * sample_per_list), replace=False)
+        self.centroids = kmeans(np.asarray(self.vectors[np.sort(sample)]), nlist, iterations)
+        self.assign = np.full(self.count, -1, dtype=np.int32)
+        for start in range(0, self.count, 65536):
+            end = min(start + 65536, self.count)
+            self.assign[start:end] = nearest_centroid(np.asarray(self.vectors[start:end]), self.centroids)
+        self._lists = None
+
+    def build_quantizer(self, kind: str, m: int = 16, train_size: int = 65536):
+        from quantization import ProductQuantizer, ScalarQuantizer
+        alive_rows = np.flatnonzero(self.alive)
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(alive_rows, min(len(alive_rows), train_size), replace=False))
+        quantizer = ProductQuantizer(m) if kind == "pq" else ScalarQuantizer()
+        quantizer.train(np.asarray(self.vectors[sample]))
+        width = m if kind == "pq" else self.dim
+        codes = np.zeros((self.count, width), dtype=np.uint8)
+        for start in range(0, self.count, 65536):
+            end = min(start + 65536, self.count)
+            codes[start:end] = quantizer.encode(np.asarray(self.vectors[start:end]))
+        # 训练和编码都成功后再替换，失败时 collection 保持原来的检索方式
+        self.quantizer, self.codes = quantizer, codes
+
+    def memory_usage(self) -> dict:
+        """
+        检索时常驻内存的向量数据大小（字节）：有量化编码时为编码加码本（PQ 的中心、SQ8 的最小值和步长），
+        否则是完整的 float32 矩阵。语料很小时 PQ 码本可能比原始向量还大，ratio 会小于 1。
+        """
+        full = self.count * self.dim * 4
+        codebook = self.quantizer.codebook_bytes if self.codes is not None else 0
+        resident = self.codes.nbytes + codebook if self.codes is not None else full
+        return {"float32_bytes": full, "codebook_bytes": codebook, "resident_bytes": resident,
+                "ratio": full / resident if resident else 1.0}
+
+    def _ivf_lists(self) -> list:
+        if self._lists is None:
+            order = np.argsort(self.assign, kind="stable")
+            bounds = np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def search(self, queries, limit: int, nprobe: int = None, rerank_k: int = None, block_rows: int = 65536):
+        queries = self._prepare(queries)
+        if self.quantizer is not None and nprobe is None:
+            return self._search_quantized(queries, limit, rerank_k or max(limit * 4, 32), block_rows)
+        if self.centroids is not None and nprobe:
+            lists = self._ivf_lists()
+            probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+            results = []
+            for query, probe in zip(queries, probes):
+                rows = np.concatenate([lists[p] for p in probe])
+                rows = rows[self.alive[rows]]
+                scores = (np.asarray(self.vectors[rows]) @ query)[None, :]
+                top_rows, top_scores = _topk(scores, rows, limit)
+                results.append((top_rows[0], top_scores[0]))
+            return results
+
+        # 精确检索：分块计算内积，维护每个查询的前 limit 个结果
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, self.count, block_rows):
+            end = min(start + block_rows, self.count)
+            scores = queries @ np.asarray(self.vectors[start:end]).T
+            scores[:, ~self.alive[start:end]] = -np.inf
+            rows = np.arange(start, end)
+            block_rows_top, block_scores_top = _topk(scores, rows, limit)
+            merged_rows = np.concatenate([best_rows, block_rows_top], axis=1)
+            merged_scores = np.concatenate([best_scores, block_scores_top], axis=1)
+            order = np.argsort(-merged_scores, axis=1)[:, :limit]
+            best_rows = np.take_along_axis(merged_rows, order, axis=1)
+            best_scores = np.take_along_axis(merged_scores, order, axis=1)
+        return [(rows[np.isfinite(scores)], scores[np.isfinite(scores)])
+                for rows, scores in zip(best_rows, best_scores)]
+
+    def _search_quantized(self, queries, limit: int, rerank_k: int, block_rows: int):
+        """两阶段检索：先在量化编码上取 rerank_k 个候选，再用磁盘上的原始向量精确打分。"""
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, self.count, block_rows):
+            end = min(start + block_rows, self.count)
+            scores = self.quantizer.score(queries, self.codes[start:end])
+            scores[:, ~self.alive[start:end]] = -np.inf
+            top_rows, top_scores = _topk(scores, np.arange(start, end), rerank_k)
+            merged_rows = np.concatenate([best_rows, top_rows], axis=1)
+            merged_scores = np.concatenate([best_scores, top_scores], axis=1)
+            order = np.argsort(-merged_scores, axis=1)[:, :rerank_k]
+            best_rows = np.take_along_axis(merged_rows, order, axis=1)
+            best_scores = np.take_along_axis(merged_scores, order, axis=1)
+
+        results = []
+        for query, rows, scores in zip(queries, best_rows, best_scores):
+            rows = np.sort(rows[np.isfinite(scores)])  # 按行号顺序读取磁盘，减少随机访问
+            exact = (np.asarray(self.vectors[rows]) @ query)[None, :]
+            top_rows, top_scores = _topk(exact, rows, limit)
+            results.append((top_rows[0], top_scores[0]))
+        return results
+
+    def flush(self):
+        self.vectors.flush()
+        np.save(os.path.join(self.path, "ids.npy"), self.ids)
+        np.save(os.path.join(self.path, "alive.npy"), self.alive)
+        if self.centroids is not None:
+            np.save(os.path.join(self.path, "centroids.npy"), self.centroids)
+            np.save(os.path.join(self.path, "assign.npy"), self.assign)
+        if self.quantizer is not None:
+            np.savez(os.path.join(self.path, "quantizer.npz"), **self.quantizer.state())
+            np.save(os.path.join(self.path, "codes.npy"), self.codes)
+        with open(os.path.join(self.path, "fields.jsonl"), "w", encoding="utf-8") as file:
+            for fields in self.fields:
+                file.write(json.dumps(fields, ensure_ascii=False) + "\n")
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"dim": self.dim, "metric_type": self.metric_type,
+                       "count": self.count, "capacity": self.capacity,
+                       "quantizer": self.quantizer.kind if self.quantizer is not None else None}, file)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+
+class LocalVectorStore:
+    """
+    进程内向量库，数据保存在 root_dir 下，每个 collection 一个子目录。
+
+    写入操作（insert / upsert / delete）先改内存和内存映射矩阵，调用 flush 后才把元数据落盘，
+    与 Milvus 的 flush 语义一致。
+    """
+
+    def __init__(self, root_dir: str = "./.vector_store"):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self._collections = {}
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.root_dir, collection_name)
+
+    def _collection(self, collection_name: str) -> _LocalCollection:
+        if collection_name not in self._collections:
+            if not self.has_collection(collection_name):
+                raise ValueError(f"collection {collection_name} 不存在")
+            self._collections[collection_name] = _LocalCollection(self._path(collection_name))
+        return self._collections[collection_name]
+
+    def has_collection(self, collection_name: str, **kwargs) -> bool:
+        return os.path.exists(os.path.join(self._path(collection_name), "meta.json"))
+
+    def drop_collection(self, collection_name: str, **kwargs):
+        collection = self._collections.pop(collection_name, None)
+        if collection is not None:
+            collection.vectors._mmap.close()
+        shutil.rmtree(self._path(collection_name), ignore_errors=True)
+
+    def create_collection(self, collection_name: str, dimension: int, metric_type: str = "IP", **kwargs):
+        if self.has_collection(collection_name):
+            raise ValueError(f"collection {collection_name} 已存在")
+        self._collections[collection_name] = _LocalCollection(self._path(collection_name), dimension, metric_type)
+
+    def create_ivf_index(self, collection_name: str, nlist: int = 128, iterations: int = 10):
+        """用 k-means 把向量分成 nlist 个分区；search 时通过 search_params={"params": {"nprobe": n}} 启用。"""
+        collection = self._collection(collection_name)
+        collection.build_ivf(nlist, iterations)
+        collection.flush()
+
+    def create_quantized_index(self, collection_name: str, kind: str = "sq8", m: int = 16):
+        """
+        构建量化编码，kind 为 "sq8"（每维 1 字节）或 "pq"（每个向量 m 字节）。
+        之后的 search 默认走两阶段检索，可通过 search_params={"params": {"rerank_k": n}} 调整候选数。
+        """
+        collection = self._collection(collection_name)
+        collection.build_quantizer(kind, m)
+        collection.flush()
+
+    def memory_usage(self, collection_name: str) -> dict:
+        return self._collection(collection_name).memory_usage()
+
+    def insert(self, collection_name: str, data: list, **kwargs) -> dict:
+        return {"insert_count": self._collection(collection_name).write(data, upsert=False)}
+
+    def upsert(self, collection_name: str, data: list, **kwargs) -> dict:
+        return {"upsert_count": self._collection(collection_name).write(data, upsert=True)}
+
+    def delete(self, collection_name: str, ids: list, **kwargs) -> dict:
+        return {"delete_count": self._collection(collection_name).delete(ids)}
+
+    def get(self, collection_name: str, ids: list, output_fields: list = None, **kwargs) -> list:
+        """按 id 读取数据，不存在的 id 会被跳过。"""
+        collection = self._collection(collection_name)
+        results = []
+        for row_id in ids:
+            row = collection.id_to_row.get(int(row_id))
+            if row is None:
+                continue
+            fields = collection.fields[row]
+            entity = {"id": int(row_id)}
+            entity.update({key: fields[key] for key in (output_fields or fields) if key in fields})
+            results.append(entity)
+        return results
+
+    def search(self, collection_name: str, data: list, limit: int = 10, search_params: dict = None,
+               output_fields: list = None, **kwargs) -> list:
+        """
+        检索与 data 中每个向量最相似的 limit 条数据，返回格式与 MilvusClient.search 一致：
+        [[{"id": ..., "distance": ..., "entity": {...}}, ...], ...]
+        """
+        collection = self._collection(collection_name)
+        params = (search_params or {}).get("params") or {}
+        results = []
+        for rows, scores in collection.search(data, limit, nprobe=params.get("nprobe"),
+                                              rerank_k=params.get("rerank_k")):
+            hits = []
+            for row, score in zip(rows, scores):
+                fields = collection.fields[row]
+                hits.append({
+                    "id": int(collection.ids[row]),
+                    "distance": float(score),
+                    "entity": {key: fields[key] for key in (output_fields or []) if key in fields},
+                })
+            results.append(hits)
+        return results
+
+    def flush(self, collection_name: str, **kwargs):
+        self._collection(collection_name).flush()